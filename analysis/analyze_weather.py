@@ -1,18 +1,22 @@
-import sqlite3
 import pandas as pd
 import os
 import matplotlib.pyplot as plt
 
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import DB_PATH, get_connection
+
 # --------------------------------------------------
 # Database connection
 # --------------------------------------------------
-DB_PATH = "database/weather.db"
-
 if not os.path.exists(DB_PATH):
     print("❌ Database not found.")
     exit(1)
 
-conn = sqlite3.connect(DB_PATH)
+conn = get_connection(read_only=True)
 
 query = "SELECT * FROM weather_data"
 df = pd.read_sql_query(query, conn)
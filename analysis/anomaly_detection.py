@@ -12,12 +12,17 @@ per city
 
 using z-score"""
 
-import sqlite3
 import pandas as pd
 import numpy as np
 import os
 
-DB_PATH = "database/weather.db"
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from analysis.data_loader import load_daily_summary
+
 OUTPUT_DIR = "outputs"
 ALERT_DIR = "alerts"
 
@@ -27,21 +32,7 @@ os.makedirs(ALERT_DIR, exist_ok=True)
 # --------------------------------------------------
 # Load daily summary data
 # --------------------------------------------------
-conn = sqlite3.connect(DB_PATH)
-
-query = """
-SELECT
-    city,
-    date,
-    avg_temperature
-FROM weather_daily_summary
-ORDER BY city, date
-"""
-
-df = pd.read_sql_query(query, conn)
-conn.close()
-
-df["date"] = pd.to_datetime(df["date"])
+df = load_daily_summary(["avg_temperature"])
 
 print("✅ Daily weather summary loaded")
 print(df)
@@ -49,7 +40,7 @@ print(df)
 # --------------------------------------------------
 # Compute day-over-day temperature change
 # --------------------------------------------------
-df["temp_change"] = df.groupby("city")["avg_temperature"].diff()
+df["temp_change"] = df.groupby("city", observed=True)["avg_temperature"].diff()
 
 # --------------------------------------------------
 # Z-score calculation (city-wise, safe)
@@ -63,7 +54,7 @@ def compute_zscore(series):
         return pd.Series([np.nan] * len(series))
     return (series - series.mean()) / series.std()
 
-df["z_score"] = df.groupby("city")["temp_change"].transform(compute_zscore)
+df["z_score"] = df.groupby("city", observed=True)["temp_change"].transform(compute_zscore)
 
 # --------------------------------------------------
 # Anomaly flagging
@@ -0,0 +1,223 @@
+"""Rolling-origin backtesting of the daily forecast models.
+
+Every day of every city becomes a forecast origin: each model predicts
+that day from the days before it only, and errors are collected over all
+origins instead of one held-out day per city.
+
+    expanding window   train on every earlier usable day (default)
+    sliding window     train on the last --window days only
+
+Models (analysis/forecasting.py features):
+
+    naive        yesterday's temperature
+    ma_2, ma_5   mean of the previous 2 / 5 days
+    lr           linear regression on lags 1-3
+    lr_enhanced  lags 1-3 + 3-day rolling mean and volatility
+
+Linear models are not refitted from scratch per origin. Each usable day
+contributes its outer products [1, x][1, x]ᵀ and [1, x]·y; running sums
+of them are the sufficient statistics of the fit on all earlier days
+(the difference of two running sums gives a sliding window), so every
+origin of every city is solved in one batched pseudo-inverse.
+
+All models are scored on the same origins (those where every model has
+its features and at least --min-train training days). Cities are split
+into chunks evaluated in a process pool.
+
+    python analysis/backtesting.py
+    python analysis/backtesting.py --window 60 --workers 4
+
+Writes outputs/backtest_leaderboard.csv: MAE / RMSE per model per city.
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from analysis.data_loader import load_daily_features
+from analysis.forecasting import Panel, feature_tensor
+
+OUTPUT_FILE = os.path.join("outputs", "backtest_leaderboard.csv")
+
+# Cities per worker task; bounds the (cities × days × F² ) statistics
+CHUNK_CITIES = 64
+
+# Relative cutoff for the Gram matrix pseudo-inverse. Its eigenvalues are
+# squared singular values, so this is forecasting.RCOND squared.
+GRAM_RCOND = 1e-12
+
+MODELS = {
+    "naive": {"window": 1},
+    "ma_2": {"window": 2},
+    "ma_5": {"window": 5},
+    "lr": {"features": ["lag_1d", "lag_2d", "lag_3d"]},
+    "lr_enhanced": {
+        "features": ["lag_1d", "lag_2d", "lag_3d", "rolling_mean_3d", "rolling_std_3d"]
+    },
+}
+
+
+# --------------------------------------------------
+# Forecasts for every origin
+# --------------------------------------------------
+def moving_average_forecasts(panel, window):
+    """(C, T) mean of the `window` days before each day."""
+    return panel.trailing(window).mean(axis=-1)
+
+
+def _running(stats, train_window):
+    """
+    Sums of `stats` (C, T, ...) over the training rows of each origin:
+    rows before t, or only the `train_window` rows before t.
+    """
+    total = np.cumsum(stats, axis=1)
+    before = np.zeros_like(total)
+    before[:, 1:] = total[:, :-1]
+    if train_window is not None:
+        # rows t - train_window .. t - 1
+        before[:, train_window + 1:] -= total[:, :-(train_window + 1)]
+    return before
+
+
+def linear_forecasts(panel, features, train_window=None, min_train=10):
+    """
+    (C, T) one-day-ahead linear regression forecasts for every origin,
+    NaN where the origin lacks features or `min_train` training days.
+    """
+    X = feature_tensor(panel, features)
+    y = panel.values
+    usable = np.isfinite(X).all(axis=-1) & np.isfinite(y)
+
+    # Shifting a feature by a constant only moves the intercept, so centre
+    # each city's columns once to keep the running sums well conditioned
+    weight = usable.astype(float)
+    count = np.maximum(weight.sum(axis=1), 1)
+    x_shift = np.einsum("ct,ctf->cf", weight, np.where(usable[..., None], X, 0.0)) / count[:, None]
+    y_shift = np.where(usable, y, 0.0).sum(axis=1) / count
+
+    design = np.concatenate(
+        [np.ones(y.shape + (1,)), X - x_shift[:, None, :]], axis=-1
+    )
+    design = np.where(usable[..., None], design, 0.0)
+    target = np.where(usable, y - y_shift[:, None], 0.0)
+
+    gram = _running(np.einsum("cti,ctj->ctij", design, design), train_window)
+    moment = _running(design * target[..., None], train_window)
+    n_train = _running(weight, train_window)
+
+    solve = np.linalg.pinv(gram, rcond=GRAM_RCOND, hermitian=True)
+    beta = (solve @ moment[..., None])[..., 0]
+    forecast = np.einsum("cti,cti->ct", design, beta) + y_shift[:, None]
+
+    return np.where(usable & (n_train >= min_train), forecast, np.nan)
+
+
+# --------------------------------------------------
+# Evaluation
+# --------------------------------------------------
+def backtest_panel(panel, train_window=None, min_train=10):
+    """Leaderboard rows (city, model, forecasts, mae, rmse) for one Panel."""
+    forecasts = {}
+    for name, model in MODELS.items():
+        if "features" in model:
+            forecasts[name] = linear_forecasts(
+                panel, model["features"], train_window, min_train
+            )
+        else:
+            forecasts[name] = moving_average_forecasts(panel, model["window"])
+
+    # Common origins, so every model is scored on the same days
+    scored = np.isfinite(panel.values)
+    for forecast in forecasts.values():
+        scored &= np.isfinite(forecast)
+    n = scored.sum(axis=1)
+
+    frames = []
+    for name, forecast in forecasts.items():
+        error = np.where(scored, panel.values - forecast, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mae = np.abs(error).sum(axis=1) / n
+            rmse = np.sqrt((error ** 2).sum(axis=1) / n)
+        frames.append(pd.DataFrame({
+            "city": panel.cities,
+            "model": name,
+            "forecasts": n,
+            "mae": mae,
+            "rmse": rmse,
+        }))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def _backtest_chunk(args):
+    panel, train_window, min_train = args
+    return backtest_panel(panel, train_window, min_train)
+
+
+def backtest(df, train_window=None, min_train=10, workers=None):
+    """
+    Rolling-origin leaderboard for a (city, date)-sorted daily frame,
+    cities evaluated in chunks on `workers` processes.
+    """
+    panel = Panel(df, "avg_temperature")
+    chunks = [
+        (panel.take(rows), train_window, min_train)
+        for rows in np.array_split(
+            np.arange(len(panel.cities)),
+            max(1, -(-len(panel.cities) // CHUNK_CITIES)),
+        )
+        if len(rows)
+    ]
+
+    if workers == 1 or len(chunks) == 1:
+        results = map(_backtest_chunk, chunks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_backtest_chunk, chunks))
+
+    leaderboard = pd.concat(list(results), ignore_index=True)
+    leaderboard = leaderboard[leaderboard["forecasts"] > 0]
+    return leaderboard.sort_values(["city", "mae"], kind="stable").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the forecast models")
+    parser.add_argument("--window", type=int, default=None,
+                        help="sliding training window in days (default: expanding)")
+    parser.add_argument("--min-train", type=int, default=10,
+                        help="training days required before an origin is scored")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    df = load_daily_features()
+    print(f"✅ Data loaded: {df['city'].nunique()} cities, {len(df)} city-days")
+
+    leaderboard = backtest(df, args.window, args.min_train, args.workers)
+
+    if leaderboard.empty:
+        print(f"⚠️ No city has more than {args.min_train} usable days yet")
+        raise SystemExit(0)
+
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+    leaderboard.to_csv(OUTPUT_FILE, index=False)
+
+    mode = f"sliding {args.window}-day" if args.window else "expanding"
+    print(f"\n📊 Rolling-origin backtest ({mode} window)")
+    print(leaderboard)
+
+    print("\n🏆 Mean across cities")
+    print(
+        leaderboard.groupby("model")[["mae", "rmse"]]
+        .mean()
+        .sort_values("mae")
+    )
+
+    print(f"\n📁 Leaderboard saved to {OUTPUT_FILE}")
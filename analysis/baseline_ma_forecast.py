@@ -6,28 +6,27 @@ This script implements a 2-day Moving Average (MA-2) forecast:
 
 This is the next logical baseline after naive forecasting."""
 
-import pandas as pd
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from analysis.data_loader import load_daily_features
 
 # ---------------------------------------
 # Load daily engineered data
 # ---------------------------------------
-df = pd.read_csv("outputs/engineered_daily_features.csv")
+df = load_daily_features()
 
 print("✅ Data loaded")
 print(df[["city", "date", "avg_temperature"]])
 
-# ---------------------------------------
-# Prepare data
-# ---------------------------------------
-df["date"] = pd.to_datetime(df["date"])
-df = df.sort_values(by=["city", "date"])
-
 # ---------------------------------------
 # Moving Average Forecast (2-day)
 # Use past 2 days ONLY
 # ---------------------------------------
 df["ma_2_forecast"] = (
-    df.groupby("city")["avg_temperature"]
+    df.groupby("city", observed=True)["avg_temperature"]
       .shift(1)
       .rolling(window=2)
       .mean()
@@ -62,5 +61,5 @@ valid = df.dropna(subset=["ma_2_forecast"])
 # MAE per city
 # ---------------------------------------
 print("\n📉 Mean Absolute Error (MA-2 Forecast)")
-mae = valid.groupby("city")["ma_2_error"].mean()
+mae = valid.groupby("city", observed=True)["ma_2_error"].mean()
 print(mae)
@@ -5,32 +5,32 @@ This script answers one core forecasting question:
 “If I predict tomorrow’s temperature as today’s temperature, how wrong am I?”
 
 That is the naive baseline."""
-import pandas as pd
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from analysis.data_loader import load_daily_features
 
 # ---------------------------------------
 # STEP 1: Load the engineered daily data
 # ---------------------------------------
-df = pd.read_csv("outputs/engineered_daily_features.csv")
+df = load_daily_features()
 
 print("✅ Data loaded")
 print(df[["city", "date", "avg_temperature"]])
 
 # ---------------------------------------
-# STEP 2: Convert date and sort properly
-# ---------------------------------------
-df["date"] = pd.to_datetime(df["date"])
-df = df.sort_values(by=["city", "date"])
-
-# ---------------------------------------
-# STEP 3: Naive forecast
+# STEP 2: Naive forecast
 # Forecast = yesterday's temperature
 # ---------------------------------------
 df["naive_forecast"] = (
-    df.groupby("city")["avg_temperature"].shift(1)
+    df.groupby("city", observed=True)["avg_temperature"].shift(1)
 )
 
 # ---------------------------------------
-# STEP 4: Absolute error calculation
+# STEP 3: Absolute error calculation
 # ---------------------------------------
 df["naive_error"] = (
     df["avg_temperature"] - df["naive_forecast"]
@@ -50,14 +50,14 @@ print(
 )
 
 # ---------------------------------------
-# STEP 5: Remove rows where forecast is not possible
+# STEP 4: Remove rows where forecast is not possible
 # (first day per city)
 # ---------------------------------------
 valid = df.dropna(subset=["naive_forecast"])
 
 # ---------------------------------------
-# STEP 6: Mean Absolute Error per city
+# STEP 5: Mean Absolute Error per city
 # ---------------------------------------
 print("\n📉 Mean Absolute Error (Naive Forecast)")
-mae = valid.groupby("city")["naive_error"].mean()
+mae = valid.groupby("city", observed=True)["naive_error"].mean()
 print(mae)
@@ -1,47 +1,42 @@
-import sqlite3
-from datetime import datetime
+import argparse
 
-DB_PATH = "database/weather.db"
+import sys
+from pathlib import Path
 
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import get_connection
+from database.migrations import apply_migrations
+from database.rollups import DERIVED_TIERS, build_rollups
+
+parser = argparse.ArgumentParser(
+    description="Build the daily / weekly / monthly weather summaries"
+)
+parser.add_argument(
+    "--full",
+    action="store_true",
+    help="re-aggregate all history instead of only days touched by new rows"
+)
+args = parser.parse_args()
+
+conn = get_connection()
 
 # --------------------------------------------------
-# Create daily summary table
+# Create summary tables (schema migrations)
 # --------------------------------------------------
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS weather_daily_summary (
-    city TEXT NOT NULL,
-    date TEXT NOT NULL,
-    avg_temperature REAL,
-    min_temperature REAL,
-    max_temperature REAL,
-    avg_humidity REAL,
-    record_count INTEGER,
-    PRIMARY KEY (city, date)
-)
-""")
+apply_migrations(conn)
 
 # --------------------------------------------------
-# Build daily aggregation from history
+# Roll hourly buckets up into days, then weeks and months
+# Incremental by default: only buckets touched by weather_history
+# rows newer than the last build are re-aggregated.
 # --------------------------------------------------
-aggregation_query = """
-INSERT OR REPLACE INTO weather_daily_summary
-SELECT
-    city,
-    DATE(datetime(fetched_at_utc, '+5 hours', '+30 minutes'))
- AS date,
-    AVG(temperature_c) AS avg_temperature,
-    MIN(temperature_c) AS min_temperature,
-    MAX(temperature_c) AS max_temperature,
-    AVG(humidity) AS avg_humidity,
-    COUNT(*) AS record_count
-FROM weather_history
-GROUP BY city, DATE(api_last_updated)
-"""
-
-cursor.execute(aggregation_query)
-conn.commit()
+counts, watermark = build_rollups(conn, full=args.full)
 conn.close()
 
-print("✅ Daily weather summary table built successfully")
+if args.full:
+    print(f"✅ Weather summaries fully rebuilt (history id ≤ {watermark})")
+else:
+    print(f"✅ Weather summaries updated (history id ≤ {watermark})")
+    for tier in DERIVED_TIERS:
+        print(f"   {tier}: {counts[tier]} buckets re-aggregated")
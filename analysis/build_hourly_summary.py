@@ -1,47 +1,54 @@
-import sqlite3
+import argparse
 
-DB_PATH = "database/weather.db"
+import sys
+from pathlib import Path
 
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import get_connection
+from database.migrations import apply_migrations
+from database.rollups import rebuild_hourly_summary, verify_hourly_summary
+
+parser = argparse.ArgumentParser(
+    description="Maintain weather_hourly_summary (updated by trigger as history lands)"
+)
+parser.add_argument("--full", action="store_true",
+                    help="rebuild the table from all history")
+parser.add_argument("--verify", action="store_true",
+                    help="check the incremental table against a full rebuild")
+args = parser.parse_args()
+
+conn = get_connection()
 
 # --------------------------------------------------
-# Create hourly summary table
+# Create hourly summary table + rollup trigger (schema migrations)
 # --------------------------------------------------
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS weather_hourly_summary (
-    city TEXT NOT NULL,
-    date TEXT NOT NULL,
-    hour INTEGER NOT NULL,
-    avg_temperature REAL,
-    min_temperature REAL,
-    max_temperature REAL,
-    avg_humidity REAL,
-    record_count INTEGER,
-    PRIMARY KEY (city, date, hour)
-)
-""")
+apply_migrations(conn)
 
 # --------------------------------------------------
-# Build hourly aggregation from history
+# Full rebuild (only needed after manual edits to history)
 # --------------------------------------------------
-aggregation_query = """
-INSERT OR REPLACE INTO weather_hourly_summary
-SELECT
-    city,
-    DATE(api_last_updated) AS date,
-    CAST(STRFTIME('%H', api_last_updated) AS INTEGER) AS hour,
-    AVG(temperature_c) AS avg_temperature,
-    MIN(temperature_c) AS min_temperature,
-    MAX(temperature_c) AS max_temperature,
-    AVG(humidity) AS avg_humidity,
-    COUNT(*) AS record_count
-FROM weather_history
-GROUP BY city, DATE(api_last_updated), hour
-"""
-
-cursor.execute(aggregation_query)
-conn.commit()
+if args.full:
+    rebuild_hourly_summary(conn)
+    print("✅ Hourly weather summary rebuilt from raw history")
+
+# --------------------------------------------------
+# Verify incremental rollup == full rebuild
+# --------------------------------------------------
+if args.verify:
+    mismatches = verify_hourly_summary(conn)
+    conn.close()
+
+    if mismatches:
+        print(f"❌ {len(mismatches)} hourly buckets differ from a full rebuild")
+        for city, date, hour, problem in mismatches[:20]:
+            print(f"   {city} {date} {hour:02d}h — {problem}")
+        sys.exit(1)
+
+    print("✅ Incremental hourly summary matches a full rebuild")
+    sys.exit(0)
+
 conn.close()
 
-print("✅ Hourly weather summary table built successfully")
+if not args.full:
+    print("✅ Hourly weather summary is up to date (maintained on insert)")
@@ -0,0 +1,272 @@
+"""Incremental cross-city correlation engine.
+
+time_series_eda.py pivots the whole daily summary and calls .corr(),
+an O(days × cities²) recompute on every run. This engine keeps running
+co-moment sums per city pair instead and folds in only the days added
+since the last run.
+
+For every pair (i, j) the sums run over the days both cities have a
+value (pandas' pairwise-complete .corr()). With x the (days × cities)
+values, zero where missing, and m the 0/1 presence mask, they are four
+(cities × cities) matrix products:
+
+    n    mᵀm      days in common
+    sx   xᵀm      sx[i, j] = Σ x_i over those days (sx[j, i] for x_j)
+    sxx  (x²)ᵀm   likewise for x²
+    sxy  xᵀx      Σ x_i x_j
+
+so a batch of new days is four BLAS multiplications, O(new days ×
+cities²). Values are stored relative to a fixed per-city shift (its
+first batch mean), which leaves correlations unchanged and keeps the
+sums well conditioned.
+
+Summary dates are city-local and the live ingester only ever fills a
+city's latest day, so a day is folded in once every reporting city has
+moved past it: partial days are never counted. Local dates run up to
+MAX_LAG_DAYS apart across time zones; a city further behind the newest
+day has stopped reporting and does not hold the others back. Values
+that arrive for a day already folded in are only picked up by --full,
+or when backfill_weather.py wrote them: it records the earliest day in
+the late_data_from watermark, and a state that covers that day is
+rebuilt from every day on the next refresh.
+
+Top-k neighbours are ranked a block of rows at a time, so the dense
+correlation matrix is never materialised. State is saved per metric in
+outputs/correlation/<metric>.npz; each city's neighbours are written to
+the city_neighbors table.
+
+    python analysis/correlation.py
+    python analysis/correlation.py --full --top-k 5
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import get_connection
+from database.migrations import apply_migrations
+from database.queries import DAILY_METRICS_BETWEEN, OPEN_DAILY_DATE
+from database.rollups import build_rollups
+from database.watermarks import LATE_DATA_FROM, get_watermark, set_watermark
+
+STATE_DIR = os.path.join("outputs", "correlation")
+
+METRICS = ["avg_temperature", "avg_humidity"]
+
+# Local dates differ by up to two days (UTC+14 vs UTC-12); cities
+# further behind the newest day are treated as no longer reporting
+MAX_LAG_DAYS = 2
+
+# Rows of the correlation matrix ranked at once; bounds its memory
+BLOCK_ROWS = 512
+
+MOMENTS = ["n", "sx", "sxx", "sxy"]
+
+
+# --------------------------------------------------
+# Co-moment state
+# --------------------------------------------------
+class CoMoments:
+    """Pairwise-complete co-moment sums of one metric across cities."""
+
+    def __init__(self, cities=(), through="", shift=None, **moments):
+        self.cities = np.asarray(cities, dtype=object)
+        self.through = through
+        size = len(self.cities)
+        self.shift = np.zeros(size) if shift is None else shift
+        for name in MOMENTS:
+            setattr(self, name, moments.get(name, np.zeros((size, size))))
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as state:
+            return cls(
+                state["cities"].astype(object), str(state["through"]), state["shift"],
+                **{name: state[name] for name in MOMENTS},
+            )
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            np.savez(
+                file, cities=self.cities.astype(str), through=self.through, shift=self.shift,
+                **{name: getattr(self, name) for name in MOMENTS},
+            )
+        os.replace(tmp_path, path)
+
+    def _add_cities(self, cities, first_values):
+        """Append new cities with zero sums and their shift."""
+        old = len(self.cities)
+        size = old + len(cities)
+        for name in MOMENTS:
+            grown = np.zeros((size, size))
+            grown[:old, :old] = getattr(self, name)
+            setattr(self, name, grown)
+        self.cities = np.concatenate([self.cities, np.asarray(cities, dtype=object)])
+        self.shift = np.concatenate([self.shift, first_values])
+
+    def update(self, days):
+        """Fold in a (date × city) frame of new days; NaN where missing."""
+        if days.empty:
+            return
+
+        known = set(self.cities)
+        new = [city for city in days.columns if city not in known]
+        if new:
+            first = days[new].mean().fillna(0.0).to_numpy()
+            self._add_cities(new, first)
+
+        values = days.reindex(columns=self.cities).to_numpy(dtype=float)
+        present = np.isfinite(values)
+        m = present.astype(float)
+        x = np.where(present, values - self.shift, 0.0)
+
+        self.n += m.T @ m
+        self.sx += x.T @ m
+        self.sxx += (x * x).T @ m
+        self.sxy += x.T @ x
+        self.through = max(self.through, str(days.index.max()))
+
+    def correlations(self, rows):
+        """(len(rows), cities) correlations and common days for `rows`."""
+        n = self.n[rows]
+        sx, sy = self.sx[rows], self.sx[:, rows].T
+        sxx, syy = self.sxx[rows], self.sxx[:, rows].T
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = self.sxy[rows] - sx * sy / n
+            var_x = sxx - sx * sx / n
+            var_y = syy - sy * sy / n
+            corr = cov / np.sqrt(var_x * var_y)
+
+        return np.clip(corr, -1.0, 1.0), n
+
+    def top_k(self, k=10, min_days=10):
+        """[(city, rank, neighbor, correlation, days)], most correlated first."""
+        size = len(self.cities)
+        k = min(k, size - 1)
+        if k < 1:
+            return []
+
+        rows_out = []
+        for start in range(0, size, BLOCK_ROWS):
+            rows = np.arange(start, min(start + BLOCK_ROWS, size))
+            corr, n = self.correlations(rows)
+
+            score = np.where((n >= min_days) & np.isfinite(corr), corr, -np.inf)
+            score[np.arange(len(rows)), rows] = -np.inf  # not its own neighbour
+
+            best = np.argpartition(-score, k - 1, axis=1)[:, :k]
+            best_score = np.take_along_axis(score, best, axis=1)
+            order = np.argsort(-best_score, axis=1, kind="stable")
+            best = np.take_along_axis(best, order, axis=1)
+
+            for i, row in enumerate(rows):
+                for rank, j in enumerate(best[i], start=1):
+                    if score[i, j] == -np.inf:
+                        break
+                    rows_out.append((
+                        self.cities[row], rank, self.cities[j],
+                        float(corr[i, j]), int(n[i, j]),
+                    ))
+
+        return rows_out
+
+
+# --------------------------------------------------
+# Refresh
+# --------------------------------------------------
+def state_path(metric):
+    return os.path.join(STATE_DIR, f"{metric}.npz")
+
+
+def refresh_correlations(conn, full=False, top_k=10, min_days=10):
+    """
+    Fold closed days (before every reporting city's latest day) newer
+    than each metric's state into it and rewrite city_neighbors.
+    Returns {metric: (days folded in, CoMoments)}.
+    """
+    build_rollups(conn)
+    open_date = conn.execute(
+        OPEN_DAILY_DATE, {"max_lag": f"-{MAX_LAG_DAYS} days"}
+    ).fetchone()[0] or ""
+
+    # Earliest day a backfill wrote; states already past it are rebuilt
+    late = get_watermark(conn, LATE_DATA_FROM)
+    late_iso = f"{late // 10000:04d}-{late // 100 % 100:02d}-{late % 100:02d}" if late else None
+
+    results = {}
+    for metric in METRICS:
+        moments = CoMoments() if full else CoMoments.load(state_path(metric))
+        if late_iso and moments.through >= late_iso:
+            moments = CoMoments()
+
+        df = pd.read_sql_query(
+            DAILY_METRICS_BETWEEN, conn,
+            params={"after": moments.through, "before": open_date},
+        )
+        days = df.pivot(index="date", columns="city", values=metric).sort_index()
+        moments.update(days)
+        moments.save(state_path(metric))
+
+        with conn:
+            conn.execute("DELETE FROM city_neighbors WHERE metric = ?", (metric,))
+            conn.executemany(
+                "INSERT INTO city_neighbors (metric, city, rank, neighbor, correlation, days) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(metric,) + row for row in moments.top_k(top_k, min_days)],
+            )
+
+        results[metric] = (len(days), moments)
+
+    if late:
+        with conn:
+            # Unless another backfill lowered it meanwhile
+            if get_watermark(conn, LATE_DATA_FROM) == late:
+                set_watermark(conn, LATE_DATA_FROM, 0)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update cross-city correlations")
+    parser.add_argument("--full", action="store_true",
+                        help="rebuild the co-moment state from every day")
+    parser.add_argument("--top-k", type=int, default=10,
+                        help="neighbours kept per city")
+    parser.add_argument("--min-days", type=int, default=10,
+                        help="days in common required to rank a pair")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    apply_migrations(conn)
+
+    results = refresh_correlations(conn, args.full, args.top_k, args.min_days)
+
+    for metric, (folded, moments) in results.items():
+        print(
+            f"✅ {metric}: {folded} new days folded in, "
+            f"{len(moments.cities)} cities (through {moments.through or '—'})"
+        )
+
+    neighbors = pd.read_sql_query(
+        "SELECT metric, city, rank, neighbor, correlation, days FROM city_neighbors "
+        "ORDER BY metric, city, rank",
+        conn,
+    )
+    conn.close()
+
+    if neighbors.empty:
+        print(f"⚠️ No city pair has {args.min_days} days in common yet")
+    else:
+        print("\n🔗 Most correlated neighbours")
+        print(neighbors)
@@ -1,35 +1,24 @@
-import sqlite3
-import pandas as pd
 import os
 import matplotlib.pyplot as plt
 
-DB_PATH = "database/weather.db"
+import sys
+from pathlib import Path
 
-conn = sqlite3.connect(DB_PATH)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from analysis.data_loader import load_daily_summary
 
 # --------------------------------------------------
 # Load daily summary data
 # --------------------------------------------------
-query = """
-SELECT
-    city,
-    date,
-    avg_temperature,
-    min_temperature,
-    max_temperature,
-    avg_humidity
-FROM weather_daily_summary
-"""
-
-df = pd.read_sql_query(query, conn)
-conn.close()
+df = load_daily_summary(
+    ["avg_temperature", "min_temperature", "max_temperature", "avg_humidity"]
+)
 
 if df.empty:
     print("⚠️ No data available for cross-city analysis.")
     exit(0)
 
-df["date"] = pd.to_datetime(df["date"])
-
 print("✅ Daily summary data loaded")
 print(df.head())
 
@@ -37,7 +26,7 @@ print(df.head())
 # Hottest city (average temperature)
 # --------------------------------------------------
 city_avg_temp = (
-    df.groupby("city")["avg_temperature"]
+    df.groupby("city", observed=True)["avg_temperature"]
     .mean()
     .sort_values(ascending=False)
 )
@@ -51,7 +40,7 @@ print(city_avg_temp)
 df["temp_range"] = df["max_temperature"] - df["min_temperature"]
 
 city_variability = (
-    df.groupby("city")["temp_range"]
+    df.groupby("city", observed=True)["temp_range"]
     .mean()
     .sort_values(ascending=False)
 )
@@ -2,118 +2,69 @@
 
 It:
 
-Reads daily aggregated weather data from the database
+Refreshes the daily feature store (database/feature_store.py) from the
+daily aggregated weather data — only days touched since the last run
 
-Creates time-series features
+Creates time-series features declared in its registry
 
 Outputs a single canonical ML-ready dataset
 
-👉 Everything downstream (EDA, baselines, ML) depends on this CSV."""
+👉 Everything downstream (EDA, baselines, ML) reads it through
+analysis/data_loader.load_daily_features(); the CSV is an export."""
 
-import sqlite3
-import pandas as pd
+import argparse
 import os
 
-# --------------------------------------------------
-# Configuration
-# --------------------------------------------------
-DB_PATH = "database/weather.db"
-OUTPUT_DIR = "outputs"
-OUTPUT_FILE = os.path.join(OUTPUT_DIR, "engineered_daily_features.csv")
+import sys
+from pathlib import Path
 
-# --------------------------------------------------
-# Load daily summary data
-# --------------------------------------------------
-conn = sqlite3.connect(DB_PATH)
-
-query = """
-SELECT
-    city,
-    date,
-    avg_temperature,
-    min_temperature,
-    max_temperature,
-    avg_humidity
-FROM weather_daily_summary
-ORDER BY city, date
-"""
-
-df = pd.read_sql_query(query, conn)
-conn.close()
-
-if df.empty:
-    raise ValueError("❌ No data found in weather_daily_summary table")
-
-# Convert date column
-df["date"] = pd.to_datetime(df["date"])
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-print("✅ Daily summary data loaded")
-print(df.head())
+from analysis.data_loader import load_daily_features
+from database.connection import get_connection
+from database.feature_store import FEATURES, refresh_features
+from database.migrations import apply_migrations
 
 # --------------------------------------------------
-# Temperature change (day-over-day)
+# Configuration
 # --------------------------------------------------
-df["temp_delta_1d"] = df.groupby("city")["avg_temperature"].diff()
+OUTPUT_DIR = "outputs"
+OUTPUT_FILE = os.path.join(OUTPUT_DIR, "engineered_daily_features.csv")
 
-print("✅ Temperature delta feature created")
+parser = argparse.ArgumentParser(description="Refresh engineered daily features")
+parser.add_argument("--full", action="store_true",
+                    help="recompute every day instead of only newly touched days")
+parser.add_argument("--no-csv", action="store_true",
+                    help=f"skip exporting {OUTPUT_FILE}")
+args = parser.parse_args()
 
 # --------------------------------------------------
-# Rolling averages (trend smoothing)
+# Refresh the feature store
 # --------------------------------------------------
-df["temp_rolling_7d"] = (
-    df.groupby("city")["avg_temperature"]
-    .rolling(window=7)
-    .mean()
-    .reset_index(level=0, drop=True)
-)
-
-df["temp_rolling_14d"] = (
-    df.groupby("city")["avg_temperature"]
-    .rolling(window=14)
-    .mean()
-    .reset_index(level=0, drop=True)
-)
-
-print("✅ Rolling average features created")
+conn = get_connection()
+apply_migrations(conn)
 
-# --------------------------------------------------
-# Lag features (memory)
-# --------------------------------------------------
-df["temp_lag_1d"] = df.groupby("city")["avg_temperature"].shift(1)
-df["temp_lag_7d"] = df.groupby("city")["avg_temperature"].shift(7)
+written, watermark = refresh_features(conn, full=args.full)
+conn.close()
 
-print("✅ Lag features created")
+print(f"✅ Feature store refreshed: {written} city-days recomputed (history id ≤ {watermark})")
+print(f"✅ Features: {', '.join(FEATURES)}")
 
 # --------------------------------------------------
-# Humidity trend features
+# Load engineered dataset
 # --------------------------------------------------
-df["humidity_delta_1d"] = df.groupby("city")["avg_humidity"].diff()
-
-df["humidity_rolling_7d"] = (
-    df.groupby("city")["avg_humidity"]
-    .rolling(window=7)
-    .mean()
-    .reset_index(level=0, drop=True)
-)
+df = load_daily_features()
 
-print("✅ Humidity trend features created")
-
-# --------------------------------------------------
-# Temperature volatility (stability indicator)
-# --------------------------------------------------
-df["temp_volatility_7d"] = (
-    df.groupby("city")["avg_temperature"]
-    .rolling(window=7)
-    .std()
-    .reset_index(level=0, drop=True)
-)
+if df.empty:
+    raise ValueError("❌ No data found in weather_daily_summary table")
 
-print("✅ Temperature volatility feature created")
+print(df.head())
 
 # --------------------------------------------------
 # Save engineered dataset
 # --------------------------------------------------
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-df.to_csv(OUTPUT_FILE, index=False)
+if not args.no_csv:
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    df.to_csv(OUTPUT_FILE, index=False)
 
-print(f"📁 Engineered daily features saved to {OUTPUT_FILE}")
+    print(f"📁 Engineered daily features saved to {OUTPUT_FILE}")
@@ -0,0 +1,199 @@
+"""Shared data loading for the analysis scripts.
+
+Every accessor returns a typed, pre-sorted DataFrame:
+
+    city   categorical (sorted categories)
+    date   datetime64 (summaries and engineered features)
+
+and rows ordered by (city, date[, hour]) or (city, api_epoch), so
+scripts can group, shift and roll without re-parsing or re-sorting.
+
+Results are cached as pickles under outputs/cache/, keyed by the data
+they were built from:
+
+    daily / weekly / monthly summaries   the `daily_summary` rollup watermark
+    hourly summary, history              max observation id + raw_history_from
+    engineered features                  the `daily_features` watermark
+
+so running the whole analysis suite reads SQLite once per dataset, and
+the next run after ingestion or a rollup build misses the cache
+automatically. Within one process a second call is served from
+memory. Delete outputs/cache/ to force a reload.
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+from glob import glob
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.archive import read_history
+from database.connection import get_connection
+from database.feature_store import BASE_COLUMNS, FEATURE_WATERMARK, FEATURES
+from database.rollups import ROLLUP_WATERMARK, TIERS
+from database.watermarks import RAW_HISTORY_FROM, get_watermark, max_history_id
+
+CACHE_DIR = os.path.join("outputs", "cache")
+
+# (cache name, key) -> DataFrame, for repeat calls in one process
+_memory = {}
+
+
+# --------------------------------------------------
+# Cache
+# --------------------------------------------------
+def _watermark_row(conn, name):
+    return conn.execute(
+        "SELECT value, updated_at FROM pipeline_watermarks WHERE name = ?", (name,)
+    ).fetchone()
+
+
+def _cached(name, key, load):
+    """Return the frame cached under (name, key), building it with load()."""
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+    if (name, digest) in _memory:
+        return _memory[(name, digest)].copy()
+
+    path = os.path.join(CACHE_DIR, f"{name}-{digest}.pkl")
+    try:
+        df = pd.read_pickle(path)
+    except (FileNotFoundError, EOFError):
+        df = load()
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        for stale in glob(os.path.join(CACHE_DIR, f"{name}-*.pkl")):
+            if stale != path:
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass  # removed by a concurrent process
+        # Unique temp file: pipeline stages fill the same cache in parallel
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, prefix=f"{name}-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                df.to_pickle(file)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    _memory[(name, digest)] = df
+    return df.copy()
+
+
+def _typed(df, sort_by, date_columns=()):
+    for column in date_columns:
+        df[column] = pd.to_datetime(df[column], format="%Y-%m-%d")
+    df["city"] = pd.Categorical(df["city"], categories=sorted(df["city"].unique()))
+    return df.sort_values(sort_by, kind="stable").reset_index(drop=True)
+
+
+def _select(df, columns, keys):
+    if columns is None:
+        return df
+    return df[keys + [c for c in columns if c not in keys]]
+
+
+# --------------------------------------------------
+# Summaries
+# --------------------------------------------------
+def load_summary(tier="daily", columns=None):
+    """
+    One rollup tier (database/rollups.py TIERS) as a typed frame sorted
+    by (city, bucket[, hour]). The bucket column is `date` for hourly and
+    daily, `week_start` / `month_start` for weekly and monthly.
+    """
+    table = TIERS[tier]["table"]
+    bucket = TIERS[tier]["bucket"]
+    keys = ["city", bucket] + (["hour"] if tier == "hourly" else [])
+
+    conn = get_connection(read_only=True)
+    try:
+        if tier == "hourly":
+            # Maintained row by row by the insert trigger
+            key = (tier, max_history_id(conn), get_watermark(conn, RAW_HISTORY_FROM))
+        else:
+            key = (tier, _watermark_row(conn, ROLLUP_WATERMARK))
+
+        def load():
+            df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
+            return _typed(df, keys, date_columns=[bucket])
+
+        df = _cached(f"{tier}_summary", key, load)
+    finally:
+        conn.close()
+
+    return _select(df, columns, keys)
+
+
+def load_daily_summary(columns=None):
+    """weather_daily_summary, sorted by (city, date)."""
+    return load_summary("daily", columns)
+
+
+def load_hourly_summary(columns=None):
+    """weather_hourly_summary, sorted by (city, date, hour)."""
+    return load_summary("hourly", columns)
+
+
+# --------------------------------------------------
+# Raw history
+# --------------------------------------------------
+def load_history(start=None, end=None, cities=None, columns=None):
+    """
+    Raw observations from SQLite and the archive tier (see
+    database.archive.read_history for the arguments), sorted by
+    (city, api_epoch), with `fetched_epoch` / `api_epoch` kept as
+    integers and city categorical.
+    """
+    conn = get_connection(read_only=True)
+    try:
+        key = (
+            max_history_id(conn), get_watermark(conn, RAW_HISTORY_FROM),
+            start, end, sorted(cities) if cities is not None else None,
+            sorted(columns) if columns is not None else None,
+        )
+
+        def load():
+            df = read_history(columns, start, end, cities, conn=conn)
+            return _typed(df, ["city", "api_epoch"])
+
+        return _cached("history", key, load)
+    finally:
+        conn.close()
+
+
+# --------------------------------------------------
+# Engineered features
+# --------------------------------------------------
+def load_daily_features(columns=None):
+    """
+    The feature store (database/feature_store.py), refreshed by
+    daily_feature_engineering.py, sorted by (city, date). `columns`
+    picks base metrics / registry features by name (default: all).
+    """
+    conn = get_connection(read_only=True)
+    try:
+        key = (_watermark_row(conn, FEATURE_WATERMARK), sorted(FEATURES.items()))
+        if key[0] is None:
+            raise ValueError(
+                "❌ Feature store is empty — run analysis/daily_feature_engineering.py first"
+            )
+
+        def load():
+            df = pd.read_sql_query(
+                f"SELECT city, date, {', '.join(BASE_COLUMNS + list(FEATURES))} "
+                f"FROM daily_features",
+                conn,
+            )
+            return _typed(df, ["city", "date"], date_columns=["date"])
+
+        df = _cached("daily_features", key, load)
+    finally:
+        conn.close()
+
+    return _select(df, columns, ["city", "date"])
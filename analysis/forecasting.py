@@ -0,0 +1,238 @@
+"""Vectorized multi-city forecasting engine.
+
+The per-city scripts (time_series_lr_forecast.py, time_series_lr_enhanced.py,
+time_series_ma_forecast.py, time_series_ma5_forecast.py,
+time_series_train_test.py) are thin configurations of this module.
+
+A (city, date)-sorted frame is laid out once as a right-padded
+(city × time) Panel. Lag and trailing-window features are slices along
+the time axis, so every city is featurized by the same few NumPy
+operations, with no per-city masking.
+
+Linear models are fitted for all cities at once: the (city × time ×
+feature) tensor is centred on each city's training rows (the intercept
+handling sklearn's LinearRegression uses) and solved with a batched
+pseudo-inverse, i.e. the same minimum-norm least-squares solution as a
+per-city fit. Moving averages gather each city's trailing window with
+one fancy-index.
+
+Evaluation matches the scripts: the last usable day per city is the test
+point, every earlier usable day is training data.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Cities solved per batched pseudo-inverse; bounds the tensor's memory
+FIT_BATCH = 512
+
+# Singular values below RCOND × the largest are treated as zero. Same
+# cutoff as sklearn's LinearRegression (tol, passed to lstsq as cond), so
+# features that are exact combinations of others (a rolling mean of the
+# lags) get the same minimum-norm split rather than fitting rounding noise.
+RCOND = 1e-6
+
+
+# --------------------------------------------------
+# Panel
+# --------------------------------------------------
+class Panel:
+    """
+    Right-padded (city × time) layout of one column of a frame sorted
+    by (city, date), e.g. from analysis/data_loader.py.
+
+    cities   city names, one per row
+    dates    (C, T) datetime64, NaT past each city's last day
+    values   (C, T) float64, NaN past each city's last day
+    lengths  (C,) days per city
+    columns  {name: (C, T)} precomputed feature columns of `df`
+             (e.g. from the feature store), used by feature_tensor()
+             in place of the FEATURES of the same name
+    """
+
+    def __init__(self, df, value="avg_temperature", columns=()):
+        city = df["city"]
+        if not isinstance(city.dtype, pd.CategoricalDtype):
+            city = city.astype("category")
+        codes = city.cat.codes.to_numpy()
+
+        counts = np.bincount(codes, minlength=len(city.cat.categories))
+        observed = np.flatnonzero(counts)
+
+        # Rows arrive grouped by city, so a row's time position is its
+        # offset from the first row of its city
+        row = np.searchsorted(observed, codes)
+        self.lengths = counts[observed]
+        starts = np.concatenate(([0], np.cumsum(self.lengths)[:-1]))
+        position = np.arange(len(df)) - starts[row]
+
+        self.cities = np.asarray(city.cat.categories[observed], dtype=object)
+        shape = (len(self.cities), int(self.lengths.max(initial=0)))
+
+        def layout(column):
+            grid = np.full(shape, np.nan)
+            grid[row, position] = df[column].to_numpy(dtype=float)
+            return grid
+
+        self.values = layout(value)
+        self.columns = {name: layout(name) for name in columns}
+
+        dates = df["date"].to_numpy()
+        self.dates = np.full(shape, np.datetime64("NaT"), dtype=dates.dtype)
+        self.dates[row, position] = dates
+
+    def take(self, rows):
+        """Panel of the cities at `rows` only (e.g. one worker's chunk)."""
+        part = object.__new__(Panel)
+        part.cities = self.cities[rows]
+        part.lengths = self.lengths[rows]
+        width = int(part.lengths.max(initial=0))
+        part.values = self.values[rows, :width]
+        part.columns = {name: grid[rows, :width] for name, grid in self.columns.items()}
+        part.dates = self.dates[rows, :width]
+        return part
+
+    def lag(self, k):
+        """value at t - k (NaN where there is no such day)."""
+        lagged = np.full_like(self.values, np.nan)
+        lagged[:, k:] = self.values[:, :-k]
+        return lagged
+
+    def trailing(self, window):
+        """(C, T, window) stack of the `window` days before t."""
+        return np.stack([self.lag(k) for k in range(1, window + 1)], axis=-1)
+
+
+# --------------------------------------------------
+# Features
+# Each maps a Panel to a (C, T) array; rows that lack the history
+# are NaN and drop out of training.
+# --------------------------------------------------
+FEATURES = {
+    "lag_1d": lambda panel: panel.lag(1),
+    "lag_2d": lambda panel: panel.lag(2),
+    "lag_3d": lambda panel: panel.lag(3),
+    "rolling_mean_3d": lambda panel: panel.trailing(3).mean(axis=-1),
+    "rolling_std_3d": lambda panel: panel.trailing(3).std(axis=-1, ddof=1),
+}
+
+
+def feature_tensor(panel, features):
+    """(C, T, F) design tensor: Panel columns, else the named FEATURES."""
+    return np.stack([
+        panel.columns[name] if name in panel.columns else FEATURES[name](panel)
+        for name in features
+    ], axis=-1)
+
+
+# --------------------------------------------------
+# Batched least squares
+# --------------------------------------------------
+def fit_least_squares(X, y, train):
+    """
+    Ordinary least squares with intercept for every city at once.
+
+    X      (C, T, F) features
+    y      (C, T) target
+    train  (C, T) bool, rows each city is fitted on
+
+    Returns (coef (C, F), intercept (C,)).
+    """
+    weight = train.astype(float)
+    n = weight.sum(axis=1)
+
+    x_mean = np.einsum("ct,ctf->cf", weight, np.where(train[..., None], X, 0.0)) / n[:, None]
+    y_mean = np.where(train, y, 0.0).sum(axis=1) / n
+
+    # Rows outside the training set are zeroed after centring, which
+    # removes them from the normal equations
+    Xc = np.where(train[..., None], X - x_mean[:, None, :], 0.0)
+    yc = np.where(train, y - y_mean[:, None], 0.0)
+
+    coef = np.empty((X.shape[0], X.shape[2]))
+    for start in range(0, X.shape[0], FIT_BATCH):
+        batch = slice(start, start + FIT_BATCH)
+        pinv = np.linalg.pinv(Xc[batch], rcond=RCOND)
+        coef[batch] = (pinv @ yc[batch, :, None])[..., 0]
+
+    intercept = y_mean - np.einsum("cf,cf->c", x_mean, coef)
+    return coef, intercept
+
+
+# --------------------------------------------------
+# Last-day evaluation
+# --------------------------------------------------
+def _last_true(mask):
+    """Index of the last True per row (-1 if none)."""
+    reversed_first = np.argmax(mask[:, ::-1], axis=1)
+    return np.where(mask.any(axis=1), mask.shape[1] - 1 - reversed_first, -1)
+
+
+def linear_forecast(panel, features, min_rows=5):
+    """
+    Per-city linear regression of the value on `features`, tested on the
+    last day that has every feature. Returns (results, skipped): one row
+    per city with test_date, forecast, actual, absolute_error and
+    coef_<feature>, and the cities with fewer than `min_rows` usable days.
+    """
+    X = feature_tensor(panel, features)
+    y = panel.values
+    usable = np.isfinite(X).all(axis=-1) & np.isfinite(y)
+
+    enough = usable.sum(axis=1) >= min_rows
+    test = _last_true(usable)
+
+    time = np.arange(y.shape[1])
+    train = usable & (time[None, :] < test[:, None]) & enough[:, None]
+
+    fitted = np.flatnonzero(enough)
+    coef, intercept = fit_least_squares(X[fitted], y[fitted], train[fitted])
+
+    t = test[fitted]
+    x_test = X[fitted, t]
+    forecast = intercept + np.einsum("cf,cf->c", x_test, coef)
+    actual = y[fitted, t]
+
+    results = pd.DataFrame({
+        "city": panel.cities[fitted],
+        "test_date": panel.dates[fitted, t],
+        "forecast": forecast,
+        "actual": actual,
+        "absolute_error": np.abs(actual - forecast),
+    })
+    for i, name in enumerate(features):
+        results[f"coef_{name}"] = coef[:, i]
+
+    return results, list(panel.cities[~enough])
+
+
+def moving_average_forecast(panel, window, min_rows=None):
+    """
+    Forecast each city's last day as the mean of the `window` days
+    before it. Cities with fewer than `min_rows` days (default
+    window + 1) are skipped. Returns (results, skipped).
+    """
+    min_rows = window + 1 if min_rows is None else min_rows
+    enough = panel.lengths >= min_rows
+    fitted = np.flatnonzero(enough)
+
+    test = panel.lengths[fitted] - 1
+    # Columns test-window .. test-1; clipped for short min_rows
+    columns = test[:, None] - np.arange(window, 0, -1)[None, :]
+    past = np.where(
+        columns >= 0, panel.values[fitted[:, None], np.maximum(columns, 0)], np.nan
+    )
+
+    forecast = np.nanmean(past, axis=1)
+    actual = panel.values[fitted, test]
+
+    results = pd.DataFrame({
+        "city": panel.cities[fitted],
+        "train_last_date": panel.dates[fitted, test - 1],
+        "test_date": panel.dates[fitted, test],
+        "forecast": forecast,
+        "actual": actual,
+        "absolute_error": np.abs(actual - forecast),
+    })
+
+    return results, list(panel.cities[~enough])
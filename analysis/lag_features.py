@@ -1,23 +1,21 @@
-import sqlite3
 import pandas as pd 
 
-#1. LOAD DATA FROM DATABASE
-conn = sqlite3.connect("database/weather.db")
+import sys
+from pathlib import Path
 
-query = """
-SELECT city,
-temperature_c, fetched_at_utc
-FROM weather_history
-ORDER BY city, fetched_at_utc
-"""
-df = pd.read_sql(query, conn)
-conn.close()
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.archive import read_history
+
+#1. LOAD DATA (SQLite + archived partitions, only the needed columns)
+df = read_history(columns=["temperature_c", "fetched_epoch"])
+df = df[["city", "temperature_c", "fetched_epoch"]]
 
 print("DATA LOADED")
 print(df.head())
 
-#2. CONVERT TIMESTAMP
-df["fetched_at_utc"]= pd.to_datetime(df["fetched_at_utc"])
+#2. CONVERT TIMESTAMP (integer epoch, no string parsing)
+df["fetched_at_utc"] = pd.to_datetime(df.pop("fetched_epoch"), unit="s", utc=True)
 
 #3. CREATE LAG FEATURES PER CITY
 df["temp_lag_1"]=df.groupby("city")["temperature_c"].shift(1)
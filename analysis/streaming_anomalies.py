@@ -0,0 +1,302 @@
+"""Streaming temperature anomaly detection.
+
+anomaly_detection.py z-scores every city's whole history in one batch,
+so it must rerun over all data to judge a new day, and each z-score is
+computed with statistics that include later days. This detector keeps
+per-city running statistics in the anomaly_state table instead and
+scores each new value against the changes that came before it only:
+
+    daily     day-over-day change of avg_temperature (as the batch
+              detector); a day is scored once the city has a later day,
+              so it is never judged on partial data
+    snapshot  change of temperature_c between consecutive raw snapshots
+
+Each value costs O(1): its change is z-scored against the running
+statistics, then folded into them —
+
+    welford  mean / sample stddev of every earlier change (Welford)
+    ewm      exponentially weighted mean / stddev (`halflife` values),
+             which follows seasons
+
+Both are kept in the state, so `anomalies.method` can be switched
+without a replay. Alerts are appended to
+alerts/temperature_anomalies_stream.csv; run this after each ingestion:
+
+    python analysis/streaming_anomalies.py
+    python analysis/streaming_anomalies.py --stream all
+"""
+
+import argparse
+import csv
+import math
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import CONFIG_PATH, get_connection
+from database.migrations import apply_migrations
+from database.queries import DAILY_VALUES_AFTER, SNAPSHOT_VALUES
+from database.rollups import build_rollups
+from database.watermarks import get_watermark, max_history_id, set_watermark
+
+ALERT_FILE = os.path.join("alerts", "temperature_anomalies_stream.csv")
+ALERT_COLUMNS = [
+    "stream", "city", "observed", "value", "change",
+    "expected", "stddev", "z_score", "method", "detected_at",
+]
+
+SNAPSHOT_WATERMARK = "anomaly_snapshots"
+
+STREAMS = ["daily", "snapshot"]
+
+DEFAULT_SETTINGS = {
+    "method": "welford",
+    "halflife": 30,
+    "threshold": 2.0,   # same cut-off as anomaly_detection.py
+    "min_samples": 5,
+}
+
+STATE_COLUMNS = ["last_key", "last_value", "n", "mean", "m2", "ew_mean", "ew_var"]
+
+
+def load_anomaly_settings(config_path=CONFIG_PATH):
+    settings = dict(DEFAULT_SETTINGS)
+
+    if os.path.exists(config_path):
+        with open(config_path, "r") as file:
+            config = yaml.safe_load(file) or {}
+        settings.update(config.get("anomalies") or {})
+
+    return settings
+
+
+# --------------------------------------------------
+# Running statistics
+# --------------------------------------------------
+class RunningStats:
+    """One city's last value plus Welford and EW statistics of its changes."""
+
+    def __init__(self, last_key, last_value, n=0, mean=0.0, m2=0.0,
+                 ew_mean=None, ew_var=None):
+        self.last_key = last_key
+        self.last_value = last_value
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.ew_mean = ew_mean
+        self.ew_var = ew_var
+
+    def expected(self, method):
+        """(mean, stddev) of the changes so far; stddev None if undefined."""
+        if method == "ewm":
+            if self.ew_mean is None:
+                return None, None
+            return self.ew_mean, math.sqrt(self.ew_var)
+        if self.n < 2:
+            return None, None
+        return self.mean, math.sqrt(self.m2 / (self.n - 1))
+
+    def update(self, change, alpha):
+        self.n += 1
+        delta = change - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (change - self.mean)
+
+        if self.ew_mean is None:
+            self.ew_mean, self.ew_var = change, 0.0
+        else:
+            delta = change - self.ew_mean
+            increment = alpha * delta
+            self.ew_mean += increment
+            self.ew_var = (1 - alpha) * (self.ew_var + delta * increment)
+
+
+class Detector:
+    """Scores values stream by stream, collecting alerts and changed state."""
+
+    def __init__(self, stream, states, settings):
+        self.stream = stream
+        self.states = states
+        self.method = settings["method"]
+        self.threshold = float(settings["threshold"])
+        self.min_samples = int(settings["min_samples"])
+        self.alpha = 1 - 0.5 ** (1 / float(settings["halflife"]))
+        self.detected_at = datetime.now(timezone.utc).isoformat()
+        self.scored = 0
+        self.alerts = []
+        self.changed = set()
+        # History id the snapshot stream has read up to
+        self.watermark = None
+
+    def observe(self, city, key, value):
+        """Score `value` (observed at `key`) for `city`, then update its state."""
+        if value is None:
+            return
+        self.changed.add(city)
+
+        state = self.states.get(city)
+        if state is None:
+            # First value only sets the baseline for the next change
+            self.states[city] = RunningStats(key, value)
+            return
+
+        change = value - state.last_value
+        expected, stddev = state.expected(self.method)
+        if state.n >= self.min_samples and stddev:
+            z_score = (change - expected) / stddev
+            if abs(z_score) > self.threshold:
+                self.alerts.append([
+                    self.stream, city, key, round(value, 4), round(change, 4),
+                    round(expected, 4), round(stddev, 4), round(z_score, 2),
+                    self.method, self.detected_at,
+                ])
+        self.scored += 1
+
+        state.update(change, self.alpha)
+        state.last_key, state.last_value = key, value
+
+
+# --------------------------------------------------
+# State persistence
+# --------------------------------------------------
+def load_states(conn, stream):
+    rows = conn.execute(
+        f"SELECT city, {', '.join(STATE_COLUMNS)} FROM anomaly_state WHERE stream = ?",
+        (stream,),
+    )
+    return {city: RunningStats(*values) for city, *values in rows}
+
+
+def save_states(conn, detector):
+    conn.executemany(
+        f"INSERT OR REPLACE INTO anomaly_state (stream, city, {', '.join(STATE_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * (len(STATE_COLUMNS) + 2))})",
+        [
+            (detector.stream, city) + tuple(
+                getattr(detector.states[city], column) for column in STATE_COLUMNS
+            )
+            for city in detector.changed
+        ],
+    )
+
+
+def append_alerts(alerts, path=ALERT_FILE):
+    if not alerts:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    new_file = not os.path.exists(path)
+    with open(path, "a", newline="") as file:
+        writer = csv.writer(file)
+        if new_file:
+            writer.writerow(ALERT_COLUMNS)
+        writer.writerows(alerts)
+
+
+def reset_stream(conn, stream):
+    """Forget a stream's state so the next run replays its history."""
+    with conn:
+        conn.execute("DELETE FROM anomaly_state WHERE stream = ?", (stream,))
+        if stream == "snapshot":
+            conn.execute("DELETE FROM pipeline_watermarks WHERE name = ?", (SNAPSHOT_WATERMARK,))
+
+
+# --------------------------------------------------
+# Streams
+# --------------------------------------------------
+def score_daily(conn, settings):
+    """Score every closed day newer than each city's last scored day."""
+    build_rollups(conn)
+    detector = Detector("daily", load_states(conn, "daily"), settings)
+
+    cities = [row[0] for row in conn.execute("SELECT city FROM locations ORDER BY city")]
+    for city in cities:
+        state = detector.states.get(city)
+        after = state.last_key if state else ""
+        rows = conn.execute(DAILY_VALUES_AFTER, {"city": city, "after": after}).fetchall()
+
+        # The newest day may still be accumulating snapshots
+        for date, avg_temperature in rows[:-1]:
+            detector.observe(city, date, avg_temperature)
+
+    return detector
+
+
+def score_snapshots(conn, settings):
+    """Score raw snapshots added since the previous run, in insert order."""
+    states = load_states(conn, "snapshot")
+    for state in states.values():
+        state.last_key = int(state.last_key)
+    detector = Detector("snapshot", states, settings)
+
+    since = get_watermark(conn, SNAPSHOT_WATERMARK)
+    until = max_history_id(conn)
+    detector.watermark = until
+
+    for city, api_epoch, temperature_c in conn.execute(
+        SNAPSHOT_VALUES, {"since": since, "until": until}
+    ):
+        state = detector.states.get(city)
+        if state is not None and api_epoch <= state.last_key:
+            continue
+        detector.observe(city, api_epoch, temperature_c)
+
+    for alert in detector.alerts:
+        alert[2] = datetime.fromtimestamp(alert[2], timezone.utc).isoformat()
+
+    return detector
+
+
+def run_stream(conn, stream, settings):
+    """Score one stream, append its alerts and persist its state."""
+    if stream == "daily":
+        detector = score_daily(conn, settings)
+    else:
+        detector = score_snapshots(conn, settings)
+
+    # Alerts first: a crash before the commit rescores (and re-alerts)
+    # the same values rather than losing them
+    append_alerts(detector.alerts)
+
+    with conn:
+        save_states(conn, detector)
+        if stream == "snapshot":
+            set_watermark(conn, SNAPSHOT_WATERMARK, detector.watermark)
+
+    return detector
+
+
+if __name__ == "__main__":
+    settings = load_anomaly_settings()
+
+    parser = argparse.ArgumentParser(description="Score new temperature values for anomalies")
+    parser.add_argument("--stream", choices=STREAMS + ["all"], default="daily",
+                        help="values to score (default: daily)")
+    parser.add_argument("--reset", action="store_true",
+                        help="drop the stored state and replay history")
+    args = parser.parse_args()
+
+    streams = STREAMS if args.stream == "all" else [args.stream]
+
+    conn = get_connection()
+    apply_migrations(conn)
+
+    for stream in streams:
+        if args.reset:
+            reset_stream(conn, stream)
+
+        detector = run_stream(conn, stream, settings)
+        print(f"✅ {stream}: {detector.scored} new values scored ({settings['method']})")
+
+        if detector.alerts:
+            print(f"🚨 {len(detector.alerts)} anomalies appended to {ALERT_FILE}")
+            for alert in detector.alerts:
+                print(f"   {alert[1]} @ {alert[2]}: change {alert[4]:+} (z = {alert[7]})")
+        else:
+            print("✅ No anomalies detected — system behavior within normal range")
+
+    conn.close()
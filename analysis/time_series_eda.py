@@ -6,12 +6,16 @@ Exploratory
 One-time / occasional
 Human-facing (plots + prints)"""
 
-import sqlite3
-import pandas as pd
 import matplotlib.pyplot as plt
 import os
 
-DB_PATH = "database/weather.db"
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from analysis.data_loader import load_daily_summary
+
 OUTPUT_DIR = "outputs/eda"
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -19,24 +23,9 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # --------------------------------------------------
 # Load daily summary
 # --------------------------------------------------
-conn = sqlite3.connect(DB_PATH)
-
-query = """
-SELECT
-    city,
-    date,
-    avg_temperature,
-    min_temperature,
-    max_temperature,
-    avg_humidity
-FROM weather_daily_summary
-ORDER BY city, date
-"""
-
-df = pd.read_sql_query(query, conn)
-conn.close()
-
-df["date"] = pd.to_datetime(df["date"])
+df = load_daily_summary(
+    ["avg_temperature", "min_temperature", "max_temperature", "avg_humidity"]
+)
 
 print("✅ Daily summary loaded")
 print(df)
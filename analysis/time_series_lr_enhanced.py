@@ -1,48 +1,26 @@
-import pandas as pd
-from sklearn.linear_model import LinearRegression
+"""Linear regression on lags (1-3 days) plus a 3-day rolling mean and
+volatility of the previous days, read from the feature store; all
+cities fitted at once (analysis/forecasting.py)."""
 
-# --------------------------------------------------
-# STEP 1: Load engineered daily data
-# --------------------------------------------------
-df = pd.read_csv("outputs/engineered_daily_features.csv")
+import sys
+from pathlib import Path
 
-print("✅ Data loaded")
-print(df[["city", "date", "avg_temperature"]].head())
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-# --------------------------------------------------
-# STEP 2: Prepare data
-# --------------------------------------------------
-df["date"] = pd.to_datetime(df["date"])
-df = df.sort_values(by=["city", "date"])
+from analysis.data_loader import load_daily_features
+from analysis.forecasting import Panel, linear_forecast
 
 # --------------------------------------------------
-# STEP 3: Create MODEL-SPECIFIC lag features
-# --------------------------------------------------
-df["temp_lag_2d"] = df.groupby("city")["avg_temperature"].shift(2)
-df["temp_lag_3d"] = df.groupby("city")["avg_temperature"].shift(3)
-
-# --------------------------------------------------
-# STEP 4: Create short-window rolling features
+# STEP 1: Load engineered daily data
 # --------------------------------------------------
-df["temp_rolling_3d"] = (
-    df.groupby("city")["avg_temperature"]
-      .rolling(window=3)
-      .mean()
-      .shift(1)
-      .reset_index(level=0, drop=True)
-)
-
-df["temp_volatility_3d"] = (
-    df.groupby("city")["avg_temperature"]
-      .rolling(window=3)
-      .std()
-      .shift(1)
-      .reset_index(level=0, drop=True)
-)
+df = load_daily_features()
 
+print("✅ Data loaded")
+print(df[["city", "date", "avg_temperature"]].head())
 
 # --------------------------------------------------
-# STEP 5: Define features and target
+# STEP 2: Define features (from the feature store) and target
+# Rolling features cover the 3 days BEFORE the target day
 # --------------------------------------------------
 FEATURES = [
     "temp_lag_1d",
@@ -54,51 +32,21 @@ FEATURES = [
 
 TARGET = "avg_temperature"
 
-results = []
-
 # --------------------------------------------------
-# STEP 6: Time-series train/test per city
+# STEP 3: Time-series train/test + Linear Regression per city
 # --------------------------------------------------
-for city in df["city"].unique():
-    city_df = df[df["city"] == city].copy()
-
-    city_df = city_df.dropna(subset=FEATURES + [TARGET])
-
-    if len(city_df) < 5:
-        print(f"⚠️ Not enough data for {city}, skipping")
-        continue
-
-    train = city_df.iloc[:-1]
-    test = city_df.iloc[-1:]
-
-    X_train = train[FEATURES]
-    y_train = train[TARGET]
-
-    X_test = test[FEATURES]
-    y_test = test[TARGET]
-
-    # --------------------------------------------------
-    # STEP 7: Train Linear Regression
-    # --------------------------------------------------
-    model = LinearRegression()
-    model.fit(X_train, y_train)
+results_df, skipped = linear_forecast(
+    Panel(df, TARGET, columns=FEATURES), FEATURES, min_rows=5
+)
 
-    forecast = model.predict(X_test)[0]
-    error = abs(y_test.values[0] - forecast)
+for city in skipped:
+    print(f"⚠️ Not enough data for {city}, skipping")
 
-    results.append({
-        "city": city,
-        "test_date": test.iloc[0]["date"],
-        "forecast": forecast,
-        "actual": y_test.values[0],
-        "absolute_error": error,
-    })
+results_df = results_df[["city", "test_date", "forecast", "actual", "absolute_error"]]
 
 # --------------------------------------------------
-# STEP 8: Evaluation
+# STEP 4: Evaluation
 # --------------------------------------------------
-results_df = pd.DataFrame(results)
-
 print("\n📊 Enhanced Linear Regression Results")
 print(results_df)
 
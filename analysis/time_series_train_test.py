@@ -24,57 +24,37 @@ Example (per city):
 
 👉 Past → Future only"""
 
-import pandas as pd
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from analysis.data_loader import load_daily_features
+from analysis.forecasting import Panel, moving_average_forecast
+
 # --------------------------------------------------
 # STEP 1: Load engineered daily data
 # --------------------------------------------------
-df= pd.read_csv("outputs/engineered_daily_features.csv")
+df = load_daily_features()
 print("✅ Data loaded")
 print(df[["city","date", "avg_temperature"]].head())
 # --------------------------------------------------
-# STEP 2: Prepare data
-# --------------------------------------------------
-df["date"]=pd.to_datetime(df["date"])
-df=df.sort_values(by=["city", "date"])
-# --------------------------------------------------
-# STEP 3: Time-based train/test split
+# STEP 2: Time-based train/test split + naive forecast
 # Strategy:
 # - Use last 1 day per city as TEST
 # - All previous days as TRAIN
+# - Forecast = last TRAIN day (a 1-day moving average)
 # --------------------------------------------------
-results= []
-for city in df["city"].unique():
-    city_df = df[df["city"]==city].copy()
-
-    if len(city_df)<3:
-        print(f"⚠️ Not enough data for {city}, skipping")
-        continue
-    train=city_df.iloc[:-1]
-    test=city_df.iloc[-1:]
-
-    # --------------------------------------------------
-    # STEP 4: Naive forecast
-    # --------------------------------------------------
-    last_train_temp = train.iloc[-1]["avg_temperature"]
-    actual_temp =  test.iloc[0]["avg_temperature"]
-
-    forecast = last_train_temp
-    error = abs(actual_temp - forecast)
-
-    results.append({
-        "city": city,
-        "train_last_date": train.iloc[-1]["date"],
-        "test_date": test.iloc[0]["date"],
-        "forecast": forecast,
-        "actual": actual_temp,
-        "absolute_error": error
-    })
-    
+results_df, skipped = moving_average_forecast(
+    Panel(df, "avg_temperature"), window=1, min_rows=3
+)
+
+for city in skipped:
+    print(f"⚠️ Not enough data for {city}, skipping")
+
 # --------------------------------------------------
-# STEP 5: Evaluation summary
+# STEP 3: Evaluation summary
 # --------------------------------------------------
-results_df = pd.DataFrame(results)
-
 print("\n📊 Time-Series Test Results")
 print(results_df)
 
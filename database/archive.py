@@ -0,0 +1,370 @@
+"""Cold storage tier for old weather observations.
+
+Raw rows whose local day is older than `archive.older_than_days` are
+moved out of SQLite into columnar files partitioned by city and month:
+
+    database/archive/city=Kochi/month=2026-01/part-<first id>-<last id>-0.parquet
+
+read_history() returns hot SQLite rows and cold partitions as one
+DataFrame. It reads only the requested columns, and it skips cold
+partitions outside the requested cities and time range before opening
+any file.
+
+Summaries are not affected: they are rolled up from raw rows before the
+rows are archived, and the hourly / daily tiers stay in SQLite.
+
+pyarrow is optional and only needed once partitions exist:
+
+    pip install pyarrow
+
+Run periodically (after ingestion):
+
+    python database/archive.py
+"""
+
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pandas as pd
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import CONFIG_PATH, get_connection
+from database.migrations import apply_migrations
+from database.rollups import ROLLUP_WATERMARK, build_rollups
+from database.watermarks import RAW_HISTORY_FROM, get_watermark, set_watermark
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # optional dependency
+    pa = ds = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    "path": "database/archive",
+    "format": "parquet",       # or "ipc" (Arrow IPC / Feather v2)
+    "older_than_days": 90,
+}
+
+# Column -> SQL expression over weather_observations o / locations l /
+# conditions c. Cold files store the same columns; `city` is the
+# partition key.
+COLUMNS = {
+    "id": "o.id",
+    "city": "l.city",
+    "api_epoch": "o.api_epoch",
+    "utc_offset": "o.utc_offset",
+    "fetched_epoch": "o.fetched_epoch",
+    "local_date": "o.local_date",
+    "local_hour": "o.local_hour",
+    "temperature_c": "o.temperature_c",
+    "humidity": "o.humidity",
+    "wind_kph": "o.wind_kph",
+    "condition": "c.text",
+}
+
+# Always returned, so hot and cold rows can be merged in time order
+KEY_COLUMNS = ["city", "api_epoch"]
+
+
+def load_archive_settings(config_path=CONFIG_PATH):
+    settings = dict(DEFAULT_SETTINGS)
+
+    if os.path.exists(config_path):
+        with open(config_path, "r") as file:
+            config = yaml.safe_load(file) or {}
+        settings.update(config.get("archive") or {})
+
+    return settings
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("The archive tier needs pyarrow: pip install pyarrow")
+
+
+def _month_key(local_date):
+    return f"{local_date // 10000:04d}-{local_date // 100 % 100:02d}"
+
+
+def _partitioning():
+    return ds.partitioning(
+        pa.schema([("city", pa.string()), ("month", pa.string())]),
+        flavor="hive",
+    )
+
+
+# --------------------------------------------------
+# SQL
+# --------------------------------------------------
+def hot_sql(columns, start=None, end=None, cities=None):
+    """
+    Select `columns` from SQLite. Locations drive the join (CROSS JOIN
+    keeps them outer), so each city is one seek on the
+    (location_id, api_epoch) unique index and rows come out in
+    (city, api_epoch) order.
+    """
+    select = ",\n    ".join(f"{COLUMNS[name]} AS {name}" for name in columns)
+
+    match = ["o.location_id = l.id"]
+    if start is not None:
+        match.append("o.api_epoch >= :start")
+    if end is not None:
+        match.append("o.api_epoch < :end")
+
+    where = ""
+    if cities is not None:
+        placeholders = ", ".join(f":city_{i}" for i in range(len(cities)))
+        where = f"WHERE l.city IN ({placeholders})"
+
+    joins = ""
+    if "condition" in columns:
+        joins = "LEFT JOIN conditions c ON c.id = o.condition_id"
+
+    return f"""
+SELECT
+    {select}
+FROM locations l
+CROSS JOIN weather_observations o
+    ON {" AND ".join(match)}
+{joins}
+{where}
+ORDER BY l.city, o.api_epoch
+"""
+
+
+def _hot_params(start, end, cities):
+    params = {"start": start, "end": end}
+    for i, city in enumerate(cities or []):
+        params[f"city_{i}"] = city
+    return params
+
+
+# Per-location seeks on (location_id, local_date, local_hour)
+ARCHIVE_ROWS_SQL = f"""
+SELECT
+    {", ".join(f"{expression} AS {name}" for name, expression in COLUMNS.items())}
+FROM weather_observations o
+JOIN locations l ON l.id = o.location_id
+LEFT JOIN conditions c ON c.id = o.condition_id
+WHERE o.location_id = :location_id
+  AND o.local_date >= :month_start
+  AND o.local_date < :month_end
+  AND o.local_date < :before
+  AND o.id <= :rolled_up
+"""
+
+ARCHIVE_CANDIDATES_SQL = """
+SELECT l.id, l.city, MIN(o.local_date)
+FROM locations l
+CROSS JOIN weather_observations o
+    ON o.location_id = l.id
+   AND o.local_date < :before
+   AND o.id <= :rolled_up
+GROUP BY l.city
+"""
+
+DELETE_ARCHIVED_SQL = """
+DELETE FROM weather_observations
+WHERE location_id = :location_id
+  AND local_date >= :month_start
+  AND local_date < :month_end
+  AND local_date < :before
+  AND id <= :rolled_up
+"""
+
+
+def plan_queries():
+    """Hot reader and archive statements, for check_query_plans.py."""
+    every = list(COLUMNS)
+    return [], {
+        "archive_hot_read": hot_sql(every),
+        "archive_hot_read_filtered": hot_sql(every, start=0, end=0, cities=["x"]),
+        "archive_candidates": ARCHIVE_CANDIDATES_SQL,
+        "archive_rows": ARCHIVE_ROWS_SQL,
+        "archive_delete": DELETE_ARCHIVED_SQL,
+    }
+
+
+# --------------------------------------------------
+# Archive
+# --------------------------------------------------
+def archive_history(conn, older_than_days, path, file_format="parquet", today=None):
+    """
+    Move rows older than `older_than_days` local days into partitioned
+    files under `path`, one (city, month) at a time. Files are written
+    before the rows are deleted and are named after the rows' id range,
+    so re-running after a crash overwrites rather than duplicates.
+    Returns the number of rows archived.
+    """
+    _require_pyarrow()
+
+    today = today or datetime.now(timezone.utc).date()
+    cutoff = today - timedelta(days=older_than_days)
+    before = cutoff.year * 10000 + cutoff.month * 100 + cutoff.day
+
+    # Only rows the rollups have already seen may leave SQLite
+    build_rollups(conn)
+    rolled_up = get_watermark(conn, ROLLUP_WATERMARK)
+
+    candidates = conn.execute(
+        ARCHIVE_CANDIDATES_SQL, {"before": before, "rolled_up": rolled_up}
+    ).fetchall()
+
+    archived = 0
+    extension = "parquet" if file_format == "parquet" else "arrow"
+
+    for location_id, city, first_date in candidates:
+        month = first_date // 100
+        while month * 100 < before:
+            next_month = month + 1 if month % 100 < 12 else (month // 100 + 1) * 100 + 1
+            params = {
+                "location_id": location_id,
+                "month_start": month * 100,
+                "month_end": next_month * 100,
+                "before": before,
+                "rolled_up": rolled_up,
+            }
+
+            df = pd.read_sql_query(ARCHIVE_ROWS_SQL, conn, params=params)
+            if not df.empty:
+                df["month"] = _month_key(month * 100)
+
+                ds.write_dataset(
+                    pa.Table.from_pandas(df, preserve_index=False),
+                    path,
+                    format=file_format,
+                    partitioning=_partitioning(),
+                    basename_template=(
+                        f"part-{df['id'].min()}-{df['id'].max()}-{{i}}.{extension}"
+                    ),
+                    existing_data_behavior="overwrite_or_ignore",
+                )
+
+                with conn:
+                    conn.execute(DELETE_ARCHIVED_SQL, params)
+
+                archived += len(df)
+                logger.info(f"Archived {len(df)} rows for {city} {_month_key(month * 100)}")
+
+            month = next_month
+
+    with conn:
+        if before > get_watermark(conn, RAW_HISTORY_FROM):
+            set_watermark(conn, RAW_HISTORY_FROM, before)
+
+    return archived
+
+
+# --------------------------------------------------
+# Unified reader
+# --------------------------------------------------
+def _to_epoch(value):
+    if value is None or isinstance(value, int):
+        return value
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("UTC")
+    return int(timestamp.timestamp())
+
+
+def _cold_frame(path, file_format, columns, start, end, cities):
+    _require_pyarrow()
+    dataset = ds.dataset(path, format=file_format, partitioning=_partitioning())
+
+    # Partition pruning: city and month come from directory names, so
+    # these predicates drop whole files before any data is read. Months
+    # are padded by a day because local dates can sit either side of UTC.
+    conditions = []
+    if cities is not None:
+        conditions.append(ds.field("city").isin(list(cities)))
+    if start is not None:
+        first = datetime.fromtimestamp(start - 86400, timezone.utc)
+        conditions.append(ds.field("month") >= f"{first:%Y-%m}")
+        conditions.append(ds.field("api_epoch") >= start)
+    if end is not None:
+        last = datetime.fromtimestamp(end + 86400, timezone.utc)
+        conditions.append(ds.field("month") <= f"{last:%Y-%m}")
+        conditions.append(ds.field("api_epoch") < end)
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    table = dataset.to_table(columns=columns, filter=expression)
+    return table.to_pandas()
+
+
+def read_history(columns=None, start=None, end=None, cities=None,
+                 conn=None, settings=None):
+    """
+    Observations from SQLite and the archive as one DataFrame sorted by
+    (city, api_epoch).
+
+    columns  names from COLUMNS (default: all); city and api_epoch are
+             always included
+    start    inclusive lower bound on api_epoch (epoch seconds, or
+             anything pd.Timestamp accepts; naive values are UTC)
+    end      exclusive upper bound, same forms
+    cities   iterable of city names (default: all)
+    """
+    settings = settings or load_archive_settings()
+    columns = KEY_COLUMNS + [c for c in (columns or COLUMNS) if c not in KEY_COLUMNS]
+    start, end = _to_epoch(start), _to_epoch(end)
+    cities = list(cities) if cities is not None else None
+
+    own_conn = conn is None
+    conn = conn or get_connection(read_only=True)
+    try:
+        hot = pd.read_sql_query(
+            hot_sql(columns, start, end, cities), conn,
+            params=_hot_params(start, end, cities),
+        )
+    finally:
+        if own_conn:
+            conn.close()
+
+    if not os.path.isdir(settings["path"]):
+        return hot
+
+    cold = _cold_frame(settings["path"], settings["format"], columns, start, end, cities)
+    if cold.empty:
+        return hot
+
+    frames = [cold] + ([hot] if not hot.empty else [])
+    return (
+        pd.concat(frames, ignore_index=True)
+        .sort_values(KEY_COLUMNS, kind="stable")
+        .reset_index(drop=True)
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    settings = load_archive_settings()
+
+    parser = argparse.ArgumentParser(description="Move old observations to the archive tier")
+    parser.add_argument("--older-than-days", type=int, default=settings["older_than_days"],
+                        help="archive local days older than this (default from config)")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    apply_migrations(conn)
+
+    archived = archive_history(
+        conn, args.older_than_days, settings["path"], settings["format"]
+    )
+    conn.close()
+
+    print(
+        f"✅ Archived {archived} observations older than {args.older_than_days} days "
+        f"to {settings['path']}"
+    )
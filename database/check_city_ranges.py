@@ -1,19 +1,17 @@
 # database/check_city_ranges.py
-import sqlite3
 import pandas as pd
 
-conn = sqlite3.connect("database/weather.db")
+import sys
+from pathlib import Path
 
-query = """
-SELECT
-  city,
-  MIN(temperature_c) AS min_temp,
-  MAX(temperature_c) AS max_temp,
-  AVG(temperature_c) AS avg_temp,
-  COUNT(*) AS records
-FROM weather_history
-GROUP BY city
-"""
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import get_connection
+from database.queries import CITY_RANGES
+
+conn = get_connection(read_only=True)
+
+query = CITY_RANGES
 
 df = pd.read_sql_query(query, conn)
 conn.close()
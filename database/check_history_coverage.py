@@ -1,17 +1,16 @@
-import sqlite3
 import pandas as pd
 
-conn = sqlite3.connect("database/weather.db")
+import sys
+from pathlib import Path
 
-query = """
-SELECT
-  city,
-  DATE(fetched_at_utc) AS date,
-  COUNT(*) AS records
-FROM weather_history
-GROUP BY city, DATE(fetched_at_utc)
-ORDER BY city, date;
-"""
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import get_connection
+from database.queries import HISTORY_COVERAGE
+
+conn = get_connection(read_only=True)
+
+query = HISTORY_COVERAGE
 
 df = pd.read_sql_query(query, conn)
 conn.close()
@@ -1,6 +1,11 @@
-import sqlite3
+import sys
+from pathlib import Path
 
-conn = sqlite3.connect("database/weather.db")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import get_connection
+
+conn = get_connection(read_only=True)
 cursor = conn.cursor()
 
 print("\n--- weather_hourly_summary ---")
@@ -0,0 +1,96 @@
+"""Prove every shipped analytical query is index-backed.
+
+Runs EXPLAIN QUERY PLAN for each query in database/queries.py (plus the
+generated statements in database/rollups.py, archive.py,
+retention.py and feature_store.py) and fails (exit code 1) if a plan contains a full table
+scan or a temp B-tree sort.
+
+By default the check runs against a fresh in-memory database built from
+the migrations, so it validates schema + queries independently of data.
+Pass --db to check a live database instead.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database import archive, feature_store, retention, rollups
+from database.connection import DB_PATH, get_connection
+from database.migrations import apply_migrations
+from database.queries import PLAN_DRIVER_TABLES, PLAN_SETUP, SHIPPED_QUERIES
+
+
+# Placeholder values for parameterised queries
+PLAN_PARAMS = {
+    "since": 0, "until": 0, "from_date": 0,
+    "start": 0, "end": 0, "city_0": "",
+    "location_id": 0, "month_start": 0, "month_end": 0, "before": 0, "rolled_up": 0,
+    "batch_size": 0, "city": "", "lookback": 1, "after": "",
+    "max_lag": "",
+}
+
+
+def plan_problems(plan_details):
+    problems = []
+    for detail in plan_details:
+        if detail.startswith("SCAN") and " USING " not in detail:
+            target = detail.split()[1]
+            # Subquery results and small temp driver tables are fine to scan
+            if target.startswith("(") or target in PLAN_DRIVER_TABLES:
+                continue
+            problems.append(f"full scan: {detail}")
+        if "USE TEMP B-TREE" in detail:
+            problems.append(f"temp sort: {detail}")
+    return problems
+
+
+def check_plans(conn):
+    failures = 0
+
+    setup, queries = list(PLAN_SETUP), dict(SHIPPED_QUERIES)
+    for module in (rollups, archive, retention, feature_store):
+        module_setup, module_queries = module.plan_queries()
+        setup += module_setup
+        queries.update(module_queries)
+
+    for statement in setup:
+        conn.execute(statement)
+
+    for name, query in queries.items():
+        details = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", PLAN_PARAMS)]
+        problems = plan_problems(details)
+
+        status = "❌" if problems else "✅"
+        print(f"{status} {name}")
+        for detail in details:
+            print(f"     {detail}")
+
+        failures += bool(problems)
+
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", nargs="?", const=DB_PATH, default=None,
+                        help="check a live database (default path if no value)")
+    args = parser.parse_args()
+
+    if args.db:
+        conn = get_connection(read_only=True, db_path=args.db)
+        # mode=ro still protects the file; PLAN_SETUP needs temp tables
+        conn.execute("PRAGMA query_only = OFF")
+    else:
+        conn = get_connection(db_path=":memory:")
+        apply_migrations(conn)
+
+    failures = check_plans(conn)
+    conn.close()
+
+    if failures:
+        print(f"\n❌ {failures} shipped queries are not index-backed")
+        sys.exit(1)
+
+    print("\n✅ All shipped queries use an index")
@@ -0,0 +1,84 @@
+"""Shared SQLite connection factory.
+
+Every entry point opens the database through get_connection() so they
+all run with the same performance profile:
+
+- WAL journal mode, so analytics readers never block the ingester
+  (and vice versa)
+- tuned synchronous / cache_size / mmap_size / temp_store pragmas
+- a busy timeout instead of immediate "database is locked" errors
+- incremental auto_vacuum for new files, so pages freed by retention
+  (database/retention.py) can be returned without a full VACUUM
+- SQRT() for rollup stddevs, registered in Python when SQLite was
+  built without its math functions
+
+Settings come from the `sqlite` section of config/config.yaml. Analysis
+scripts should pass read_only=True.
+"""
+
+import math
+import os
+import sqlite3
+
+import yaml
+
+DB_PATH = "database/weather.db"
+CONFIG_PATH = "config/config.yaml"
+
+DEFAULT_SETTINGS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "cache_size": -65536,        # negative = KiB, i.e. 64 MiB
+    "mmap_size": 268435456,      # 256 MiB
+    "temp_store": "memory",
+    "busy_timeout_ms": 5000,
+    "auto_vacuum": "incremental",  # only takes effect on a new file
+}
+
+
+def load_sqlite_settings(config_path=CONFIG_PATH):
+    settings = dict(DEFAULT_SETTINGS)
+
+    if os.path.exists(config_path):
+        with open(config_path, "r") as file:
+            config = yaml.safe_load(file) or {}
+        settings.update(config.get("sqlite") or {})
+
+    return settings
+
+
+def get_connection(read_only=False, db_path=DB_PATH, settings=None, **kwargs):
+    """
+    Open a tuned connection to the weather database.
+
+    read_only=True opens the file with mode=ro (it must already exist)
+    and sets query_only, so analysis scripts can never take a write lock.
+    Extra kwargs are passed through to sqlite3.connect.
+    """
+    settings = settings or load_sqlite_settings()
+    timeout = settings["busy_timeout_ms"] / 1000
+
+    if read_only:
+        conn = sqlite3.connect(
+            f"file:{db_path}?mode=ro", uri=True, timeout=timeout, **kwargs
+        )
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=timeout, **kwargs)
+        # Must precede the first table; existing files need one VACUUM
+        conn.execute(f"PRAGMA auto_vacuum = {settings['auto_vacuum']}")
+        # journal_mode is persistent in the file; readers inherit it
+        conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+
+    conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+    conn.execute(f"PRAGMA temp_store = {settings['temp_store']}")
+
+    try:
+        conn.execute("SELECT SQRT(4)")
+    except sqlite3.OperationalError:
+        conn.create_function("SQRT", 1, math.sqrt, deterministic=True)
+
+    return conn
@@ -0,0 +1,218 @@
+"""Incremental store of engineered daily features.
+
+daily_features holds one row per (city, date) of weather_daily_summary
+with the base daily metrics plus one column per entry in FEATURES, a
+declarative registry:
+
+    name: {"source": daily column, "op": lag | delta | mean | std,
+           "window": days, "lag": extra shift (optional)}
+
+    lag    value `window` rows earlier
+    delta  value minus the value `window` rows earlier
+    mean   rolling mean over `window` rows
+    std    rolling sample stddev over `window` rows
+
+A refresh only recomputes days touched by weather_observations rows
+newer than the `daily_features` watermark, from each city's earliest
+touched day onward. The LOOKBACK rows before that day are read back as
+window state, so rolling windows and lags extend exactly as a full
+recompute would, and refresh time follows the number of new days.
+
+Adding or changing a registry entry adds the column (ALTER TABLE) and
+triggers one full recompute; analysis scripts read features by name via
+analysis/data_loader.py instead of recomputing them.
+"""
+
+import json
+
+import pandas as pd
+
+from database.queries import COLLECT_TOUCHED_DAYS, CREATE_TOUCHED_DAYS
+from database.rollups import ROLLUP_WATERMARK, build_rollups
+from database.watermarks import get_watermark, set_watermark
+
+FEATURE_WATERMARK = "daily_features"
+
+BASE_COLUMNS = ["avg_temperature", "min_temperature", "max_temperature", "avg_humidity"]
+
+FEATURES = {
+    "temp_delta_1d": {"source": "avg_temperature", "op": "delta", "window": 1},
+    "temp_rolling_7d": {"source": "avg_temperature", "op": "mean", "window": 7},
+    "temp_rolling_14d": {"source": "avg_temperature", "op": "mean", "window": 14},
+    "temp_lag_1d": {"source": "avg_temperature", "op": "lag", "window": 1},
+    "temp_lag_7d": {"source": "avg_temperature", "op": "lag", "window": 7},
+    "humidity_delta_1d": {"source": "avg_humidity", "op": "delta", "window": 1},
+    "humidity_rolling_7d": {"source": "avg_humidity", "op": "mean", "window": 7},
+    "temp_volatility_7d": {"source": "avg_temperature", "op": "std", "window": 7},
+    # Linear regression inputs (analysis/time_series_lr_*.py)
+    "temp_lag_2d": {"source": "avg_temperature", "op": "lag", "window": 2},
+    "temp_lag_3d": {"source": "avg_temperature", "op": "lag", "window": 3},
+    "temp_rolling_3d": {"source": "avg_temperature", "op": "mean", "window": 3, "lag": 1},
+    "temp_volatility_3d": {"source": "avg_temperature", "op": "std", "window": 3, "lag": 1},
+}
+
+# Earlier rows any feature can reach back to
+LOOKBACK = max(spec["window"] + spec.get("lag", 0) for spec in FEATURES.values())
+
+# --------------------------------------------------
+# SQL
+# --------------------------------------------------
+SUMMARY_SELECT = f"""
+SELECT city, date, {", ".join(BASE_COLUMNS)}
+FROM weather_daily_summary
+"""
+
+# One city from `start`, plus the :lookback rows before it
+# (PRIMARY KEY (city, date) seeks)
+CITY_WINDOW_SQL = f"""
+{SUMMARY_SELECT}
+WHERE city = :city
+  AND date >= COALESCE((
+        SELECT date
+        FROM weather_daily_summary
+        WHERE city = :city AND date < :start
+        ORDER BY date DESC
+        LIMIT 1 OFFSET :lookback - 1
+      ), '')
+ORDER BY date
+"""
+
+TOUCHED_STARTS_SQL = """
+SELECT city, MIN(date)
+FROM touched_days
+GROUP BY city
+"""
+
+
+def plan_queries():
+    """Feature refresh statements, for check_query_plans.py."""
+    return [], {
+        "feature_city_window": CITY_WINDOW_SQL,
+        "feature_touched_starts": TOUCHED_STARTS_SQL,
+    }
+
+
+# --------------------------------------------------
+# Registry
+# --------------------------------------------------
+def _definition(spec):
+    return json.dumps(spec, sort_keys=True)
+
+
+def sync_registry(conn):
+    """
+    Add a daily_features column for every new registry entry. Returns
+    True when any definition is new or changed (a full refresh is due).
+    """
+    stored = dict(conn.execute("SELECT name, definition FROM feature_registry"))
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(daily_features)")}
+
+    changed = False
+    for name, spec in FEATURES.items():
+        if name not in columns:
+            conn.execute(f"ALTER TABLE daily_features ADD COLUMN {name} REAL")
+        if stored.get(name) != _definition(spec):
+            conn.execute(
+                "INSERT OR REPLACE INTO feature_registry (name, definition) VALUES (?, ?)",
+                (name, _definition(spec)),
+            )
+            changed = True
+
+    for name in set(stored) - set(FEATURES):
+        conn.execute("DELETE FROM feature_registry WHERE name = ?", (name,))
+
+    return changed
+
+
+# --------------------------------------------------
+# Computation
+# --------------------------------------------------
+def compute_features(df):
+    """Add every FEATURES column to a (city, date)-sorted frame."""
+    for name, spec in FEATURES.items():
+        grouped = df.groupby("city", sort=False)[spec["source"]]
+        window = spec["window"]
+
+        if spec["op"] == "lag":
+            values = grouped.shift(window)
+        elif spec["op"] == "delta":
+            values = grouped.diff(window)
+        else:
+            rolling = grouped.rolling(window=window)
+            values = getattr(rolling, spec["op"])().reset_index(level=0, drop=True)
+
+        if spec.get("lag"):
+            values = values.groupby(df["city"], sort=False).shift(spec["lag"])
+
+        df[name] = values
+
+    return df
+
+
+def _write(conn, df):
+    if df.empty:
+        return
+    columns = ["city", "date"] + BASE_COLUMNS + list(FEATURES)
+    rows = df[columns].astype(object).where(df[columns].notna(), None)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO daily_features ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})",
+        rows.itertuples(index=False, name=None),
+    )
+
+
+# --------------------------------------------------
+# Refresh
+# --------------------------------------------------
+def refresh_features(conn, full=False):
+    """
+    Bring daily_features up to date with the daily summaries. Returns
+    (rows written, watermark); full recomputes every row.
+    """
+    # Features are derived from the daily tier, so roll it up first
+    build_rollups(conn)
+
+    with conn:
+        full = sync_registry(conn) or full
+
+    until = get_watermark(conn, ROLLUP_WATERMARK)
+    since = get_watermark(conn, FEATURE_WATERMARK)
+    full = full or since == 0
+
+    if full:
+        df = pd.read_sql_query(f"{SUMMARY_SELECT} ORDER BY city, date", conn)
+        starts = None
+    else:
+        if since >= until:
+            return 0, until
+
+        conn.execute(CREATE_TOUCHED_DAYS)
+        conn.execute("DELETE FROM touched_days")
+        conn.execute(COLLECT_TOUCHED_DAYS, {"since": since, "until": until})
+        starts = dict(conn.execute(TOUCHED_STARTS_SQL).fetchall())
+
+        frames = [
+            pd.read_sql_query(
+                CITY_WINDOW_SQL, conn,
+                params={"city": city, "start": start, "lookback": LOOKBACK},
+            )
+            for city, start in starts.items()
+        ]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+            columns=["city", "date"] + BASE_COLUMNS
+        )
+
+    if not df.empty:
+        df = compute_features(df)
+
+    if starts is not None:
+        # Drop the window-state rows; they are already stored
+        df = df[df["date"] >= df["city"].map(starts)]
+
+    with conn:
+        if full:
+            conn.execute("DELETE FROM daily_features")
+        _write(conn, df)
+        set_watermark(conn, FEATURE_WATERMARK, until)
+
+    return len(df), until
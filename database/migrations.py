@@ -0,0 +1,718 @@
+"""Versioned schema migrations.
+
+The schema version lives in SQLite's `PRAGMA user_version`. Each entry
+in MIGRATIONS is applied once, in order, inside its own transaction.
+A step is either a SQL script or a callable taking the connection.
+
+Every script that writes to the database calls apply_migrations(conn)
+right after connecting.
+"""
+
+import logging
+import sqlite3
+
+from database.rollups import ROLLUP_WATERMARK, tier_table_sql
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# 1. Base tables
+# --------------------------------------------------
+BASE_TABLES_SQL = """
+CREATE TABLE IF NOT EXISTS weather_daily_summary (
+    city TEXT NOT NULL,
+    date TEXT NOT NULL,
+    avg_temperature REAL,
+    min_temperature REAL,
+    max_temperature REAL,
+    avg_humidity REAL,
+    record_count INTEGER,
+    PRIMARY KEY (city, date)
+);
+
+-- Historical data (append-only)
+CREATE TABLE IF NOT EXISTS weather_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    city TEXT NOT NULL,
+    region TEXT,
+    country TEXT,
+    temperature_c REAL,
+    humidity INTEGER,
+    wind_kph REAL,
+    condition TEXT,
+    api_last_updated TEXT NOT NULL,
+    fetched_at_utc TEXT,
+    UNIQUE(city, api_last_updated)
+);
+
+-- Latest snapshot (one row per city)
+CREATE TABLE IF NOT EXISTS weather_current (
+    city TEXT PRIMARY KEY,
+    region TEXT,
+    country TEXT,
+    temperature_c REAL,
+    humidity INTEGER,
+    wind_kph REAL,
+    condition TEXT,
+    api_last_updated TEXT,
+    fetched_at_utc TEXT
+);
+
+CREATE TABLE IF NOT EXISTS weather_hourly_summary (
+    city TEXT NOT NULL,
+    date TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    avg_temperature REAL,
+    min_temperature REAL,
+    max_temperature REAL,
+    avg_humidity REAL,
+    record_count INTEGER,
+    PRIMARY KEY (city, date, hour)
+);
+"""
+
+# --------------------------------------------------
+# 2. Analytical indexes on weather_history
+# --------------------------------------------------
+# Expression indexes must repeat the exact expressions used by the
+# queries in database/queries.py, otherwise the planner ignores them.
+HISTORY_INDEXES_SQL = """
+-- Export: ORDER BY fetched_at_utc
+CREATE INDEX IF NOT EXISTS idx_history_fetched_at
+    ON weather_history (fetched_at_utc);
+
+-- Lag features / city ranges: per-city time order (covering)
+CREATE INDEX IF NOT EXISTS idx_history_city_fetched_at
+    ON weather_history (city, fetched_at_utc, temperature_c);
+
+-- Coverage check: GROUP BY city, DATE(fetched_at_utc)
+CREATE INDEX IF NOT EXISTS idx_history_city_fetched_date
+    ON weather_history (city, DATE(fetched_at_utc));
+
+-- Daily / hourly summaries: GROUP BY city, date[, hour]
+CREATE INDEX IF NOT EXISTS idx_history_city_local_date_hour
+    ON weather_history (
+        city,
+        DATE(api_last_updated),
+        CAST(STRFTIME('%H', api_last_updated) AS INTEGER)
+    );
+"""
+
+# --------------------------------------------------
+# 3. Watermarks for incremental builds
+# --------------------------------------------------
+# value is typically the last weather_history.id a stage has processed
+WATERMARKS_SQL = """
+CREATE TABLE IF NOT EXISTS pipeline_watermarks (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+# --------------------------------------------------
+# 4. Trigger-maintained hourly rollup
+# --------------------------------------------------
+# Running sum/count/min/max per (city, date, hour) are updated as each
+# history row lands, so averages never need a rescan. Only genuinely
+# inserted rows fire the trigger (ON CONFLICT DO NOTHING skips it).
+# UPDATE SET expressions see the pre-update row values.
+HOURLY_ROLLUP_TRIGGER_SQL = """
+CREATE TRIGGER IF NOT EXISTS trg_history_hourly_rollup
+AFTER INSERT ON weather_history
+BEGIN
+    INSERT INTO weather_hourly_summary (
+        city, date, hour,
+        avg_temperature, min_temperature, max_temperature,
+        avg_humidity, record_count,
+        sum_temperature, sum_humidity
+    ) VALUES (
+        NEW.city,
+        DATE(NEW.api_last_updated),
+        CAST(STRFTIME('%H', NEW.api_last_updated) AS INTEGER),
+        NEW.temperature_c, NEW.temperature_c, NEW.temperature_c,
+        NEW.humidity, 1,
+        NEW.temperature_c, NEW.humidity
+    )
+    ON CONFLICT(city, date, hour) DO UPDATE SET
+        record_count = record_count + 1,
+        sum_temperature = sum_temperature + excluded.sum_temperature,
+        sum_humidity = sum_humidity + excluded.sum_humidity,
+        avg_temperature = (sum_temperature + excluded.sum_temperature) / (record_count + 1),
+        avg_humidity = (sum_humidity + excluded.sum_humidity) / (record_count + 1.0),
+        min_temperature = MIN(min_temperature, excluded.min_temperature),
+        max_temperature = MAX(max_temperature, excluded.max_temperature);
+END;
+"""
+
+
+def _hourly_rollup(conn):
+    conn.execute("ALTER TABLE weather_hourly_summary ADD COLUMN sum_temperature REAL")
+    conn.execute("ALTER TABLE weather_hourly_summary ADD COLUMN sum_humidity REAL")
+
+    # One-time rebuild so existing buckets carry running sums
+    conn.execute("DELETE FROM weather_hourly_summary")
+    conn.execute("""
+    INSERT INTO weather_hourly_summary
+    SELECT
+        city,
+        DATE(api_last_updated),
+        CAST(STRFTIME('%H', api_last_updated) AS INTEGER) AS hour,
+        AVG(temperature_c), MIN(temperature_c), MAX(temperature_c),
+        AVG(humidity), COUNT(*),
+        SUM(temperature_c), SUM(humidity)
+    FROM weather_history
+    GROUP BY city, DATE(api_last_updated), hour
+    """)
+
+    conn.execute(HOURLY_ROLLUP_TRIGGER_SQL)
+
+
+# --------------------------------------------------
+# 5. Multi-resolution rollups with mergeable partials
+# --------------------------------------------------
+# Hourly buckets also track sum of squares and humidity min/max, so
+# daily / weekly / monthly tiers (database/rollups.py) can be merged
+# from the tier below and carry stddev.
+HOURLY_ROLLUP_TRIGGER_V5_SQL = """
+CREATE TRIGGER trg_history_hourly_rollup
+AFTER INSERT ON weather_history
+BEGIN
+    INSERT INTO weather_hourly_summary (
+        city, date, hour,
+        avg_temperature, min_temperature, max_temperature,
+        avg_humidity, record_count,
+        sum_temperature, sum_humidity,
+        sumsq_temperature, sumsq_humidity,
+        min_humidity, max_humidity
+    ) VALUES (
+        NEW.city,
+        DATE(NEW.api_last_updated),
+        CAST(STRFTIME('%H', NEW.api_last_updated) AS INTEGER),
+        NEW.temperature_c, NEW.temperature_c, NEW.temperature_c,
+        NEW.humidity, 1,
+        NEW.temperature_c, NEW.humidity,
+        NEW.temperature_c * NEW.temperature_c, NEW.humidity * NEW.humidity,
+        NEW.humidity, NEW.humidity
+    )
+    ON CONFLICT(city, date, hour) DO UPDATE SET
+        record_count = record_count + 1,
+        sum_temperature = sum_temperature + excluded.sum_temperature,
+        sum_humidity = sum_humidity + excluded.sum_humidity,
+        sumsq_temperature = sumsq_temperature + excluded.sumsq_temperature,
+        sumsq_humidity = sumsq_humidity + excluded.sumsq_humidity,
+        avg_temperature = (sum_temperature + excluded.sum_temperature) / (record_count + 1),
+        avg_humidity = (sum_humidity + excluded.sum_humidity) / (record_count + 1.0),
+        min_temperature = MIN(min_temperature, excluded.min_temperature),
+        max_temperature = MAX(max_temperature, excluded.max_temperature),
+        min_humidity = MIN(min_humidity, excluded.min_humidity),
+        max_humidity = MAX(max_humidity, excluded.max_humidity);
+END;
+"""
+
+
+def _multi_resolution_rollups(conn):
+    for column in ("sumsq_temperature", "sumsq_humidity", "min_humidity", "max_humidity"):
+        conn.execute(f"ALTER TABLE weather_hourly_summary ADD COLUMN {column} REAL")
+
+    for column in (
+        "std_temperature", "sum_temperature", "sumsq_temperature",
+        "min_humidity", "max_humidity", "std_humidity",
+        "sum_humidity", "sumsq_humidity",
+    ):
+        conn.execute(f"ALTER TABLE weather_daily_summary ADD COLUMN {column} REAL")
+
+    conn.execute(tier_table_sql("weekly"))
+    conn.execute(tier_table_sql("monthly"))
+
+    conn.execute("DROP TRIGGER IF EXISTS trg_history_hourly_rollup")
+    conn.execute(HOURLY_ROLLUP_TRIGGER_V5_SQL)
+
+    # Recompute hourly partials from raw rows once
+    conn.execute("DELETE FROM weather_hourly_summary")
+    conn.execute("""
+    INSERT INTO weather_hourly_summary (
+        city, date, hour,
+        avg_temperature, min_temperature, max_temperature,
+        avg_humidity, record_count,
+        sum_temperature, sum_humidity,
+        sumsq_temperature, sumsq_humidity,
+        min_humidity, max_humidity
+    )
+    SELECT
+        city,
+        DATE(api_last_updated),
+        CAST(STRFTIME('%H', api_last_updated) AS INTEGER) AS hour,
+        AVG(temperature_c), MIN(temperature_c), MAX(temperature_c),
+        AVG(humidity), COUNT(*),
+        SUM(temperature_c), SUM(humidity),
+        SUM(temperature_c * temperature_c), SUM(humidity * humidity),
+        MIN(humidity), MAX(humidity)
+    FROM weather_history
+    GROUP BY city, DATE(api_last_updated), hour
+    """)
+
+    # Next build_daily_summary.py run re-derives every coarser bucket
+    conn.execute(
+        "DELETE FROM pipeline_watermarks WHERE name = ?", (ROLLUP_WATERMARK,)
+    )
+
+
+# --------------------------------------------------
+# 6. Local time keys and epoch timestamps
+# --------------------------------------------------
+# WeatherAPI's last_updated is already in the city's local time, so
+# local_date (YYYYMMDD) and local_hour are taken from it once at ingest
+# and summaries group on integers instead of parsing ISO strings.
+LOCAL_TIME_COLUMNS_SQL = """
+ALTER TABLE weather_history ADD COLUMN tz_id TEXT;
+ALTER TABLE weather_history ADD COLUMN api_epoch INTEGER;
+ALTER TABLE weather_history ADD COLUMN fetched_epoch INTEGER;
+ALTER TABLE weather_history ADD COLUMN local_date INTEGER;
+ALTER TABLE weather_history ADD COLUMN local_hour INTEGER;
+"""
+
+HOURLY_ROLLUP_TRIGGER_V6_SQL = """
+CREATE TRIGGER trg_history_hourly_rollup
+AFTER INSERT ON weather_history
+BEGIN
+    INSERT INTO weather_hourly_summary (
+        city, date, hour,
+        avg_temperature, min_temperature, max_temperature,
+        avg_humidity, record_count,
+        sum_temperature, sum_humidity,
+        sumsq_temperature, sumsq_humidity,
+        min_humidity, max_humidity
+    ) VALUES (
+        NEW.city,
+        printf('%04d-%02d-%02d', NEW.local_date / 10000, NEW.local_date / 100 % 100, NEW.local_date % 100),
+        NEW.local_hour,
+        NEW.temperature_c, NEW.temperature_c, NEW.temperature_c,
+        NEW.humidity, 1,
+        NEW.temperature_c, NEW.humidity,
+        NEW.temperature_c * NEW.temperature_c, NEW.humidity * NEW.humidity,
+        NEW.humidity, NEW.humidity
+    )
+    ON CONFLICT(city, date, hour) DO UPDATE SET
+        record_count = record_count + 1,
+        sum_temperature = sum_temperature + excluded.sum_temperature,
+        sum_humidity = sum_humidity + excluded.sum_humidity,
+        sumsq_temperature = sumsq_temperature + excluded.sumsq_temperature,
+        sumsq_humidity = sumsq_humidity + excluded.sumsq_humidity,
+        avg_temperature = (sum_temperature + excluded.sum_temperature) / (record_count + 1),
+        avg_humidity = (sum_humidity + excluded.sum_humidity) / (record_count + 1.0),
+        min_temperature = MIN(min_temperature, excluded.min_temperature),
+        max_temperature = MAX(max_temperature, excluded.max_temperature),
+        min_humidity = MIN(min_humidity, excluded.min_humidity),
+        max_humidity = MAX(max_humidity, excluded.max_humidity);
+END;
+"""
+
+LOCAL_TIME_INDEXES_SQL = """
+DROP INDEX IF EXISTS idx_history_city_local_date_hour;
+DROP INDEX IF EXISTS idx_history_city_fetched_date;
+DROP INDEX IF EXISTS idx_history_city_fetched_at;
+
+-- Summaries / coverage: GROUP BY city, local_date[, local_hour]
+CREATE INDEX IF NOT EXISTS idx_history_city_local_hour
+    ON weather_history (city, local_date, local_hour);
+
+-- Lag features / city ranges: per-city time order (covering)
+CREATE INDEX IF NOT EXISTS idx_history_city_fetched_epoch
+    ON weather_history (city, fetched_epoch, temperature_c);
+"""
+
+
+def _local_time_keys(conn):
+    for statement in _split_sql(LOCAL_TIME_COLUMNS_SQL):
+        conn.execute(statement)
+
+    conn.execute("""
+    UPDATE weather_history SET
+        local_date = CAST(REPLACE(SUBSTR(api_last_updated, 1, 10), '-', '') AS INTEGER),
+        local_hour = CAST(SUBSTR(api_last_updated, 12, 2) AS INTEGER),
+        fetched_epoch = CAST(STRFTIME('%s', fetched_at_utc) AS INTEGER)
+    """)
+
+    # Older rows never stored the API epoch or tz_id. Recover the epoch
+    # from local time minus the UTC offset, taken as the local - fetch
+    # gap rounded up to 15 minutes (WeatherAPI refreshes every 15
+    # minutes, and every UTC offset is a multiple of 15 minutes).
+    local = "CAST(STRFTIME('%s', api_last_updated) AS INTEGER)"
+    gap = f"({local} - fetched_epoch)"
+    conn.execute(f"""
+    UPDATE weather_history SET
+        api_epoch = {local} - 900 * (
+            CASE WHEN {gap} > 0 THEN ({gap} + 899) / 900 ELSE {gap} / 900 END
+        )
+    WHERE fetched_epoch IS NOT NULL
+    """)
+
+    conn.execute("DROP TRIGGER IF EXISTS trg_history_hourly_rollup")
+    conn.execute(HOURLY_ROLLUP_TRIGGER_V6_SQL)
+
+    for statement in _split_sql(LOCAL_TIME_INDEXES_SQL):
+        conn.execute(statement)
+
+
+# --------------------------------------------------
+# 7. Compact observation storage
+# --------------------------------------------------
+# Snapshots move to weather_observations: epoch integers instead of ISO
+# text, and small integer ids into the locations / conditions tables
+# instead of repeating city, region, country and condition strings.
+# weather_history becomes a view with the old column shape (plus the
+# migration 6 columns) for ad-hoc readers; writers insert into
+# weather_observations directly.
+COMPACT_TABLES_SQL = """
+CREATE TABLE locations (
+    id INTEGER PRIMARY KEY,
+    city TEXT NOT NULL UNIQUE,
+    region TEXT,
+    country TEXT,
+    tz_id TEXT
+);
+
+CREATE TABLE conditions (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE weather_observations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    location_id INTEGER NOT NULL REFERENCES locations(id),
+    api_epoch INTEGER NOT NULL,
+    utc_offset INTEGER NOT NULL,   -- seconds; local time = api_epoch + utc_offset
+    fetched_epoch INTEGER,
+    local_date INTEGER NOT NULL,   -- YYYYMMDD
+    local_hour INTEGER NOT NULL,
+    temperature_c REAL,
+    humidity INTEGER,
+    wind_kph REAL,
+    condition_id INTEGER REFERENCES conditions(id),
+    UNIQUE(location_id, api_epoch)
+);
+"""
+
+COMPACT_COPY_SQL = """
+-- Latest region / country / tz_id per city (bare columns follow MAX(id))
+INSERT INTO locations (city, region, country, tz_id)
+SELECT city, region, country, tz_id
+FROM (
+    SELECT city, region, country, tz_id, MAX(id)
+    FROM weather_history
+    GROUP BY city
+)
+ORDER BY city;
+
+INSERT INTO conditions (text)
+SELECT DISTINCT condition
+FROM weather_history
+WHERE condition IS NOT NULL
+ORDER BY condition;
+
+-- Ids are kept so watermarks stay valid
+INSERT OR IGNORE INTO weather_observations (
+    id, location_id, api_epoch, utc_offset, fetched_epoch,
+    local_date, local_hour,
+    temperature_c, humidity, wind_kph, condition_id
+)
+SELECT
+    h.id,
+    l.id,
+    COALESCE(h.api_epoch, CAST(STRFTIME('%s', h.api_last_updated) AS INTEGER)),
+    CAST(STRFTIME('%s', h.api_last_updated) AS INTEGER)
+        - COALESCE(h.api_epoch, CAST(STRFTIME('%s', h.api_last_updated) AS INTEGER)),
+    h.fetched_epoch,
+    h.local_date,
+    h.local_hour,
+    h.temperature_c, h.humidity, h.wind_kph,
+    c.id
+FROM weather_history h
+JOIN locations l ON l.city = h.city
+LEFT JOIN conditions c ON c.text = h.condition
+ORDER BY h.id;
+"""
+
+COMPACT_VIEW_SQL = """
+DROP TRIGGER IF EXISTS trg_history_hourly_rollup;
+DROP TABLE weather_history;
+
+CREATE VIEW weather_history AS
+SELECT
+    o.id,
+    l.city,
+    l.region,
+    l.country,
+    o.temperature_c,
+    o.humidity,
+    o.wind_kph,
+    c.text AS condition,
+    STRFTIME('%Y-%m-%d %H:%M', o.api_epoch + o.utc_offset, 'unixepoch') AS api_last_updated,
+    STRFTIME('%Y-%m-%dT%H:%M:%S+00:00', o.fetched_epoch, 'unixepoch') AS fetched_at_utc,
+    l.tz_id,
+    o.api_epoch,
+    o.fetched_epoch,
+    o.local_date,
+    o.local_hour
+FROM weather_observations o
+JOIN locations l ON l.id = o.location_id
+LEFT JOIN conditions c ON c.id = o.condition_id;
+
+-- Export: ORDER BY fetched_epoch
+CREATE INDEX idx_observations_fetched_epoch
+    ON weather_observations (fetched_epoch);
+
+-- Lag features / city ranges: per-location time order (covering)
+CREATE INDEX idx_observations_location_fetched
+    ON weather_observations (location_id, fetched_epoch, temperature_c);
+
+-- Summaries / coverage: GROUP BY location, local_date[, local_hour]
+CREATE INDEX idx_observations_location_local_hour
+    ON weather_observations (location_id, local_date, local_hour);
+
+CREATE TRIGGER trg_observations_hourly_rollup
+AFTER INSERT ON weather_observations
+BEGIN
+    INSERT INTO weather_hourly_summary (
+        city, date, hour,
+        avg_temperature, min_temperature, max_temperature,
+        avg_humidity, record_count,
+        sum_temperature, sum_humidity,
+        sumsq_temperature, sumsq_humidity,
+        min_humidity, max_humidity
+    ) VALUES (
+        (SELECT city FROM locations WHERE id = NEW.location_id),
+        printf('%04d-%02d-%02d', NEW.local_date / 10000, NEW.local_date / 100 % 100, NEW.local_date % 100),
+        NEW.local_hour,
+        NEW.temperature_c, NEW.temperature_c, NEW.temperature_c,
+        NEW.humidity, 1,
+        NEW.temperature_c, NEW.humidity,
+        NEW.temperature_c * NEW.temperature_c, NEW.humidity * NEW.humidity,
+        NEW.humidity, NEW.humidity
+    )
+    ON CONFLICT(city, date, hour) DO UPDATE SET
+        record_count = record_count + 1,
+        sum_temperature = sum_temperature + excluded.sum_temperature,
+        sum_humidity = sum_humidity + excluded.sum_humidity,
+        sumsq_temperature = sumsq_temperature + excluded.sumsq_temperature,
+        sumsq_humidity = sumsq_humidity + excluded.sumsq_humidity,
+        avg_temperature = (sum_temperature + excluded.sum_temperature) / (record_count + 1),
+        avg_humidity = (sum_humidity + excluded.sum_humidity) / (record_count + 1.0),
+        min_temperature = MIN(min_temperature, excluded.min_temperature),
+        max_temperature = MAX(max_temperature, excluded.max_temperature),
+        min_humidity = MIN(min_humidity, excluded.min_humidity),
+        max_humidity = MAX(max_humidity, excluded.max_humidity);
+END;
+"""
+
+
+def _compact_observations(conn):
+    for script in (COMPACT_TABLES_SQL, COMPACT_COPY_SQL):
+        for statement in _split_sql(script):
+            conn.execute(statement)
+
+    history, observations = conn.execute(
+        "SELECT (SELECT COUNT(*) FROM weather_history),"
+        " (SELECT COUNT(*) FROM weather_observations)"
+    ).fetchone()
+    if history != observations:
+        logger.warning(
+            f"{history - observations} legacy snapshots collided on "
+            f"(city, api_epoch) and were dropped"
+        )
+
+    for statement in _split_sql(COMPACT_VIEW_SQL):
+        conn.execute(statement)
+
+    logger.info("Compact storage in place; run VACUUM to reclaim the old table's pages")
+
+
+# --------------------------------------------------
+# 8. Feature store
+# --------------------------------------------------
+# Feature columns are added by database/feature_store.py from its
+# registry; feature_registry records the definition each was built with.
+FEATURE_STORE_SQL = """
+CREATE TABLE IF NOT EXISTS daily_features (
+    city TEXT NOT NULL,
+    date TEXT NOT NULL,
+    avg_temperature REAL,
+    min_temperature REAL,
+    max_temperature REAL,
+    avg_humidity REAL,
+    PRIMARY KEY (city, date)
+);
+
+CREATE TABLE IF NOT EXISTS feature_registry (
+    name TEXT PRIMARY KEY,
+    definition TEXT NOT NULL
+);
+"""
+
+# --------------------------------------------------
+# 9. Streaming anomaly state
+# --------------------------------------------------
+# One row per (stream, city) for analysis/streaming_anomalies.py: the
+# last value scored plus running Welford (n, mean, m2) and exponentially
+# weighted (ew_mean, ew_var) statistics of its changes.
+ANOMALY_STATE_SQL = """
+CREATE TABLE IF NOT EXISTS anomaly_state (
+    stream TEXT NOT NULL,
+    city TEXT NOT NULL,
+    last_key TEXT NOT NULL,
+    last_value REAL NOT NULL,
+    n INTEGER NOT NULL,
+    mean REAL NOT NULL,
+    m2 REAL NOT NULL,
+    ew_mean REAL,
+    ew_var REAL,
+    PRIMARY KEY (stream, city)
+);
+"""
+
+# --------------------------------------------------
+# 10. Ingest-time validation
+# --------------------------------------------------
+# Snapshots rejected by ingestion/validation.py are kept (as the
+# cleaned record, JSON) with the reasons instead of being written to
+# weather_observations; validation_state holds the per-city statistics
+# the outlier check scores the next snapshot against.
+VALIDATION_SQL = """
+CREATE TABLE IF NOT EXISTS quarantined_observations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    city TEXT NOT NULL,
+    api_epoch INTEGER,
+    fetched_epoch INTEGER,
+    reasons TEXT NOT NULL,
+    record TEXT NOT NULL,
+    UNIQUE(city, api_epoch)
+);
+
+CREATE TABLE IF NOT EXISTS validation_state (
+    city TEXT PRIMARY KEY,
+    last_epoch INTEGER NOT NULL,
+    last_temperature REAL NOT NULL,
+    n INTEGER NOT NULL,
+    ew_mean REAL,
+    ew_var REAL,
+    rejections INTEGER NOT NULL,
+    rejected_epoch INTEGER
+);
+"""
+
+# --------------------------------------------------
+# 11. Cross-city correlations
+# --------------------------------------------------
+# analysis/correlation.py folds closed days into its co-moment state by
+# date range, and persists each city's top-k most correlated neighbours.
+CORRELATION_SQL = """
+CREATE INDEX IF NOT EXISTS idx_daily_summary_date
+    ON weather_daily_summary (date);
+
+CREATE TABLE IF NOT EXISTS city_neighbors (
+    metric TEXT NOT NULL,
+    city TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    neighbor TEXT NOT NULL,
+    correlation REAL NOT NULL,
+    days INTEGER NOT NULL,
+    PRIMARY KEY (metric, city, rank)
+);
+"""
+
+# --------------------------------------------------
+# 12. Pipeline runner state
+# --------------------------------------------------
+# run_pipeline.py skips a stage while its input fingerprint matches the
+# one recorded after its last successful run.
+PIPELINE_STAGES_SQL = """
+CREATE TABLE IF NOT EXISTS pipeline_stages (
+    name TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    seconds REAL NOT NULL
+);
+"""
+
+# --------------------------------------------------
+# 13. Historical backfill checkpoints
+# --------------------------------------------------
+# ingestion/backfill_weather.py records every (city, date) it has
+# written from the provider's history endpoint, so an interrupted
+# backfill resumes with the days still missing.
+BACKFILL_SQL = """
+CREATE TABLE IF NOT EXISTS backfill_progress (
+    city TEXT NOT NULL,
+    date TEXT NOT NULL,
+    hours INTEGER NOT NULL,
+    finished_at TEXT NOT NULL,
+    PRIMARY KEY (city, date)
+);
+"""
+
+
+MIGRATIONS = [
+    (1, "base tables", BASE_TABLES_SQL),
+    (2, "weather_history analytical indexes", HISTORY_INDEXES_SQL),
+    (3, "pipeline watermarks", WATERMARKS_SQL),
+    (4, "trigger-maintained hourly rollup", _hourly_rollup),
+    (5, "multi-resolution rollups", _multi_resolution_rollups),
+    (6, "local time keys and epoch timestamps", _local_time_keys),
+    (7, "compact observation storage", _compact_observations),
+    (8, "daily feature store", FEATURE_STORE_SQL),
+    (9, "streaming anomaly state", ANOMALY_STATE_SQL),
+    (10, "ingest-time validation", VALIDATION_SQL),
+    (11, "cross-city correlations", CORRELATION_SQL),
+    (12, "pipeline runner state", PIPELINE_STAGES_SQL),
+    (13, "historical backfill checkpoints", BACKFILL_SQL),
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn):
+    """Bring the database up to the latest schema version."""
+    current = schema_version(conn)
+    applied = 0
+
+    for version, name, step in MIGRATIONS:
+        if version <= current:
+            continue
+
+        conn.execute("BEGIN")
+        try:
+            if callable(step):
+                step(conn)
+            else:
+                for statement in _split_sql(step):
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        applied += 1
+        logger.info(f"Applied migration {version}: {name}")
+
+    if applied:
+        # Refresh planner statistics for the new indexes
+        conn.execute("PRAGMA optimize")
+
+    return applied
+
+
+def _split_sql(script):
+    """Split a migration script into complete statements."""
+    statements = []
+    buffer = ""
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip():
+                statements.append(buffer.strip())
+            buffer = ""
+    return statements
@@ -0,0 +1,177 @@
+"""Analytical SQL shipped with the pipeline.
+
+Scripts import their queries from here so that
+database/check_query_plans.py can prove, with EXPLAIN QUERY PLAN, that
+each one is served by an index from database/migrations.py.
+
+Hot aggregations read weather_observations joined to locations directly;
+the weather_history compatibility view is only used where the full
+legacy column shape is wanted.
+"""
+
+# export_weather_history.py
+# Both are bounded by the max id seen when the export started, so rows
+# landing mid-export are left for the next run.
+EXPORT_HISTORY = """
+SELECT *
+FROM weather_history
+WHERE id <= :until
+ORDER BY fetched_epoch
+"""
+
+# --since-last: rows added after the previous delta export
+EXPORT_DELTA = """
+SELECT *
+FROM weather_history
+WHERE id > :since AND id <= :until
+ORDER BY id
+"""
+
+# Integer YYYYMMDD local_date -> 'YYYY-MM-DD', applied once per group
+def local_date_iso(column="local_date"):
+    return f"printf('%04d-%02d-%02d', {column} / 10000, {column} / 100 % 100, {column} % 100)"
+
+
+# database/check_history_coverage.py (per city-local day)
+HISTORY_COVERAGE = f"""
+SELECT
+  l.city,
+  {local_date_iso("o.local_date")} AS date,
+  COUNT(*) AS records
+FROM weather_observations o
+JOIN locations l ON l.id = o.location_id
+GROUP BY l.city, o.local_date
+ORDER BY l.city, o.local_date;
+"""
+
+# database/check_city_ranges.py
+CITY_RANGES = """
+SELECT
+  l.city,
+  MIN(o.temperature_c) AS min_temp,
+  MAX(o.temperature_c) AS max_temp,
+  AVG(o.temperature_c) AS avg_temp,
+  COUNT(*) AS records
+FROM weather_observations o
+JOIN locations l ON l.id = o.location_id
+GROUP BY l.city
+"""
+
+# analysis/build_daily_summary.py (database/rollups.py)
+# Temp driver table holding the (city, date) buckets touched by new
+# history rows; coarser tiers derive their touched buckets from it.
+CREATE_TOUCHED_DAYS = """
+CREATE TEMP TABLE IF NOT EXISTS touched_days (
+    city TEXT NOT NULL,
+    date TEXT NOT NULL,
+    PRIMARY KEY (city, date)
+) WITHOUT ROWID
+"""
+
+COLLECT_TOUCHED_DAYS = f"""
+INSERT OR IGNORE INTO touched_days
+SELECT l.city, {local_date_iso("o.local_date")}
+FROM weather_observations o
+JOIN locations l ON l.id = o.location_id
+WHERE o.id > :since AND o.id <= :until
+"""
+
+# analysis/build_hourly_summary.py (--full / --verify)
+# Incremental maintenance happens in the weather_observations insert
+# trigger (database/migrations.py); this is the from-scratch equivalent
+# for local days >= :from_date (older raw rows may have been archived).
+HOURLY_SELECT = f"""
+SELECT
+    l.city,
+    {local_date_iso("o.local_date")} AS date,
+    o.local_hour AS hour,
+    AVG(o.temperature_c) AS avg_temperature,
+    MIN(o.temperature_c) AS min_temperature,
+    MAX(o.temperature_c) AS max_temperature,
+    AVG(o.humidity) AS avg_humidity,
+    COUNT(*) AS record_count,
+    SUM(o.temperature_c) AS sum_temperature,
+    SUM(o.humidity) AS sum_humidity,
+    SUM(o.temperature_c * o.temperature_c) AS sumsq_temperature,
+    SUM(o.humidity * o.humidity) AS sumsq_humidity,
+    MIN(o.humidity) AS min_humidity,
+    MAX(o.humidity) AS max_humidity
+FROM weather_observations o
+JOIN locations l ON l.id = o.location_id
+WHERE o.local_date >= :from_date
+GROUP BY l.city, o.local_date, o.local_hour
+"""
+
+HOURLY_COLUMNS = """
+    city, date, hour,
+    avg_temperature, min_temperature, max_temperature,
+    avg_humidity, record_count,
+    sum_temperature, sum_humidity,
+    sumsq_temperature, sumsq_humidity,
+    min_humidity, max_humidity
+"""
+
+HOURLY_AGGREGATION = f"""
+INSERT OR REPLACE INTO weather_hourly_summary ({HOURLY_COLUMNS})
+{HOURLY_SELECT}
+"""
+
+# analysis/streaming_anomalies.py
+# One city's daily values after the last one scored (PRIMARY KEY seek)
+DAILY_VALUES_AFTER = """
+SELECT date, avg_temperature
+FROM weather_daily_summary
+WHERE city = :city AND date > :after
+ORDER BY date
+"""
+
+# Raw snapshots added since the previous streaming run
+SNAPSHOT_VALUES = """
+SELECT l.city, o.api_epoch, o.temperature_c
+FROM weather_observations o
+JOIN locations l ON l.id = o.location_id
+WHERE o.id > :since AND o.id <= :until
+ORDER BY o.id
+"""
+
+# analysis/correlation.py
+# Closed days not yet folded into the co-moment state (date index)
+DAILY_METRICS_BETWEEN = """
+SELECT date, city, avg_temperature, avg_humidity
+FROM weather_daily_summary
+WHERE date > :after AND date < :before
+"""
+
+# First day a reporting city may still be filling: the earliest of each
+# city's latest day. Cities whose latest day is more than :max_lag
+# behind the newest have stopped reporting and do not hold it back.
+OPEN_DAILY_DATE = """
+WITH latest AS (
+    SELECT city, MAX(date) AS date
+    FROM weather_daily_summary
+    GROUP BY city
+)
+SELECT MIN(date)
+FROM latest
+WHERE date >= DATE((SELECT MAX(date) FROM latest), :max_lag)
+"""
+
+# Run before EXPLAIN so queries over temp tables can be planned
+PLAN_SETUP = [CREATE_TOUCHED_DAYS]
+
+# Small temp driver tables that are expected to be scanned
+PLAN_DRIVER_TABLES = {"touched_days", "touched_weekly", "touched_monthly"}
+
+# Queries that must be index-backed (see check_query_plans.py)
+SHIPPED_QUERIES = {
+    "export_history": EXPORT_HISTORY,
+    "export_delta": EXPORT_DELTA,
+    "history_coverage": HISTORY_COVERAGE,
+    "city_ranges": CITY_RANGES,
+    "collect_touched_days": COLLECT_TOUCHED_DAYS,
+    "hourly_aggregation": HOURLY_AGGREGATION,
+    "daily_values_after": DAILY_VALUES_AFTER,
+    "snapshot_values": SNAPSHOT_VALUES,
+    "daily_metrics_between": DAILY_METRICS_BETWEEN,
+    "open_daily_date": OPEN_DAILY_DATE,
+}
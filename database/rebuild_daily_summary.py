@@ -1,12 +1,18 @@
-import sqlite3
 import pandas as pd
 
-DB_PATH = "database/weather.db"
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import get_connection
+from database.migrations import apply_migrations
+from database.rollups import build_rollups, tier_index_sql, tier_table_sql
 
 # --------------------------------------------------
 # Connect to database
 # --------------------------------------------------
-conn = sqlite3.connect(DB_PATH)
+conn = get_connection()
 
 # --------------------------------------------------
 # 1. Drop existing daily summary (important)
@@ -17,25 +23,14 @@ conn.commit()
 print("🗑️ Old weather_daily_summary dropped")
 
 # --------------------------------------------------
-# 2. Rebuild daily summary from raw history
-# --------------------------------------------------
-query = """
-CREATE TABLE weather_daily_summary AS
-SELECT
-    city,
-    DATE(fetched_at_utc) AS date,
-    AVG(temperature_c) AS avg_temperature,
-    MIN(temperature_c) AS min_temperature,
-    MAX(temperature_c) AS max_temperature,
-    AVG(humidity) AS avg_humidity,
-    COUNT(*) AS records_count
-FROM weather_history
-GROUP BY city, DATE(fetched_at_utc)
-ORDER BY city, date;
-"""
-
-conn.execute(query)
-conn.commit()
+# 2. Recreate the table and rebuild the rollup tiers
+# (full build also resets the incremental watermark)
+# --------------------------------------------------
+apply_migrations(conn)
+conn.execute(tier_table_sql("daily"))
+for statement in tier_index_sql("daily"):
+    conn.execute(statement)
+build_rollups(conn, full=True)
 
 print("✅ weather_daily_summary rebuilt successfully")
 
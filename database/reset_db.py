@@ -1,10 +1,28 @@
-import sqlite3
+import sys
+from pathlib import Path
 
-conn = sqlite3.connect("database/weather.db")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import get_connection
+
+conn = get_connection()
 cursor = conn.cursor()
 
-cursor.execute("DROP TABLE IF EXISTS weather_history")
-cursor.execute("DROP TABLE IF EXISTS weather_current")
+# Drop every pipeline object (views first; weather_history is a view
+# over weather_observations since migration 7)
+objects = cursor.execute(
+    """
+    SELECT type, name FROM sqlite_master
+    WHERE type IN ('view', 'table') AND name NOT LIKE 'sqlite_%'
+    ORDER BY type = 'table'
+    """
+).fetchall()
+
+for object_type, name in objects:
+    cursor.execute(f"DROP {object_type.upper()} IF EXISTS {name}")
+
+# Let database/migrations.py recreate the schema on next connect
+cursor.execute("PRAGMA user_version = 0")
 
 conn.commit()
 conn.close()
@@ -0,0 +1,169 @@
+"""Retention policy for raw observations.
+
+Raw snapshots older than `retention.raw_days` local days are deleted
+from weather_observations, so the table (and every scan over it) stops
+growing. The downsampled tiers keep the history: rollups are brought up
+to date first, and only rows they have already consumed are pruned.
+Summary tables are never pruned.
+
+Deletes run in bounded batches, one short transaction each, so the
+ingester is never locked out for long. Freed pages are then returned
+with PRAGMA incremental_vacuum. Databases created before auto_vacuum
+was enabled need a single full VACUUM first:
+
+    python database/retention.py --enable-incremental-vacuum
+
+Move rows to the archive tier (database/archive.py) first if they
+should be kept outside SQLite.
+"""
+
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import CONFIG_PATH, get_connection
+from database.migrations import apply_migrations
+from database.rollups import ROLLUP_WATERMARK, build_rollups
+from database.watermarks import RAW_HISTORY_FROM, get_watermark, set_watermark
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    "raw_days": None,          # keep raw snapshots forever
+    "delete_batch_size": 5000,
+    "vacuum_pages": 0,         # 0 = every free page
+}
+
+INCREMENTAL = 2  # PRAGMA auto_vacuum value
+
+# Index seek on (location_id, local_date, ...); the rowid is in the index
+PRUNE_BATCH_SQL = """
+DELETE FROM weather_observations
+WHERE id IN (
+    SELECT id
+    FROM weather_observations
+    WHERE location_id = :location_id
+      AND local_date < :before
+      AND id <= :rolled_up
+    LIMIT :batch_size
+)
+"""
+
+
+def load_retention_settings(config_path=CONFIG_PATH):
+    settings = dict(DEFAULT_SETTINGS)
+
+    if os.path.exists(config_path):
+        with open(config_path, "r") as file:
+            config = yaml.safe_load(file) or {}
+        settings.update(config.get("retention") or {})
+
+    return settings
+
+
+def plan_queries():
+    """Retention statements, for check_query_plans.py."""
+    return [], {"retention_prune_batch": PRUNE_BATCH_SQL}
+
+
+def prune_history(conn, raw_days, batch_size=5000, today=None):
+    """
+    Delete raw observations older than `raw_days` local days, at most
+    `batch_size` rows per transaction. Returns the number deleted.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    cutoff = today - timedelta(days=raw_days)
+    before = cutoff.year * 10000 + cutoff.month * 100 + cutoff.day
+
+    # Only rows the rollups have already seen may be pruned
+    build_rollups(conn)
+    rolled_up = get_watermark(conn, ROLLUP_WATERMARK)
+
+    location_ids = [row[0] for row in conn.execute("SELECT id FROM locations")]
+
+    deleted = 0
+    for location_id in location_ids:
+        while True:
+            with conn:
+                batch = conn.execute(PRUNE_BATCH_SQL, {
+                    "location_id": location_id,
+                    "before": before,
+                    "rolled_up": rolled_up,
+                    "batch_size": batch_size,
+                }).rowcount
+            deleted += batch
+            if batch < batch_size:
+                break
+
+    with conn:
+        if before > get_watermark(conn, RAW_HISTORY_FROM):
+            set_watermark(conn, RAW_HISTORY_FROM, before)
+
+    return deleted
+
+
+def incremental_vacuum(conn, pages=0):
+    """
+    Return up to `pages` free pages (0 = all) to the filesystem.
+    Returns the number of pages released, or None when the database
+    is not in incremental auto_vacuum mode.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != INCREMENTAL:
+        return None
+
+    free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    # Frees one page per step; executescript steps it to completion
+    conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+    free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    return free_before - free_after
+
+
+def enable_incremental_vacuum(conn):
+    """Switch an existing database to incremental auto_vacuum (full VACUUM)."""
+    conn.execute("PRAGMA auto_vacuum = incremental")
+    conn.execute("VACUUM")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    settings = load_retention_settings()
+
+    parser = argparse.ArgumentParser(description="Prune raw observations past retention")
+    parser.add_argument("--raw-days", type=int, default=settings["raw_days"],
+                        help="keep this many local days of raw rows (default from config)")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="one-off full VACUUM to switch an existing file to incremental mode")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    apply_migrations(conn)
+
+    if args.enable_incremental_vacuum:
+        enable_incremental_vacuum(conn)
+        print("✅ Incremental auto_vacuum enabled")
+
+    if args.raw_days is None:
+        print("ℹ️ retention.raw_days is not set — raw snapshots are kept forever")
+    else:
+        deleted = prune_history(conn, args.raw_days, settings["delete_batch_size"])
+        print(f"🗑️ Pruned {deleted} raw observations older than {args.raw_days} days")
+
+    freed = incremental_vacuum(conn, settings["vacuum_pages"])
+    conn.close()
+
+    if freed is None:
+        print(
+            "⚠️ Database is not in incremental auto_vacuum mode; run with "
+            "--enable-incremental-vacuum once to reclaim space"
+        )
+    else:
+        print(f"✅ Returned {freed} free pages to the filesystem")
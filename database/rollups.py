@@ -0,0 +1,383 @@
+"""Multi-resolution rollup engine.
+
+Tiers, finest first:
+
+    raw weather_observations
+      └─ hourly   weather_hourly_summary   (insert trigger, from raw rows)
+          └─ daily    weather_daily_summary    (from hourly)
+              ├─ weekly   weather_weekly_summary   (from daily, Monday weeks)
+              └─ monthly  weather_monthly_summary  (from daily)
+
+Every tier stores mergeable partial aggregates per metric — count, sum,
+sum of squares, min, max — so a coarser bucket is computed by merging
+finer buckets, never by touching raw rows. avg and (sample) stddev are
+derived from the partials. Months are built from days rather than weeks
+because weeks straddle month boundaries.
+
+Incremental builds start from the (city, date) buckets touched by
+weather_observations rows newer than the `daily_summary` watermark, and
+propagate them up through the tiers. The hourly tier is maintained row
+by row by the insert trigger; rebuild_hourly_summary() and
+verify_hourly_summary() are its full rebuild and consistency check.
+"""
+
+from database.queries import (
+    COLLECT_TOUCHED_DAYS,
+    CREATE_TOUCHED_DAYS,
+    HOURLY_AGGREGATION,
+    HOURLY_SELECT,
+    local_date_iso,
+)
+from database.watermarks import (
+    RAW_HISTORY_FROM,
+    get_watermark,
+    max_history_id,
+    set_watermark,
+)
+
+ROLLUP_WATERMARK = "daily_summary"
+
+# (summary column stem, weather_observations column)
+METRICS = [
+    ("temperature", "temperature_c"),
+    ("humidity", "humidity"),
+]
+
+# --------------------------------------------------
+# Tier definitions
+# --------------------------------------------------
+# source       tier the buckets are merged from
+# bucket       key column next to city
+# bucket_expr  maps a source `date` to this tier's bucket key
+# bucket_end   exclusive end of a bucket, for range seeks on the source
+# indexes      secondary indexes, {name: columns}, recreated with the table
+TIERS = {
+    "hourly": {
+        "table": "weather_hourly_summary",
+        "bucket": "date",  # plus `hour`
+    },
+    "daily": {
+        "table": "weather_daily_summary",
+        "bucket": "date",
+        "source": "hourly",
+        "bucket_expr": "{date}",
+        "bucket_end": None,  # equality on date
+        # Date-range reads across cities (DAILY_METRICS_BETWEEN)
+        "indexes": {"idx_daily_summary_date": "date"},
+    },
+    "weekly": {
+        "table": "weather_weekly_summary",
+        "bucket": "week_start",
+        "source": "daily",
+        "bucket_expr": "DATE({date}, '-6 days', 'weekday 1')",
+        "bucket_end": "DATE({bucket}, '+7 days')",
+    },
+    "monthly": {
+        "table": "weather_monthly_summary",
+        "bucket": "month_start",
+        "source": "daily",
+        "bucket_expr": "DATE({date}, 'start of month')",
+        "bucket_end": "DATE({bucket}, '+1 month')",
+    },
+}
+
+# Build order for the derived tiers
+DERIVED_TIERS = ["daily", "weekly", "monthly"]
+
+
+def tier_table_sql(name):
+    """Current DDL for a derived tier table."""
+    tier = TIERS[name]
+    metric_columns = "".join(
+        f"""
+    avg_{m} REAL,
+    min_{m} REAL,
+    max_{m} REAL,
+    std_{m} REAL,
+    sum_{m} REAL,
+    sumsq_{m} REAL,"""
+        for m, _ in METRICS
+    )
+    return f"""
+CREATE TABLE IF NOT EXISTS {tier['table']} (
+    city TEXT NOT NULL,
+    {tier['bucket']} TEXT NOT NULL,{metric_columns}
+    record_count INTEGER,
+    PRIMARY KEY (city, {tier['bucket']})
+)
+"""
+
+
+def tier_index_sql(name):
+    """CREATE INDEX statements for a derived tier table's secondary indexes."""
+    tier = TIERS[name]
+    return [
+        f"CREATE INDEX IF NOT EXISTS {index} ON {tier['table']} ({columns})"
+        for index, columns in tier.get("indexes", {}).items()
+    ]
+
+
+# --------------------------------------------------
+# SQL generation
+# --------------------------------------------------
+def _merge_columns(alias):
+    """Merge partial aggregates of the source rows `alias`."""
+    parts = [f"SUM({alias}.record_count) AS record_count"]
+    for m, _ in METRICS:
+        parts += [
+            f"SUM({alias}.sum_{m}) AS sum_{m}",
+            f"SUM({alias}.sumsq_{m}) AS sumsq_{m}",
+            f"MIN({alias}.min_{m}) AS min_{m}",
+            f"MAX({alias}.max_{m}) AS max_{m}",
+        ]
+    return ",\n        ".join(parts)
+
+
+def _finalize_columns():
+    """Derive avg / sample stddev from merged partials."""
+    parts = ["record_count"]
+    for m, _ in METRICS:
+        parts += [
+            f"sum_{m}", f"sumsq_{m}", f"min_{m}", f"max_{m}",
+            f"sum_{m} * 1.0 / record_count AS avg_{m}",
+            f"""CASE WHEN record_count > 1 THEN
+            SQRT(MAX((sumsq_{m} - sum_{m} * sum_{m} * 1.0 / record_count)
+                     / (record_count - 1), 0))
+        END AS std_{m}""",
+        ]
+    return ",\n    ".join(parts)
+
+
+def _output_columns():
+    columns = ["record_count"]
+    for m, _ in METRICS:
+        columns += [f"sum_{m}", f"sumsq_{m}", f"min_{m}", f"max_{m}", f"avg_{m}", f"std_{m}"]
+    return columns
+
+
+def _insert(tier, merged_select):
+    columns = ", ".join(["city", tier["bucket"]] + _output_columns())
+    return f"""
+INSERT OR REPLACE INTO {tier['table']} ({columns})
+SELECT city, bucket, {", ".join(_output_columns())}
+FROM (
+    SELECT
+        city, bucket,
+    {_finalize_columns()}
+    FROM ({merged_select})
+)
+"""
+
+
+def full_rollup_sql(name):
+    """Rebuild a whole tier from the tier below."""
+    tier = TIERS[name]
+    source = TIERS[tier["source"]]
+    bucket = tier["bucket_expr"].format(date="s.date")
+
+    merged = f"""
+    SELECT
+        s.city AS city,
+        {bucket} AS bucket,
+        {_merge_columns("s")}
+    FROM {source['table']} s
+    GROUP BY s.city, {bucket}
+    """
+    return _insert(tier, merged)
+
+
+def touched_table(name):
+    return "touched_days" if name == "daily" else f"touched_{name}"
+
+
+def touched_column(name):
+    # touched_days (database/queries.py) is keyed on the raw local date
+    return "date" if name == "daily" else "bucket"
+
+
+def create_touched_sql(name):
+    return f"""
+CREATE TEMP TABLE IF NOT EXISTS {touched_table(name)} (
+    city TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    PRIMARY KEY (city, bucket)
+) WITHOUT ROWID
+"""
+
+
+def collect_touched_sql(name):
+    """Derive this tier's touched buckets from the touched days."""
+    tier = TIERS[name]
+    bucket = tier["bucket_expr"].format(date="date")
+    return f"""
+INSERT OR IGNORE INTO {touched_table(name)}
+SELECT city, {bucket}
+FROM touched_days
+"""
+
+
+def touched_rollup_sql(name):
+    """Re-aggregate only touched buckets, one index seek per bucket."""
+    tier = TIERS[name]
+    source = TIERS[tier["source"]]
+    touched = touched_table(name)
+    key = f"{touched}.{touched_column(name)}"
+
+    if tier["bucket_end"] is None:
+        match = f"s.date = {key}"
+    else:
+        end = tier["bucket_end"].format(bucket=key)
+        match = f"s.date >= {key}\n       AND s.date < {end}"
+
+    # CROSS JOIN keeps the small touched table as the outer loop
+    merged = f"""
+    SELECT
+        {touched}.city AS city,
+        {key} AS bucket,
+        {_merge_columns("s")}
+    FROM {touched}
+    CROSS JOIN {source['table']} s
+        ON s.city = {touched}.city
+       AND {match}
+    GROUP BY {touched}.city, {key}
+    """
+    return _insert(tier, merged)
+
+
+def plan_queries():
+    """Incremental rollup statements, for check_query_plans.py."""
+    setup = [create_touched_sql(name) for name in DERIVED_TIERS if name != "daily"]
+    queries = {}
+    for name in DERIVED_TIERS:
+        if name != "daily":
+            queries[f"collect_touched_{name}"] = collect_touched_sql(name)
+        queries[f"{name}_rollup_touched"] = touched_rollup_sql(name)
+    return setup, queries
+
+
+# --------------------------------------------------
+# Build
+# --------------------------------------------------
+def build_rollups(conn, full=False):
+    """
+    Bring the daily, weekly and monthly tiers up to date from the
+    hourly tier. Returns ({tier: buckets_rebuilt}, watermark); bucket
+    counts are None for a full build.
+    """
+    conn.execute(CREATE_TOUCHED_DAYS)
+    for name in DERIVED_TIERS:
+        if name != "daily":
+            conn.execute(create_touched_sql(name))
+
+    counts = {}
+
+    # One write transaction: all tiers and the watermark advance together
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        until = max_history_id(conn)
+
+        for name in DERIVED_TIERS:
+            conn.execute(f"DELETE FROM {touched_table(name)}")
+
+        if full:
+            for name in DERIVED_TIERS:
+                conn.execute(f"DELETE FROM {TIERS[name]['table']}")
+                conn.execute(full_rollup_sql(name))
+                counts[name] = None
+        else:
+            since = get_watermark(conn, ROLLUP_WATERMARK)
+            conn.execute(COLLECT_TOUCHED_DAYS, {"since": since, "until": until})
+
+            for name in DERIVED_TIERS:
+                if name != "daily":
+                    conn.execute(collect_touched_sql(name))
+
+                counts[name] = conn.execute(
+                    f"SELECT COUNT(*) FROM {touched_table(name)}"
+                ).fetchone()[0]
+
+                if counts[name]:
+                    conn.execute(touched_rollup_sql(name))
+
+        set_watermark(conn, ROLLUP_WATERMARK, until)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return counts, until
+
+
+# --------------------------------------------------
+# Hourly tier
+# --------------------------------------------------
+def _raw_history_from(conn):
+    """(local_date, 'YYYY-MM-DD') of the first day with complete raw rows."""
+    from_date = get_watermark(conn, RAW_HISTORY_FROM)
+    from_iso = conn.execute(f"SELECT {local_date_iso(':d')}", {"d": from_date}).fetchone()[0]
+    return from_date, from_iso
+
+
+def rebuild_hourly_summary(conn):
+    """
+    Re-aggregate weather_hourly_summary from raw history. Buckets for
+    days whose raw rows were archived or pruned are kept as they are.
+    """
+    from_date, from_iso = _raw_history_from(conn)
+    with conn:
+        conn.execute("DELETE FROM weather_hourly_summary WHERE date >= ?", (from_iso,))
+        conn.execute(HOURLY_AGGREGATION, {"from_date": from_date})
+
+
+def verify_hourly_summary(conn, tolerance=1e-6):
+    """
+    Compare the trigger-maintained hourly table with a from-scratch
+    aggregation, over the days that still have raw rows. Returns a list
+    of (city, date, hour, problem) tuples; empty means they match.
+    """
+    from_date, from_iso = _raw_history_from(conn)
+
+    conn.execute("DROP TABLE IF EXISTS temp.hourly_expected")
+    conn.execute(
+        f"CREATE TEMP TABLE hourly_expected AS {HOURLY_SELECT}", {"from_date": from_date}
+    )
+
+    mismatches = conn.execute(
+        """
+        SELECT e.city, e.date, e.hour, 'missing from incremental table'
+        FROM hourly_expected e
+        LEFT JOIN weather_hourly_summary s
+            ON s.city = e.city AND s.date = e.date AND s.hour = e.hour
+        WHERE s.city IS NULL
+
+        UNION ALL
+
+        SELECT s.city, s.date, s.hour, 'not in history'
+        FROM weather_hourly_summary s
+        LEFT JOIN hourly_expected e
+            ON s.city = e.city AND s.date = e.date AND s.hour = e.hour
+        WHERE e.city IS NULL AND s.date >= :from_iso
+
+        UNION ALL
+
+        SELECT e.city, e.date, e.hour, 'values differ'
+        FROM hourly_expected e
+        JOIN weather_hourly_summary s
+            ON s.city = e.city AND s.date = e.date AND s.hour = e.hour
+        WHERE s.record_count != e.record_count
+           OR s.min_temperature != e.min_temperature
+           OR s.max_temperature != e.max_temperature
+           OR s.min_humidity != e.min_humidity
+           OR s.max_humidity != e.max_humidity
+           OR ABS(s.sum_temperature - e.sum_temperature) > :tol
+           OR ABS(s.sum_humidity - e.sum_humidity) > :tol
+           OR ABS(s.sumsq_temperature - e.sumsq_temperature) > :tol
+           OR ABS(s.sumsq_humidity - e.sumsq_humidity) > :tol
+           OR ABS(s.avg_temperature - e.avg_temperature) > :tol
+           OR ABS(s.avg_humidity - e.avg_humidity) > :tol
+        """,
+        {"tol": tolerance, "from_iso": from_iso}
+    ).fetchall()
+
+    conn.execute("DROP TABLE temp.hourly_expected")
+    return mismatches
@@ -11,21 +11,58 @@ CREATE TABLE IF NOT EXISTS weather_data (
     fetched_at_utc TEXT
 );
 
--- Historical data (append-only)
-CREATE TABLE IF NOT EXISTS weather_history (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    city TEXT NOT NULL,
+-- Dimensions referenced by weather_observations
+CREATE TABLE IF NOT EXISTS locations (
+    id INTEGER PRIMARY KEY,
+    city TEXT NOT NULL UNIQUE,
     region TEXT,
     country TEXT,
+    tz_id TEXT                 -- WeatherAPI location.tz_id
+);
+
+CREATE TABLE IF NOT EXISTS conditions (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL UNIQUE
+);
+
+-- Historical data (append-only, compact)
+CREATE TABLE IF NOT EXISTS weather_observations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    location_id INTEGER NOT NULL REFERENCES locations(id),
+    api_epoch INTEGER NOT NULL,    -- current.last_updated_epoch
+    utc_offset INTEGER NOT NULL,   -- seconds; local time = api_epoch + utc_offset
+    fetched_epoch INTEGER,
+    local_date INTEGER NOT NULL,   -- YYYYMMDD in the city's local time
+    local_hour INTEGER NOT NULL,
     temperature_c REAL,
     humidity INTEGER,
     wind_kph REAL,
-    condition TEXT,
-    api_last_updated TEXT NOT NULL,
-    fetched_at_utc TEXT,
-    UNIQUE(city, api_last_updated)
+    condition_id INTEGER REFERENCES conditions(id),
+    UNIQUE(location_id, api_epoch)
 );
 
+-- Legacy column shape, read-only
+CREATE VIEW IF NOT EXISTS weather_history AS
+SELECT
+    o.id,
+    l.city,
+    l.region,
+    l.country,
+    o.temperature_c,
+    o.humidity,
+    o.wind_kph,
+    c.text AS condition,
+    STRFTIME('%Y-%m-%d %H:%M', o.api_epoch + o.utc_offset, 'unixepoch') AS api_last_updated,
+    STRFTIME('%Y-%m-%dT%H:%M:%S+00:00', o.fetched_epoch, 'unixepoch') AS fetched_at_utc,
+    l.tz_id,
+    o.api_epoch,
+    o.fetched_epoch,
+    o.local_date,
+    o.local_hour
+FROM weather_observations o
+JOIN locations l ON l.id = o.location_id
+LEFT JOIN conditions c ON c.id = o.condition_id;
+
 
 -- Latest snapshot (one row per city)
 CREATE TABLE IF NOT EXISTS weather_current (
@@ -47,6 +84,14 @@ CREATE TABLE IF NOT EXISTS weather_daily_summary (
     min_temperature REAL,
     max_temperature REAL,
     avg_humidity REAL,
+    std_temperature REAL,
+    sum_temperature REAL,
+    sumsq_temperature REAL,
+    min_humidity REAL,
+    max_humidity REAL,
+    std_humidity REAL,
+    sum_humidity REAL,
+    sumsq_humidity REAL,
     record_count INTEGER,
     PRIMARY KEY (city, date)
 );
@@ -61,5 +106,63 @@ CREATE TABLE IF NOT EXISTS weather_hourly_summary (
     max_temperature REAL,
     avg_humidity REAL,
     record_count INTEGER,
+    sum_temperature REAL,
+    sum_humidity REAL,
+    sumsq_temperature REAL,
+    sumsq_humidity REAL,
+    min_humidity REAL,
+    max_humidity REAL,
     PRIMARY KEY (city, date, hour)
 );
+
+-- Coarser rollup tiers (database/rollups.py), merged from the daily tier
+CREATE TABLE IF NOT EXISTS weather_weekly_summary (
+    city TEXT NOT NULL,
+    week_start TEXT NOT NULL,
+    avg_temperature REAL,
+    min_temperature REAL,
+    max_temperature REAL,
+    avg_humidity REAL,
+    std_temperature REAL,
+    sum_temperature REAL,
+    sumsq_temperature REAL,
+    min_humidity REAL,
+    max_humidity REAL,
+    std_humidity REAL,
+    sum_humidity REAL,
+    sumsq_humidity REAL,
+    record_count INTEGER,
+    PRIMARY KEY (city, week_start)
+);
+
+CREATE TABLE IF NOT EXISTS weather_monthly_summary (
+    city TEXT NOT NULL,
+    month_start TEXT NOT NULL,
+    avg_temperature REAL,
+    min_temperature REAL,
+    max_temperature REAL,
+    avg_humidity REAL,
+    std_temperature REAL,
+    sum_temperature REAL,
+    sumsq_temperature REAL,
+    min_humidity REAL,
+    max_humidity REAL,
+    std_humidity REAL,
+    sum_humidity REAL,
+    sumsq_humidity REAL,
+    record_count INTEGER,
+    PRIMARY KEY (city, month_start)
+);
+
+-- Analytical indexes (managed by database/migrations.py)
+CREATE INDEX IF NOT EXISTS idx_observations_fetched_epoch
+    ON weather_observations (fetched_epoch);
+
+CREATE INDEX IF NOT EXISTS idx_observations_location_fetched
+    ON weather_observations (location_id, fetched_epoch, temperature_c);
+
+CREATE INDEX IF NOT EXISTS idx_observations_location_local_hour
+    ON weather_observations (location_id, local_date, local_hour);
+
+CREATE INDEX IF NOT EXISTS idx_daily_summary_date
+    ON weather_daily_summary (date);
@@ -0,0 +1,51 @@
+"""High-water marks for incremental pipeline stages.
+
+A watermark records how far a stage has processed an append-only
+source, usually as the last weather_observations.id it has seen. Stages read
+their watermark, process only newer rows, then advance it in the same
+transaction as their output.
+"""
+
+from datetime import datetime, timezone
+
+# local_date (YYYYMMDD) from which weather_observations still holds
+# every raw row; older days have been archived or pruned. Checks that
+# compare summaries against raw rows only look at days >= this.
+RAW_HISTORY_FROM = "raw_history_from"
+
+# local_date (YYYYMMDD) of the earliest day that gained rows after
+# incremental consumers may already have processed it (a backfill);
+# 0 = none. The correlation engine rebuilds any state covering that day
+# and clears it.
+LATE_DATA_FROM = "late_data_from"
+
+
+def get_watermark(conn, name, default=0):
+    row = conn.execute(
+        "SELECT value FROM pipeline_watermarks WHERE name = ?", (name,)
+    ).fetchone()
+    return row[0] if row else default
+
+
+def set_watermark(conn, name, value):
+    conn.execute(
+        """
+        INSERT INTO pipeline_watermarks (name, value, updated_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET
+            value = excluded.value,
+            updated_at = excluded.updated_at
+        """,
+        (name, value, datetime.now(timezone.utc).isoformat())
+    )
+
+
+def max_history_id(conn):
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM weather_observations").fetchone()[0]
+
+
+def mark_late_data(conn, local_date):
+    """Lower LATE_DATA_FROM to `local_date` (YYYYMMDD)."""
+    current = get_watermark(conn, LATE_DATA_FROM)
+    if not current or local_date < current:
+        set_watermark(conn, LATE_DATA_FROM, local_date)
@@ -1,32 +1,162 @@
-import sqlite3
-import pandas as pd
+import argparse
+import csv
+import gzip
+import io
+import os
 from pathlib import Path
 
+from database.connection import get_connection
+from database.migrations import apply_migrations
+from database.queries import EXPORT_DELTA, EXPORT_HISTORY
+from database.watermarks import RAW_HISTORY_FROM, get_watermark, max_history_id, set_watermark
+
+EXPORT_WATERMARK = "export"
+
+FORMATS = {
+    "csv": ".csv",
+    "csv.gz": ".csv.gz",
+    "csv.zst": ".csv.zst",
+    "parquet": ".parquet",
+}
+
+# --------------------------------------------------
+# Writers
+# Each takes the column names once, then chunks of row tuples, so
+# memory stays flat regardless of history size.
+# --------------------------------------------------
+class CsvExport:
+    def __init__(self, path, columns, compression=None):
+        if compression == "gzip":
+            self.file = gzip.open(path, "wt", newline="", compresslevel=6)
+        elif compression == "zstd":
+            import zstandard  # optional: pip install zstandard
+            raw = zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"))
+            self.file = io.TextIOWrapper(raw, newline="")
+        else:
+            self.file = open(path, "w", newline="")
+
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetExport:
+    def __init__(self, path, columns):
+        import pyarrow as pa  # optional: pip install pyarrow
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.columns = columns
+        self.writer = None
+
+    def write(self, rows):
+        # One row group per chunk; schema comes from the first chunk
+        table = self.pa.Table.from_arrays(
+            [self.pa.array(values) for values in zip(*rows)], names=self.columns
+        )
+        if self.writer is None:
+            # A column that is all NULL in the first chunk has no type yet
+            schema = self.pa.schema([
+                field.with_type(self.pa.string()) if self.pa.types.is_null(field.type) else field
+                for field in table.schema
+            ])
+            self.writer = self.pq.ParquetWriter(self.path, schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_export(path, export_format, columns):
+    if export_format == "parquet":
+        return ParquetExport(path, columns)
+    compression = {"csv.gz": "gzip", "csv.zst": "zstd"}.get(export_format)
+    return CsvExport(path, columns, compression)
+
+
+# --------------------------------------------------
+# Export
+# --------------------------------------------------
+parser = argparse.ArgumentParser(description="Export weather history")
+parser.add_argument("--format", choices=FORMATS, default="csv")
+parser.add_argument("--since-last", action="store_true",
+                    help="only export rows added since the previous --since-last run")
+parser.add_argument("--chunk-size", type=int, default=50000,
+                    help="rows fetched and written per chunk")
+parser.add_argument("--output-dir", default="outputs")
+args = parser.parse_args()
+
 # 1. Paths
-DB_PATH = "database/weather.db"
-OUTPUT_DIR = Path("outputs")
+OUTPUT_DIR = Path(args.output_dir)
 OUTPUT_DIR.mkdir(exist_ok=True)
 
-OUTPUT_FILE = OUTPUT_DIR / "weather_history_latest.csv"
-
 # 2. Connect to database
-conn = sqlite3.connect(DB_PATH)
+conn = get_connection(read_only=True)
+
+until = max_history_id(conn)
 
-# 3. Read full table
-query = """
-SELECT *
-FROM weather_history
-ORDER BY fetched_at_utc
-"""
+if args.since_last:
+    since = get_watermark(conn, EXPORT_WATERMARK)
+    query, params = EXPORT_DELTA, {"since": since, "until": until}
+    OUTPUT_FILE = OUTPUT_DIR / f"weather_history_{since + 1}_{until}{FORMATS[args.format]}"
+else:
+    since = 0
+    query, params = EXPORT_HISTORY, {"until": until}
+    OUTPUT_FILE = OUTPUT_DIR / f"weather_history_latest{FORMATS[args.format]}"
 
-df = pd.read_sql(query, conn)
+if args.since_last and since >= until:
+    conn.close()
+    print(f"✅ Nothing new to export (history id ≤ {until} already exported)")
+    raise SystemExit(0)
 
+# 3. Stream rows in chunks into a temp file, then rename, so a failed
+# run never leaves a truncated export behind
+cursor = conn.execute(query, params)
+columns = [column[0] for column in cursor.description]
+
+tmp_file = OUTPUT_FILE.with_name(OUTPUT_FILE.name + ".tmp")
+export = open_export(tmp_file, args.format, columns)
+
+rows_exported = 0
+try:
+    while True:
+        rows = cursor.fetchmany(args.chunk_size)
+        if not rows:
+            break
+        export.write(rows)
+        rows_exported += len(rows)
+except BaseException:
+    export.close()
+    tmp_file.unlink(missing_ok=True)
+    raise
+
+export.close()
+
+archived_before = get_watermark(conn, RAW_HISTORY_FROM)
 conn.close()
 
-# 4. Save to CSV
-df.to_csv(OUTPUT_FILE, index=False)
+os.replace(tmp_file, OUTPUT_FILE)
+
+# 4. Advance the watermark only once the file is complete
+if args.since_last:
+    writer_conn = get_connection()
+    apply_migrations(writer_conn)
+    with writer_conn:
+        set_watermark(writer_conn, EXPORT_WATERMARK, until)
+    writer_conn.close()
 
 # 5. Confirmation
 print("✅ Fresh weather history exported")
-print(f"📁 Rows exported: {len(df)}")
+print(f"📁 Rows exported: {rows_exported}")
 print(f"📄 File saved as: {OUTPUT_FILE}")
+
+if archived_before:
+    print(f"ℹ️ Days before local date {archived_before} live in the archive tier (database/archive.py)")
@@ -0,0 +1,281 @@
+"""Backfill hourly history from the provider's history endpoint.
+
+    python ingestion/backfill_weather.py                          # last 30 days, every city
+    python ingestion/backfill_weather.py --city Kochi --start 2025-01-01 --end 2025-06-30
+    python ingestion/backfill_weather.py --chunk-days 7 --workers 16
+
+Each city's date range is split into chunks of at most `--chunk-days`
+days (one history.json request each; the provider allows 30), fetched
+concurrently on a worker pool through the same pooled, rate-limited
+client as fetch_weather.py. Every hour is cleaned like a live snapshot
+(clean_weather) and written with write_batch — ON CONFLICT DO NOTHING
+on (location, api_epoch), so overlap with live data or with an earlier
+run never duplicates a row — one transaction per
+`ingestion.write_batch_size` records. Days before the raw_history_from
+watermark are never fetched: their raw rows were archived or pruned, so
+the conflict check cannot see them while the rollups already count them.
+
+Days are recorded in backfill_progress once their rows are committed,
+so an interrupted backfill resumes with the days still missing (--force
+fetches them again). Days the provider has no data for are recorded
+with 0 hours. Backfilled rows skip ingest-time validation, whose
+statistics follow the live stream in order, and never touch
+weather_current. The rollups pick them up on their next build; the
+earliest day written is recorded in the late_data_from watermark, so a
+correlation state that already folded it in is rebuilt on its next
+refresh.
+"""
+
+import argparse
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import get_connection
+from database.migrations import apply_migrations
+from database.watermarks import RAW_HISTORY_FROM, get_watermark, mark_late_data
+from fetch_weather import clean_weather, ingestion_settings, load_config, make_client
+from weather_client import MAX_HISTORY_DAYS
+from writer import write_batch
+
+logger = logging.getLogger(__name__)
+
+RECORD_PROGRESS_SQL = """
+INSERT OR REPLACE INTO backfill_progress (city, date, hours, finished_at)
+VALUES (?, ?, ?, ?)
+"""
+
+
+# --------------------------------------------------
+# Planning
+# --------------------------------------------------
+def raw_history_from(conn):
+    """First day weather_observations still holds in full; None if nothing was archived or pruned."""
+    value = get_watermark(conn, RAW_HISTORY_FROM)
+    if not value:
+        return None
+    return date(value // 10000, value // 100 % 100, value % 100)
+
+
+def plan_chunks(conn, cities, start, end, chunk_days, force=False):
+    """
+    [(city, first day, last day)] covering every day in start .. end
+    not yet in backfill_progress, runs of missing days split into
+    chunks of at most `chunk_days`. Days before raw_history_from are
+    left out, --force or not.
+    """
+    floor = raw_history_from(conn)
+    if floor and start < floor:
+        start = floor
+
+    done = set()
+    if not force:
+        done = set(conn.execute(
+            "SELECT city, date FROM backfill_progress WHERE date BETWEEN ? AND ?",
+            (start.isoformat(), end.isoformat()),
+        ))
+
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    chunks = []
+    for city in cities:
+        chunk = []
+        for day in days:
+            if (city, day.isoformat()) in done:
+                if chunk:
+                    chunks.append((city, chunk[0], chunk[-1]))
+                chunk = []
+                continue
+            chunk.append(day)
+            if len(chunk) == chunk_days:
+                chunks.append((city, chunk[0], chunk[-1]))
+                chunk = []
+        if chunk:
+            chunks.append((city, chunk[0], chunk[-1]))
+
+    return chunks
+
+
+# --------------------------------------------------
+# Cleaning
+# --------------------------------------------------
+def history_records(city, data):
+    """Cleaned snapshot records for every hour of a history payload."""
+    location = data.get("location", {})
+    records = []
+
+    for forecast_day in data.get("forecast", {}).get("forecastday", []):
+        for hour in forecast_day.get("hour", []):
+            # Shaped like a current-conditions payload, so the live cleaning applies
+            current = dict(hour, last_updated=hour.get("time", ""),
+                           last_updated_epoch=hour.get("time_epoch"))
+            record = clean_weather(city, {"location": location, "current": current})
+            if record["api_epoch"] is not None and record["api_last_updated"]:
+                records.append(record)
+
+    return records
+
+
+# --------------------------------------------------
+# Backfill loop
+# Chunks are fetched concurrently; records are written here on the
+# main thread, the single DB writer.
+# --------------------------------------------------
+def backfill(conn, client, executor, chunks, write_batch_size=500):
+    """
+    Fetch and write `chunks`. Returns (days recorded, inserted, skipped,
+    failed chunks).
+    """
+    futures = {
+        executor.submit(client.fetch_history, city, start, end): (city, start, end)
+        for city, start, end in chunks
+    }
+
+    pending, pending_days = [], []
+    totals = {"days": 0, "inserted": 0, "skipped": 0, "failed": 0}
+
+    def flush():
+        if pending:
+            # Before the rows: a crash in between costs a needless rebuild, never a missed one
+            since = min(record["api_last_updated"][:10] for record in pending)
+            with conn:
+                mark_late_data(conn, int(since.replace("-", "")))
+            inserted, skipped = write_batch(conn, pending, update_current=False)
+            totals["inserted"] += inserted
+            totals["skipped"] += skipped
+        # After the rows are committed: a crash in between only refetches
+        # these days, and their rows are skipped as duplicates
+        with conn:
+            conn.executemany(RECORD_PROGRESS_SQL, pending_days)
+        totals["days"] += len(pending_days)
+        pending.clear()
+        pending_days.clear()
+
+    try:
+        for future in as_completed(futures):
+            city, start, end = futures[future]
+            data = future.result()
+            if data is None:
+                totals["failed"] += 1
+                logger.error(f"❌ Failed to fetch history for {city} {start} .. {end}")
+                continue
+
+            records = history_records(city, data)
+            print(f"➡️ {city} {start} .. {end}: {len(records)} hours")
+
+            hours = {}
+            for record in records:
+                local_date = record["api_last_updated"][:10]
+                hours[local_date] = hours.get(local_date, 0) + 1
+
+            finished_at = datetime.now(timezone.utc).isoformat()
+            for i in range((end - start).days + 1):
+                day = (start + timedelta(days=i)).isoformat()
+                pending_days.append((city, day, hours.get(day, 0), finished_at))
+
+            pending.extend(records)
+            if len(pending) >= write_batch_size:
+                flush()
+    finally:
+        # On Ctrl-C: drop queued chunks, keep what was already fetched
+        for future in futures:
+            future.cancel()
+        flush()
+
+    return totals["days"], totals["inserted"], totals["skipped"], totals["failed"]
+
+
+def main():
+    # --------------------------------------------------
+    # Logging configuration
+    # --------------------------------------------------
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(message)s",
+        handlers=[
+            logging.FileHandler("outputs/ingestion.log"),
+            logging.StreamHandler()
+        ]
+    )
+
+    yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+
+    parser = argparse.ArgumentParser(description="Backfill hourly weather history into SQLite")
+    parser.add_argument("--city", action="append", dest="cities", metavar="CITY",
+                        help="city to backfill (repeatable; default: every configured city)")
+    parser.add_argument("--start", type=date.fromisoformat, default=None,
+                        help="first date, YYYY-MM-DD (default: 30 days before --end)")
+    parser.add_argument("--end", type=date.fromisoformat, default=yesterday,
+                        help="last date, YYYY-MM-DD (default: yesterday, UTC)")
+    parser.add_argument("--chunk-days", type=int, default=MAX_HISTORY_DAYS,
+                        help=f"days per history request (max {MAX_HISTORY_DAYS})")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="concurrent requests (default: ingestion.max_workers)")
+    parser.add_argument("--force", action="store_true",
+                        help="refetch days already recorded as backfilled")
+    args = parser.parse_args()
+
+    if args.end > yesterday:
+        # Today is still accumulating; the live ingester covers it
+        print(f"⚠️ --end {args.end} is not complete yet — backfilling through {yesterday}")
+        args.end = yesterday
+    start = args.start or args.end - timedelta(days=MAX_HISTORY_DAYS - 1)
+    if start > args.end:
+        parser.error(f"--start {start} is after --end {args.end}")
+    if not 1 <= args.chunk_days <= MAX_HISTORY_DAYS:
+        parser.error(f"--chunk-days must be between 1 and {MAX_HISTORY_DAYS}")
+
+    config = load_config()
+    settings = ingestion_settings(config)
+    if args.workers:
+        settings["max_workers"] = settings["pool_size"] = args.workers
+    cities = args.cities or config["weatherapi"]["cities"]
+
+    conn = get_connection()
+    apply_migrations(conn)
+
+    floor = raw_history_from(conn)
+    if floor and args.end < floor:
+        conn.close()
+        parser.error(
+            f"{start} .. {args.end} is before {floor}, where raw history was archived "
+            f"or pruned; backfilling it would double-count the rollups"
+        )
+    if floor and start < floor:
+        print(f"⚠️ Raw history before {floor} was archived or pruned — backfilling from {floor}")
+        start = floor
+
+    chunks = plan_chunks(conn, cities, start, args.end, args.chunk_days, args.force)
+    print(
+        f"🕰️ Backfilling {len(cities)} cities, {start} .. {args.end}: "
+        f"{len(chunks)} requests for the days still missing"
+    )
+
+    started = time.perf_counter()
+    client = make_client(config, settings)
+    try:
+        with client, ThreadPoolExecutor(max_workers=settings["max_workers"]) as executor:
+            days, inserted, skipped, failed = backfill(
+                conn, client, executor, chunks, settings["write_batch_size"]
+            )
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrupted — finished days are saved; rerun to resume")
+        sys.exit(130)
+    finally:
+        conn.close()
+
+    print(
+        f"\n🎉 Backfill finished in {time.perf_counter() - started:.1f}s — {days} city-days, "
+        f"{inserted} new snapshots, {skipped} already present"
+    )
+    if failed:
+        print(f"⚠️ {failed} requests failed; rerun to fetch the days still missing")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
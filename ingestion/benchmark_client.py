@@ -0,0 +1,107 @@
+"""Offline throughput benchmark for the WeatherAPI client.
+
+Runs the same city list against the local stub server four ways:
+  1. un-pooled  — requests.get per city (new connection every call)
+  2. pooled     — WeatherAPIClient keep-alive session
+  3. bulk       — WeatherAPIClient bulk requests
+  4. limited    — pooled, through a RateLimiter at --client-rps
+
+With --server-rps the stub throttles like a metered plan (429 +
+Retry-After) and --capacity makes it queue requests beyond that many,
+which shows what the rate limiter saves:
+
+    python ingestion/benchmark_client.py --cities 200 --workers 8
+    python ingestion/benchmark_client.py --server-rps 50 --client-rps 45 --capacity 4
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from stub_server import StubWeatherAPI
+from rate_limiter import RateLimiter
+from weather_client import WeatherAPIClient, MAX_BULK_LOCATIONS
+
+
+def run_unpooled(base_url, cities, workers):
+    def fetch(city):
+        return requests.get(base_url, params={"key": "bench", "q": city}, timeout=10).json()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fetch, cities))
+
+
+def run_pooled(base_url, cities, workers):
+    with WeatherAPIClient(base_url, "bench", pool_size=workers) as client, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(client.fetch_current, cities))
+
+
+def run_bulk(base_url, cities, workers, bulk_size):
+    batches = [cities[i:i + bulk_size] for i in range(0, len(cities), bulk_size)]
+
+    with WeatherAPIClient(base_url, "bench", pool_size=workers) as client, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        return [p for r in executor.map(client.fetch_bulk, batches) for p in r.values()]
+
+
+def run_limited(base_url, cities, workers, rps):
+    limiter = RateLimiter({"requests_per_second": rps, "burst": max(1, int(rps or 1))}, workers)
+
+    with WeatherAPIClient(base_url, "bench", pool_size=workers, limiter=limiter) as client, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(client.fetch_current, cities))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WeatherAPI client modes")
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--bulk-size", type=int, default=MAX_BULK_LOCATIONS)
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="simulated server time per request (s)")
+    parser.add_argument("--connect-latency", type=float, default=0.02,
+                        help="simulated handshake cost per new connection (s)")
+    parser.add_argument("--server-rps", type=float, default=None,
+                        help="stub quota: requests per second before 429 (default: none)")
+    parser.add_argument("--capacity", type=int, default=None,
+                        help="requests the stub serves at once (default: unlimited)")
+    parser.add_argument("--client-rps", type=float, default=None,
+                        help="token bucket rate of the limited mode (default: none)")
+    args = parser.parse_args()
+
+    cities = [f"City {i}" for i in range(args.cities)]
+
+    modes = [
+        ("un-pooled", lambda url: run_unpooled(url, cities, args.workers)),
+        ("pooled", lambda url: run_pooled(url, cities, args.workers)),
+        ("bulk", lambda url: run_bulk(url, cities, args.workers, args.bulk_size)),
+        ("limited", lambda url: run_limited(url, cities, args.workers, args.client_rps)),
+    ]
+
+    print(f"\n📊 {args.cities} cities, {args.workers} workers")
+    print(
+        f"{'mode':<10} {'seconds':>8} {'cities/s':>9} {'requests':>9} "
+        f"{'connections':>12} {'429s':>6} {'failed':>7}"
+    )
+
+    for name, run in modes:
+        with StubWeatherAPI(latency=args.latency, connect_latency=args.connect_latency,
+                            rate_limit=args.server_rps, capacity=args.capacity) as stub:
+            start = time.perf_counter()
+            payloads = run(stub.base_url)
+            elapsed = time.perf_counter() - start
+
+            assert len(payloads) == len(cities)
+            failed = sum(1 for payload in payloads if payload is None or "error" in payload)
+            print(
+                f"{name:<10} {elapsed:>8.2f} {len(cities) / elapsed:>9.1f} "
+                f"{stub.request_count:>9} {stub.connection_count:>12} "
+                f"{stub.throttled_count:>6} {failed:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Offline benchmark for ingest-time validation (ingestion/validation.py).
+
+Builds synthetic cleaned snapshots — per-city random-walk temperatures
+with injected sensor glitches (out-of-range values) and spikes — and
+measures, on a throwaway database:
+
+  1. validate  SnapshotValidator.check() per record, plus its flush
+  2. write     the batched write_batch() of the accepted records
+
+    python ingestion/benchmark_validation.py --cities 500 --snapshots 200
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import get_connection
+from database.migrations import apply_migrations
+from validation import SnapshotValidator
+from writer import write_batch
+
+
+def synthetic_records(cities, snapshots, glitch_rate, seed=0):
+    """Records in fetch order, and the (city, api_epoch) keys made bad."""
+    rng = random.Random(seed)
+    start = 1_767_225_600  # 2026-01-01 00:00 UTC
+    temperatures = {f"City {i}": rng.uniform(0, 30) for i in range(cities)}
+    records, bad = [], set()
+
+    for step in range(snapshots):
+        api_epoch = start + step * 900
+        for city in temperatures:
+            temperatures[city] += rng.gauss(0, 0.3)
+            record = {
+                "city": city, "region": "Region", "country": "Benchland",
+                "temperature_c": round(temperatures[city], 1),
+                "humidity": rng.randint(30, 90),
+                "wind_kph": round(rng.uniform(0, 30), 1),
+                "condition": "Sunny",
+                "api_last_updated": time.strftime("%Y-%m-%d %H:%M", time.gmtime(api_epoch)),
+                "fetched_at_utc": "",
+                "tz_id": "UTC",
+                "api_epoch": api_epoch,
+                "utc_offset": 0,
+                "fetched_epoch": api_epoch,
+                "local_date": int(time.strftime("%Y%m%d", time.gmtime(api_epoch))),
+                "local_hour": time.gmtime(api_epoch).tm_hour,
+            }
+            # Only after warm-up, so the outlier check is armed
+            if step >= 40 and rng.random() < glitch_rate:
+                kind = rng.choice(["humidity", "temperature", "spike"])
+                if kind == "humidity":
+                    record["humidity"] = 150
+                elif kind == "temperature":
+                    record["temperature_c"] = 999.0
+                else:
+                    record["temperature_c"] = round(record["temperature_c"] + rng.choice([-1, 1]) * 20, 1)
+                bad.add((city, api_epoch))
+            records.append(record)
+
+    return records, bad
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingest-time validation")
+    parser.add_argument("--cities", type=int, default=500)
+    parser.add_argument("--snapshots", type=int, default=200,
+                        help="snapshots per city, 15 minutes apart")
+    parser.add_argument("--glitch-rate", type=float, default=0.002)
+    parser.add_argument("--write-batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    records, bad = synthetic_records(args.cities, args.snapshots, args.glitch_rate)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = get_connection(db_path=os.path.join(tmp, "bench.db"))
+        apply_migrations(conn)
+
+        validator = SnapshotValidator(conn)
+        start = time.perf_counter()
+        accepted = [record for record in records if not validator.check(record)]
+        validator.flush()
+        validate_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(0, len(accepted), args.write_batch_size):
+            write_batch(conn, accepted[i:i + args.write_batch_size])
+        write_seconds = time.perf_counter() - start
+
+        quarantined = {
+            tuple(row) for row in conn.execute("SELECT city, api_epoch FROM quarantined_observations")
+        }
+        conn.close()
+
+    per_record = validate_seconds / len(records) * 1e6
+    print(f"\n📊 {len(records)} snapshots ({args.cities} cities × {args.snapshots}), "
+          f"{len(bad)} injected glitches")
+    print(f"{'stage':<10} {'seconds':>8} {'µs/record':>10}")
+    print(f"{'validate':<10} {validate_seconds:>8.3f} {per_record:>10.2f}")
+    print(f"{'write':<10} {write_seconds:>8.3f} {write_seconds / len(accepted) * 1e6:>10.2f}")
+    print(f"\n🚧 Quarantined {len(quarantined)}: {len(quarantined & bad)} injected, "
+          f"{len(quarantined - bad)} false positives, {len(bad - quarantined)} missed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,126 +1,150 @@
-import requests
-import yaml
-import sqlite3
+"""Fetch current weather for every configured city into SQLite.
+
+    python ingestion/fetch_weather.py            # one run (e.g. from a scheduler)
+    python ingestion/fetch_weather.py --daemon   # stay resident and poll
+
+In daemon mode the process keeps its pooled HTTP session and database
+connection open and polls each city once per `scheduler.interval_seconds`,
+with the cities' polls staggered evenly across the interval (plus
+`jitter_seconds` of random offset) so API load stays flat. Once a city
+has answered, its next poll waits for its data's expected refresh
+(ingestion/freshness.py). The city list,
+scheduler settings and rate limits are reloaded whenever config/config.yaml
+changes.
+
+Every request goes through the provider's rate limiter
+(`weatherapi.rate_limit`, see ingestion/rate_limiter.py), and payloads
+repeating a city's last snapshot are dropped before any database write.
+"""
+
+import argparse
+import heapq
 import os
+import random
+import signal
+import threading
+import time
+import yaml
+import sys
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 import logging
-import time
 
-# --------------------------------------------------
-# Logging configuration
-# --------------------------------------------------
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s",
-    handlers=[
-        logging.FileHandler("outputs/ingestion.log"),
-        logging.StreamHandler()
-    ]
-)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.connection import CONFIG_PATH, get_connection
+from database.migrations import apply_migrations
+from weather_client import WeatherAPIClient, MAX_BULK_LOCATIONS
+from rate_limiter import limiter_for, load_rate_limit_settings
+from validation import SnapshotValidator, load_validation_settings
+from freshness import FreshnessTracker
+from writer import BatchWriter
 
 logger = logging.getLogger(__name__)
 
+SCHEDULER_DEFAULTS = {
+    "interval_seconds": 900,
+    "jitter_seconds": 30,
+    "reload_seconds": 10,
+    "refresh_seconds": 900,
+    "refresh_lag_seconds": 60,
+    "recheck_seconds": 60,
+}
+
+
 # --------------------------------------------------
 # Load configuration
 # --------------------------------------------------
-with open("config/config.yaml", "r") as file:
-    config = yaml.safe_load(file)
+def load_config(path=CONFIG_PATH):
+    with open(path, "r") as file:
+        return yaml.safe_load(file)
 
-weather_config = config["weatherapi"]
-url = weather_config["base_url"]
-cities = weather_config["cities"]
 
-# --------------------------------------------------
-# SQLite setup
-# --------------------------------------------------
-os.makedirs("database", exist_ok=True)
-db_path = "database/weather.db"
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
+def ingestion_settings(config):
+    ingestion_config = config.get("ingestion", {})
+    max_workers = ingestion_config.get("max_workers", 8)
+    return {
+        "max_workers": max_workers,
+        "pool_size": ingestion_config.get("pool_size", max_workers),
+        "bulk_size": min(ingestion_config.get("bulk_size", 1), MAX_BULK_LOCATIONS),
+        "write_batch_size": ingestion_config.get("write_batch_size", 500),
+    }
+
+
+def make_client(config, settings):
+    """Pooled client sharing the rate limiter of its provider / API key."""
+    weather_config = config["weatherapi"]
+    limiter = limiter_for(
+        "weatherapi", weather_config["api_key"],
+        load_rate_limit_settings(config, "weatherapi"), settings["max_workers"],
+    )
+    return WeatherAPIClient(
+        weather_config["base_url"], weather_config["api_key"],
+        pool_size=settings["pool_size"], limiter=limiter,
+    )
+
+
+def limiter_summary(limiter):
+    stats = limiter.stats()
+    return (
+        f"{stats['requests']} requests, {stats['throttled']} throttled, "
+        f"concurrency {stats['concurrency']}"
+    )
+
+
+def scheduler_settings(config):
+    settings = dict(SCHEDULER_DEFAULTS)
+    settings.update(config.get("scheduler") or {})
+    return settings
+
+
+def make_freshness(conn, scheduler):
+    return FreshnessTracker(
+        conn, scheduler["refresh_seconds"],
+        scheduler["refresh_lag_seconds"], scheduler["recheck_seconds"],
+    )
 
-# --------------------------------------------------
-# Create tables
-# --------------------------------------------------
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS weather_history (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    city TEXT NOT NULL,
-    region TEXT,
-    country TEXT,
-    temperature_c REAL,
-    humidity INTEGER,
-    wind_kph REAL,
-    condition TEXT,
-    api_last_updated TEXT NOT NULL,
-    fetched_at_utc TEXT,
-    UNIQUE(city, api_last_updated)
-)
-""")
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS weather_current (
-    city TEXT PRIMARY KEY,
-    region TEXT,
-    country TEXT,
-    temperature_c REAL,
-    humidity INTEGER,
-    wind_kph REAL,
-    condition TEXT,
-    api_last_updated TEXT,
-    fetched_at_utc TEXT
-)
-""")
-def fetch_with_retry(url, params, retries=3, timeout=10):
-    for attempt in range(1, retries + 1):
-        try:
-            response = requests.get(url, params=params, timeout=timeout)
-
-            if response.status_code == 200:
-                return response
-
-            logger.warning(
-                f"Attempt {attempt}: Non-200 response "
-                f"({response.status_code}) for {params.get('q')}"
-            )
-
-        except requests.exceptions.RequestException as e:
-            logger.error(
-                f"Attempt {attempt}: Request failed for "
-                f"{params.get('q')} — {e}"
-            )
-
-        time.sleep(2 * attempt)  # exponential backoff
-
-    return None
 
 # --------------------------------------------------
-# Ingestion loop (THIS IS THE FIX)
+# Fetch stage (runs on worker threads)
 # --------------------------------------------------
-for city in cities:
-    params = {
-        "key": weather_config["api_key"],
-        "q": city
-    }
+def fetch_batch(client, batch):
+    """
+    Fetch one batch of cities and return [(city, payload), ...].
+    Single-city batches use the regular endpoint; larger batches go
+    through one bulk request. Payload is None on failure.
+    """
+    if len(batch) == 1:
+        return [(batch[0], client.fetch_current(batch[0]))]
 
-    response = fetch_with_retry(url, params)
+    return list(client.fetch_bulk(batch).items())
 
-    if response is None:
-        logger.error(f"❌ Failed to fetch data for {city} after retries")
-        continue
 
-    print(f"\n➡️ Fetching city: {city}, status: {response.status_code}")
+def local_time_keys(api_last_updated, api_epoch):
+    """
+    (YYYYMMDD, hour, utc_offset_seconds) for a snapshot. WeatherAPI
+    reports last_updated in the city's local time, so this buckets by
+    local day.
+    """
+    if not api_last_updated or api_epoch is None:
+        return None, None, None
+    local = datetime.strptime(api_last_updated, "%Y-%m-%d %H:%M")
+    utc_offset = int(local.replace(tzinfo=timezone.utc).timestamp()) - api_epoch
+    return local.year * 10000 + local.month * 100 + local.day, local.hour, utc_offset
 
-    if response.status_code != 200:
-        print(f"❌ API call failed for {city}")
-        continue
-
-    data = response.json()
 
+def clean_weather(city, data):
     location = data.get("location", {})
     current = data.get("current", {})
     condition = current.get("condition", {})
 
-    cleaned_weather = {
+    api_last_updated = current.get("last_updated", "")
+    api_epoch = current.get("last_updated_epoch")
+    local_date, local_hour, utc_offset = local_time_keys(api_last_updated, api_epoch)
+    fetched_at = datetime.now(timezone.utc)
+
+    return {
         "city": city,
         "region": location.get("region", ""),
         "country": location.get("country", ""),
@@ -128,77 +152,296 @@ for city in cities:
         "humidity": int(current.get("humidity", 0)),
         "wind_kph": float(current.get("wind_kph", 0.0)),
         "condition": condition.get("text", "Unknown"),
-        "api_last_updated": current.get("last_updated", ""),
-        "fetched_at_utc": datetime.now(timezone.utc).isoformat()
+        "api_last_updated": api_last_updated,
+        "fetched_at_utc": fetched_at.isoformat(),
+        "tz_id": location.get("tz_id"),
+        "api_epoch": api_epoch,
+        "utc_offset": utc_offset,
+        "fetched_epoch": int(fetched_at.timestamp()),
+        "local_date": local_date,
+        "local_hour": local_hour,
     }
 
-    # --------------------------------------------------
-    # Validation
-    # --------------------------------------------------
-    if cleaned_weather["humidity"] > 100:
-        print("⚠️ Warning: Humidity over 100%")
 
-    if not cleaned_weather["api_last_updated"]:
-        print("⚠️ Missing api_last_updated — skipping")
-        continue
+# --------------------------------------------------
+# Ingestion loop
+# Fetches run concurrently on a bounded pool sharing one pooled
+# HTTP session; results are consumed here on the main thread,
+# which is the single DB writer.
+# --------------------------------------------------
+def ingest(cities, client, executor, writer, validator, freshness, bulk_size=1):
+    """
+    Fetch `cities` and queue their new cleaned snapshots on `writer`.
+    Returns the cities the provider answered for.
+    """
+    batches = [
+        cities[i:i + bulk_size] for i in range(0, len(cities), bulk_size)
+    ]
+
+    futures = [executor.submit(fetch_batch, client, batch) for batch in batches]
+    answered = []
 
-    # --------------------------------------------------
-    # Insert into weather_history (idempotent)
-    # --------------------------------------------------
-    try:
-        cursor.execute("""
-        INSERT INTO weather_history (
-            city, region, country,
-            temperature_c, humidity, wind_kph,
-            condition, api_last_updated, fetched_at_utc
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            cleaned_weather["city"],
-            cleaned_weather["region"],
-            cleaned_weather["country"],
-            cleaned_weather["temperature_c"],
-            cleaned_weather["humidity"],
-            cleaned_weather["wind_kph"],
-            cleaned_weather["condition"],
-            cleaned_weather["api_last_updated"],
-            cleaned_weather["fetched_at_utc"]
-        ))
-
-        conn.commit()
-        logger.info(f"Inserted into weather_history for {city}")
-
-
-    except sqlite3.IntegrityError:
-        logger.warning(f"Duplicate history record skipped for {city}")
+    for future in as_completed(futures):
+        for city, data in future.result():
+            if data is None:
+                logger.error(f"❌ Failed to fetch data for {city} after retries")
+                continue
+
+            answered.append(city)
+
+            # The snapshot we already hold: nothing to clean or write
+            if freshness.is_unchanged(city, data):
+                print(f"\n⏭️ {city}: unchanged since {data['current']['last_updated']}")
+                continue
 
+            print(f"\n➡️ Fetched city: {city}")
+
+            cleaned_weather = clean_weather(city, data)
+
+            # --------------------------------------------------
+            # Validation
+            # --------------------------------------------------
+            if cleaned_weather["humidity"] > 100:
+                print("⚠️ Warning: Humidity over 100%")
+
+            if not cleaned_weather["api_last_updated"]:
+                print("⚠️ Missing api_last_updated — skipping")
+                continue
+
+            if cleaned_weather["api_epoch"] is None:
+                print("⚠️ Missing last_updated_epoch — skipping")
+                continue
+
+            # Range glitches and outliers go to quarantined_observations
+            reasons = validator.check(cleaned_weather)
+            if reasons:
+                print(f"🚧 Quarantined: {'; '.join(reasons)}")
+                continue
+
+            # --------------------------------------------------
+            # Queue for the batched weather_history / weather_current write
+            # --------------------------------------------------
+            writer.add(cleaned_weather)
+            freshness.mark(city, cleaned_weather["api_last_updated"])
+
+    return answered
+
+
+def run_once(config):
+    """One pass over every configured city (the scheduled-task mode)."""
+    weather_config = config["weatherapi"]
+    settings = ingestion_settings(config)
+
+    conn = get_connection()
+    apply_migrations(conn)
+
+    client = make_client(config, settings)
+    writer = BatchWriter(conn, batch_size=settings["write_batch_size"])
+    validator = SnapshotValidator(conn, load_validation_settings(config))
+    freshness = make_freshness(conn, scheduler_settings(config))
+
+    with client, writer, validator, ThreadPoolExecutor(max_workers=settings["max_workers"]) as executor:
+        ingest(
+            weather_config["cities"], client, executor, writer, validator, freshness,
+            settings["bulk_size"],
+        )
 
     # --------------------------------------------------
-    # Upsert into weather_current
+    # Close DB
     # --------------------------------------------------
-    cursor.execute("""
-    INSERT OR REPLACE INTO weather_current (
-        city, region, country,
-        temperature_c, humidity, wind_kph,
-        condition, api_last_updated, fetched_at_utc
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        cleaned_weather["city"],
-        cleaned_weather["region"],
-        cleaned_weather["country"],
-        cleaned_weather["temperature_c"],
-        cleaned_weather["humidity"],
-        cleaned_weather["wind_kph"],
-        cleaned_weather["condition"],
-        cleaned_weather["api_last_updated"],
-        cleaned_weather["fetched_at_utc"]
-    ))
-
-    conn.commit()
-    logger.info(f"weather_current updated for {city}")
+    conn.close()
+    print(
+        f"\n🎉 Ingestion run completed for all cities — "
+        f"{writer.inserted} new snapshots, {freshness.unchanged} unchanged, "
+        f"{writer.skipped} duplicates skipped, {validator.quarantined} quarantined"
+    )
+    print(f"⏱️ Rate limiter: {limiter_summary(client.limiter)}")
 
 
 # --------------------------------------------------
-# Close DB
+# Resident scheduler
 # --------------------------------------------------
-conn.close()
-print("\n🎉 Ingestion run completed for all cities")
+class PollSchedule:
+    """
+    Min-heap of poll times. Each city owns a slot that advances by one
+    interval per poll; newly added cities get slots spread evenly over
+    the next interval, and each poll fires at its slot ± jitter, so the
+    jitter never accumulates into drift.
+    """
+
+    def __init__(self, interval, jitter):
+        self.interval = interval
+        self.jitter = jitter
+        self.heap = []
+        self.slots = {}  # city -> current slot
+
+    def _push(self, city, slot):
+        self.slots[city] = slot
+        due = slot + random.uniform(-self.jitter, self.jitter)
+        heapq.heappush(self.heap, (due, slot, city))
+
+    def set_cities(self, cities, now):
+        """Stagger newly added cities over the next interval; drop removed ones."""
+        added = [city for city in cities if city not in self.slots]
+        for city in set(self.slots) - set(cities):
+            del self.slots[city]
+        for i, city in enumerate(added):
+            self._push(city, now + self.interval * i / len(added))
+        return added
+
+    def pop_due(self, now):
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            _, slot, city = heapq.heappop(self.heap)
+            if self.slots.get(city) != slot:
+                continue  # removed (or re-added) since this entry was pushed
+            due.append(city)
+            # Slots missed while the process was stalled are skipped
+            missed = max(0, (now - slot) // self.interval)
+            self._push(city, slot + self.interval * (missed + 1))
+        return due
+
+    def reschedule(self, city, slot):
+        """
+        Move a city's next poll to `slot` (e.g. its expected refresh);
+        jitter only delays it, so it never lands before that time.
+        """
+        self.slots[city] = slot
+        heapq.heappush(self.heap, (slot + random.uniform(0, self.jitter), slot, city))
+
+    def next_due(self):
+        return self.heap[0][0] if self.heap else None
+
+
+def run_daemon(config_path=CONFIG_PATH):
+    """Poll on a staggered schedule until SIGINT / SIGTERM."""
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    config = load_config(config_path)
+    config_mtime = os.path.getmtime(config_path)
+    weather_config = config["weatherapi"]
+    settings = ingestion_settings(config)
+    scheduler = scheduler_settings(config)
+
+    conn = get_connection()
+    apply_migrations(conn)
+
+    client = make_client(config, settings)
+    writer = BatchWriter(conn, batch_size=settings["write_batch_size"])
+    validator = SnapshotValidator(conn, load_validation_settings(config))
+    freshness = make_freshness(conn, scheduler)
+
+    schedule = PollSchedule(scheduler["interval_seconds"], scheduler["jitter_seconds"])
+    schedule.set_cities(weather_config["cities"], time.time())
+    next_reload = time.time() + scheduler["reload_seconds"]
+
+    print(
+        f"🕒 Scheduler started: {len(schedule.slots)} cities every "
+        f"{scheduler['interval_seconds']}s (±{scheduler['jitter_seconds']}s jitter)"
+    )
+
+    with client, ThreadPoolExecutor(max_workers=settings["max_workers"]) as executor:
+        while not stop.is_set():
+            now = time.time()
+
+            # --------------------------------------------------
+            # Hot-reload the city list and schedule
+            # --------------------------------------------------
+            if now >= next_reload:
+                next_reload = now + scheduler["reload_seconds"]
+                mtime = os.path.getmtime(config_path)
+                if mtime != config_mtime:
+                    config_mtime = mtime
+                    try:
+                        config = load_config(config_path)
+                    except (OSError, yaml.YAMLError) as e:
+                        logger.error(f"Config reload failed, keeping the previous one — {e}")
+                    else:
+                        scheduler = scheduler_settings(config)
+                        client.limiter.configure(
+                            load_rate_limit_settings(config, "weatherapi"), settings["max_workers"]
+                        )
+                        schedule.interval = scheduler["interval_seconds"]
+                        schedule.jitter = scheduler["jitter_seconds"]
+                        freshness.refresh = scheduler["refresh_seconds"]
+                        freshness.lag = scheduler["refresh_lag_seconds"]
+                        freshness.recheck = scheduler["recheck_seconds"]
+                        cities = config["weatherapi"]["cities"]
+                        added = schedule.set_cities(cities, now)
+                        logger.info(
+                            f"Config reloaded: {len(cities)} cities ({len(added)} added), "
+                            f"every {schedule.interval}s"
+                        )
+
+            # --------------------------------------------------
+            # Poll the cities that are due
+            # --------------------------------------------------
+            due = schedule.pop_due(now)
+            if due:
+                inserted, unchanged = writer.inserted, freshness.unchanged
+                answered = ingest(
+                    due, client, executor, writer, validator, freshness, settings["bulk_size"]
+                )
+                writer.flush()
+                validator.flush()
+
+                # Next poll just after each city's data is expected to refresh
+                polled_at = time.time()
+                for city in answered:
+                    if city not in schedule.slots:
+                        continue  # removed by a reload meanwhile
+                    refresh_at = freshness.next_poll(
+                        city, polled_at, schedule.slots[city], schedule.interval
+                    )
+                    if refresh_at is not None:
+                        schedule.reschedule(city, refresh_at)
+
+                logger.info(
+                    f"Polled {len(due)} cities — {writer.inserted - inserted} new snapshots, "
+                    f"{freshness.unchanged - unchanged} unchanged "
+                    f"(rate limiter: {limiter_summary(client.limiter)})"
+                )
+
+            next_due = schedule.next_due()
+            wake = min(next_reload, next_due) if next_due is not None else next_reload
+            stop.wait(max(0.0, wake - time.time()))
+
+    writer.flush()
+    validator.flush()
+    conn.close()
+    print(
+        f"\n👋 Scheduler stopped — {writer.inserted} new snapshots, "
+        f"{freshness.unchanged} unchanged, {writer.skipped} duplicates skipped, "
+        f"{validator.quarantined} quarantined"
+    )
+    print(f"⏱️ Rate limiter: {limiter_summary(client.limiter)}")
+
+
+def main():
+    # --------------------------------------------------
+    # Logging configuration
+    # --------------------------------------------------
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(message)s",
+        handlers=[
+            logging.FileHandler("outputs/ingestion.log"),
+            logging.StreamHandler()
+        ]
+    )
+
+    parser = argparse.ArgumentParser(description="Fetch current weather into SQLite")
+    parser.add_argument("--daemon", action="store_true",
+                        help="stay resident and poll on the `scheduler` config schedule")
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_daemon()
+    else:
+        run_once(load_config())
+
+
+if __name__ == "__main__":
+    main()
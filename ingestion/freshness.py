@@ -0,0 +1,72 @@
+"""Per-city freshness of provider snapshots.
+
+WeatherAPI advances `current.last_updated` about every 15 minutes, so a
+city polled more often mostly returns the snapshot we already hold.
+FreshnessTracker keeps each city's last seen `last_updated` (seeded from
+weather_current, which persists it) and lets the ingester drop such
+payloads before cleaning, validation or any database write.
+
+It also predicts when a city's next snapshot should appear — its
+`last_updated_epoch` plus the provider's `refresh_seconds`, plus
+`lag_seconds` for the provider to publish it — which the daemon uses to
+time each city's next poll: never before that, and never before its
+regular slot. A poll that still returns the old snapshot after that
+time is retried after `recheck_seconds`, doubling while the city stays
+stale (a station that stopped reporting), up to the regular interval.
+"""
+
+
+class FreshnessTracker:
+    """Last snapshot seen per city and when its next one is due."""
+
+    def __init__(self, conn, refresh_seconds=900, lag_seconds=60, recheck_seconds=60):
+        self.refresh = refresh_seconds
+        self.lag = lag_seconds
+        self.recheck = recheck_seconds
+
+        # city -> api_last_updated of the newest snapshot seen
+        self.last_updated = dict(conn.execute(
+            "SELECT city, api_last_updated FROM weather_current WHERE api_last_updated IS NOT NULL"
+        ))
+        self.epochs = {}  # city -> last_updated_epoch of the latest payload
+        self.stale = {}   # city -> latest payload repeated the previous snapshot
+        self.misses = {}  # city -> consecutive stale polls past its expected refresh
+        self.unchanged = 0
+
+    def is_unchanged(self, city, data):
+        """True if `data` carries the snapshot already seen for `city`."""
+        current = data.get("current", {})
+        api_last_updated = current.get("last_updated")
+        if current.get("last_updated_epoch") is not None:
+            self.epochs[city] = current["last_updated_epoch"]
+
+        unchanged = bool(api_last_updated) and self.last_updated.get(city) == api_last_updated
+        self.stale[city] = unchanged
+        self.unchanged += unchanged
+        return unchanged
+
+    def mark(self, city, api_last_updated):
+        """
+        Record an accepted snapshot. Quarantined ones are not marked, so
+        the next poll validates them again (re-quarantining is a no-op).
+        """
+        self.last_updated[city] = api_last_updated
+
+    def next_poll(self, city, now, slot, interval):
+        """
+        When to poll `city` next, given its regular `slot`; None if its
+        refresh time is unknown (keep the slot).
+        """
+        api_epoch = self.epochs.get(city)
+        if api_epoch is None:
+            return None
+
+        expected = api_epoch + self.refresh + self.lag
+        if expected > now or not self.stale.get(city):
+            self.misses[city] = 0
+            return max(expected, slot)
+
+        # Overdue: back off while the provider keeps serving the old snapshot
+        misses = self.misses.get(city, 0)
+        self.misses[city] = misses + 1
+        return now + min(interval, self.recheck * 2 ** misses)
@@ -0,0 +1,240 @@
+"""Client-side rate limiting for provider API calls.
+
+One RateLimiter per provider / API key (shared by every client using
+that key, see limiter_for) combines:
+
+  1. a token bucket  `requests_per_second` with `burst` requests of
+                     headroom, so a run stays inside the plan's quota
+                     instead of finding it with 429s
+  2. Retry-After     a 429 / 503 carrying Retry-After pauses the whole
+                     bucket until then, not just the thread that got it
+  3. AIMD            an adaptive cap on requests in flight: +1 per
+                     window of successful (2xx / 3xx) requests, times
+                     `backoff` on a 429 / 503 — once per round trip: the
+                     requests already in flight at a cut do not cut
+                     again. Like TCP it starts at `min_concurrency` and
+                     doubles per window until the first such signal
+
+With `latency_factor` set, rising latency (the provider queueing our
+requests) is a congestion signal too. Requests are then judged in
+windows of LATENCY_WINDOW: a window whose median latency exceeds
+`latency_factor` × the uncongested baseline cuts the cap, any other
+doubles it (slow start) or adds 1. The baseline is the lowest window
+median seen, re-measured by any window run at `min_concurrency` — where
+repeated cuts end up if the provider's own latency has risen for good.
+Medians keep ordinary jitter from reading as congestion. It is off by
+default: the first window runs at `min_concurrency` to measure the
+baseline, which costs a short run its early parallelism.
+
+The cap never exceeds the fetch pool (ingestion.max_workers); worker
+threads above the current cap wait in acquire(). Settings live in the
+provider's `rate_limit` config section.
+"""
+
+import statistics
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+DEFAULT_SETTINGS = {
+    "requests_per_second": None,  # None = no token bucket
+    "burst": 10,
+    "min_concurrency": 1,
+    "latency_factor": None,       # None = only 429 / 503 lower the cap
+    "backoff": 0.5,
+    "max_retry_after": 60,
+}
+
+# Statuses that mean the provider is shedding load
+THROTTLE_STATUSES = (429, 503)
+
+# Requests whose median latency is compared against the baseline
+LATENCY_WINDOW = 20
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def load_rate_limit_settings(config, provider="weatherapi"):
+    """The `rate_limit` section of a provider in an already-loaded config dict."""
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update((config.get(provider) or {}).get("rate_limit") or {})
+    return settings
+
+
+def limiter_for(provider, api_key, settings, max_concurrency):
+    """
+    The process-wide limiter of (provider, api_key), created on first
+    use; later calls apply new settings to it (config reload).
+    """
+    with _limiters_lock:
+        limiter = _limiters.get((provider, api_key))
+        if limiter is None:
+            limiter = _limiters[(provider, api_key)] = RateLimiter(settings, max_concurrency)
+        else:
+            limiter.configure(settings, max_concurrency)
+        return limiter
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateLimiter:
+    """Token bucket plus AIMD concurrency cap; safe to share between threads."""
+
+    def __init__(self, settings=None, max_concurrency=8):
+        self.cond = threading.Condition()
+        self.configure(settings, max_concurrency)
+
+        self.tokens = self.burst
+        self.refilled = time.monotonic()
+        self.paused_until = 0.0
+
+        self.in_flight = 0
+        self.limit = float(self.min_concurrency)
+        self.slow_start = True
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+        self.latency = None    # median of `samples`, seconds
+        self.baseline = None   # uncongested latency estimate
+        self.window_limit = self.limit  # cap when `samples` started filling
+        self.last_decrease = 0.0  # when the cap was last cut
+
+        self.requests = 0
+        self.throttled = 0
+
+    def configure(self, settings=None, max_concurrency=8):
+        settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        with self.cond:
+            rate = settings["requests_per_second"]
+            self.rate = float(rate) if rate else None
+            self.burst = max(1.0, float(settings["burst"]))
+            self.max_concurrency = max(1, int(max_concurrency))
+            self.min_concurrency = min(max(1, int(settings["min_concurrency"])), self.max_concurrency)
+            factor = settings["latency_factor"]
+            self.latency_factor = float(factor) if factor else None
+            self.backoff = float(settings["backoff"])
+            self.max_retry_after = float(settings["max_retry_after"])
+            if hasattr(self, "limit"):
+                self.limit = min(max(self.limit, self.min_concurrency), self.max_concurrency)
+                self.tokens = min(self.tokens, self.burst)
+                self.cond.notify_all()
+
+    # --------------------------------------------------
+    # Acquire / release around one request
+    # --------------------------------------------------
+    def acquire(self):
+        """Block until a concurrency slot and a token are free; returns the start time."""
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+
+        while True:
+            with self.cond:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.rate is None:
+                    break
+                else:
+                    self.tokens = min(self.burst, self.tokens + (now - self.refilled) * self.rate)
+                    self.refilled = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        break
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+        return time.monotonic()
+
+    def release(self, started, status=None, retry_after=None):
+        """
+        Record the outcome of a request started at `started`: its HTTP
+        status (None if it raised) and Retry-After seconds, if any.
+        """
+        now = time.monotonic()
+        latency = now - started
+
+        with self.cond:
+            self.in_flight -= 1
+            self.requests += 1
+
+            if retry_after is not None:
+                self.paused_until = max(self.paused_until, now + min(retry_after, self.max_retry_after))
+                self.tokens = 0.0
+
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+                self._decrease(started, now)
+            elif status is not None and 200 <= status < 400:
+                self._observe_latency(latency, started, now)
+
+            self.cond.notify_all()
+
+    def _observe_latency(self, latency, started, now):
+        if started < self.last_decrease:
+            # Sent before the last cut, at the old limit
+            return
+        if self.latency_factor is None:
+            # Slow start doubles per window of `limit` successful requests,
+            # afterwards about +1 per window
+            step = 1 if self.slow_start else 1 / self.limit
+            self.limit = min(self.max_concurrency, self.limit + step)
+            return
+
+        # Latency-driven: the cap only moves once per window of samples
+        if not self.samples:
+            self.window_limit = int(self.limit)
+        self.samples.append(latency)
+        if len(self.samples) < LATENCY_WINDOW:
+            return
+
+        self.latency = statistics.median(self.samples)
+        self.samples.clear()
+        if self.baseline is None or self.window_limit <= self.min_concurrency:
+            # Measured from the lowest concurrency: the provider's own latency
+            self.baseline = self.latency
+        else:
+            self.baseline = min(self.baseline, self.latency)
+
+        if self.latency > self.latency_factor * self.baseline:
+            self._decrease(started, now)
+        elif self.slow_start:
+            self.limit = min(self.max_concurrency, self.limit * 2)
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1)
+
+    def _decrease(self, started, now):
+        # Requests that were already in flight at the last cut report the
+        # same congestion; cut once per round trip
+        if started < self.last_decrease:
+            return
+        self.last_decrease = now
+        self.slow_start = False
+        self.limit = max(self.min_concurrency, self.limit * self.backoff)
+        # Judge the new limit on a fresh window
+        self.samples.clear()
+
+    def stats(self):
+        with self.cond:
+            return {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "concurrency": int(self.limit),
+            }
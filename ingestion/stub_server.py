@@ -0,0 +1,264 @@
+"""Local stand-in for the WeatherAPI endpoints used by the ingester.
+
+Serves GET /v1/current.json, the bulk variant (POST with q=bulk) and
+GET /v1/history.json (dt .. end_dt, hourly) with deterministic, made-up
+payloads so ingestion throughput can be measured
+offline. `latency` delays every response; `connect_latency` is paid once
+per new TCP connection, which approximates handshake cost and makes the
+benefit of keep-alive pooling visible.
+
+`rate_limit` (requests per second) answers requests over that rate with
+429 and a Retry-After header; `capacity` serves at most that many
+requests at once and queues the rest, so latency grows under load. Both
+exercise the client's rate limiter (ingestion/rate_limiter.py).
+
+    with StubWeatherAPI(latency=0.05) as stub:
+        client = WeatherAPIClient(stub.base_url, "test-key")
+
+Or standalone:
+
+    python ingestion/stub_server.py --port 8081 --latency 0.05
+"""
+
+import argparse
+import json
+import math
+import threading
+import time
+import zlib
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def stub_payload(city, now=None):
+    """Deterministic current-conditions payload for a city."""
+    now = now or datetime.now(timezone.utc)
+    seed = zlib.crc32(city.encode())
+
+    # WeatherAPI refreshes last_updated every 15 minutes
+    last_updated = now.replace(
+        minute=now.minute - now.minute % 15, second=0, microsecond=0
+    )
+
+    return {
+        "location": {
+            "name": city,
+            "region": f"Region {seed % 7}",
+            "country": "Stubland",
+            "tz_id": "UTC",
+            "localtime_epoch": int(now.timestamp()),
+            "localtime": now.strftime("%Y-%m-%d %H:%M"),
+        },
+        "current": {
+            "last_updated_epoch": int(last_updated.timestamp()),
+            "last_updated": last_updated.strftime("%Y-%m-%d %H:%M"),
+            "temp_c": round(15 + seed % 20 + (now.hour % 6) * 0.5, 1),
+            "humidity": 40 + seed % 50,
+            "wind_kph": float(seed % 30),
+            "condition": {"text": ["Sunny", "Cloudy", "Mist"][seed % 3]},
+        },
+    }
+
+
+def stub_history(city, start, end):
+    """Deterministic hourly history payload for a city, start .. end inclusive."""
+    seed = zlib.crc32(city.encode())
+    days = []
+
+    day = start
+    while day <= end:
+        hours = []
+        for hour in range(24):
+            moment = datetime(day.year, day.month, day.day, hour, tzinfo=timezone.utc)
+            hours.append({
+                "time_epoch": int(moment.timestamp()),
+                "time": moment.strftime("%Y-%m-%d %H:%M"),
+                "temp_c": round(15 + seed % 20 + (hour % 6) * 0.5 + day.toordinal() % 7 * 0.3, 1),
+                "humidity": 40 + (seed + hour) % 50,
+                "wind_kph": float((seed + hour) % 30),
+                "condition": {"text": ["Sunny", "Cloudy", "Mist"][(seed + hour) % 3]},
+            })
+        days.append({"date": day.isoformat(), "hour": hours})
+        day += timedelta(days=1)
+
+    return {
+        "location": {
+            "name": city,
+            "region": f"Region {seed % 7}",
+            "country": "Stubland",
+            "tz_id": "UTC",
+        },
+        "forecast": {"forecastday": days},
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # allow keep-alive
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.stub.connection_count += 1
+        if self.server.stub.connect_latency:
+            time.sleep(self.server.stub.connect_latency)
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _begin(self):
+        """Parsed query string, or None once a 429 has been sent."""
+        stub = self.server.stub
+        stub.request_count += 1
+
+        retry_after = stub.throttle()
+        if retry_after is not None:
+            stub.throttled_count += 1
+            body = json.dumps({"error": {"code": 429, "message": "Too many requests"}}).encode()
+            self.send_response(429)
+            self.send_header("Retry-After", str(retry_after))
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return None
+
+        if stub.latency:
+            with stub.slots:
+                time.sleep(stub.latency)
+        return parse_qs(urlparse(self.path).query)
+
+    def do_GET(self):
+        query = self._begin()
+        if query is None:
+            return
+        city = query.get("q", [""])[0]
+
+        if not city:
+            self._send_json(400, {"error": {"code": 1003, "message": "Parameter q is missing."}})
+            return
+
+        if urlparse(self.path).path.endswith("/history.json"):
+            try:
+                start = date.fromisoformat(query["dt"][0])
+                end = date.fromisoformat(query.get("end_dt", query["dt"])[0])
+            except (KeyError, ValueError):
+                self._send_json(400, {"error": {"code": 1007, "message": "Parameter dt is invalid."}})
+                return
+            if not 0 <= (end - start).days < 30:
+                self._send_json(400, {"error": {"code": 1007, "message": "end_dt is out of range."}})
+                return
+
+            self.server.stub.history_count += 1
+            self._send_json(200, stub_history(city, start, end))
+            return
+
+        self._send_json(200, stub_payload(city))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        query = self._begin()
+        if query is None:
+            return
+
+        if query.get("q", [""])[0] != "bulk":
+            self._send_json(400, {"error": {"code": 1005, "message": "API request url is invalid"}})
+            return
+
+        bulk = []
+        for location in body.get("locations", []):
+            item = {"custom_id": location.get("custom_id"), "q": location.get("q")}
+            item.update(stub_payload(location.get("q", "")))
+            bulk.append({"query": item})
+
+        self._send_json(200, {"bulk": bulk})
+
+
+class StubWeatherAPI:
+    """Threaded stub server usable as a context manager / test fixture."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, connect_latency=0.0,
+                 rate_limit=None, capacity=None):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.rate_limit = rate_limit
+        self.request_count = 0
+        self.connection_count = 0
+        self.throttled_count = 0
+        self.history_count = 0
+
+        # Requests served at once; the rest queue for a slot
+        self.slots = threading.BoundedSemaphore(capacity) if capacity else nullcontext()
+        self._quota_lock = threading.Lock()
+        self._tokens = float(rate_limit or 0)
+        self._refilled = time.monotonic()
+
+        self._server = ThreadingHTTPServer((host, port), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    def throttle(self):
+        """Whole seconds until a request is allowed, or None if it is now."""
+        if not self.rate_limit:
+            return None
+        with self._quota_lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit)
+            self._refilled = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            return max(1, math.ceil((1 - self._tokens) / self.rate_limit))
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/current.json"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local WeatherAPI stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--connect-latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="requests per second before answering 429")
+    parser.add_argument("--capacity", type=int, default=None,
+                        help="requests served at once (the rest queue)")
+    args = parser.parse_args()
+
+    stub = StubWeatherAPI(
+        args.host, args.port, args.latency, args.connect_latency, args.rate_limit, args.capacity
+    )
+    print(f"🌐 Stub WeatherAPI listening on {stub.base_url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
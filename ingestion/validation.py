@@ -0,0 +1,197 @@
+"""Ingest-time validation of cleaned snapshots.
+
+Runs on the writer thread between cleaning and the batched write, so a
+bad snapshot never reaches weather_observations. Two checks:
+
+  1. ranges    temperature / humidity / wind outside physically
+               plausible bounds (or missing) — sensor glitches
+  2. outliers  the temperature change since the city's last accepted
+               snapshot, scored against an exponentially weighted mean /
+               stddev of its earlier changes; more than `max_z` stddevs
+               and at least `min_jump_c` °C is an outlier
+
+Failing snapshots are routed to quarantined_observations with their
+reasons. Outliers do not update the statistics, so one glitch cannot
+widen the band for the next; `max_rejections` outliers in a row are
+taken as a real shift (a front passing) and accepted as the new level.
+
+Per-city state is one small validation_state row, held in a dict while
+the run lasts, so each check is a few float operations (see
+ingestion/benchmark_validation.py). Quarantined rows and state are
+written on flush() / close.
+"""
+
+import json
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    "enabled": True,
+    "temperature_c": [-90, 60],
+    "humidity": [0, 100],
+    "wind_kph": [0, 400],
+    "max_z": 6.0,
+    "min_jump_c": 5.0,
+    "min_samples": 20,
+    "halflife": 48,
+    "max_rejections": 3,
+}
+
+RANGE_FIELDS = ["temperature_c", "humidity", "wind_kph"]
+
+STATE_COLUMNS = [
+    "last_epoch", "last_temperature", "n", "ew_mean", "ew_var",
+    "rejections", "rejected_epoch",
+]
+
+INSERT_QUARANTINE_SQL = """
+INSERT OR IGNORE INTO quarantined_observations (city, api_epoch, fetched_epoch, reasons, record)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+UPSERT_STATE_SQL = f"""
+INSERT OR REPLACE INTO validation_state (city, {", ".join(STATE_COLUMNS)})
+VALUES ({", ".join("?" * (len(STATE_COLUMNS) + 1))})
+"""
+
+
+def load_validation_settings(config):
+    """The `validation` section of an already-loaded config dict."""
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(config.get("validation") or {})
+    return settings
+
+
+class CityState:
+    """Last accepted snapshot plus EW statistics of temperature changes."""
+
+    __slots__ = STATE_COLUMNS
+
+    def __init__(self, last_epoch, last_temperature, n=0, ew_mean=None,
+                 ew_var=None, rejections=0, rejected_epoch=None):
+        self.last_epoch = last_epoch
+        self.last_temperature = last_temperature
+        self.n = n
+        self.ew_mean = ew_mean
+        self.ew_var = ew_var
+        self.rejections = rejections
+        self.rejected_epoch = rejected_epoch
+
+    def accept(self, api_epoch, temperature, change, alpha):
+        self.n += 1
+        if self.ew_mean is None:
+            self.ew_mean, self.ew_var = change, 0.0
+        else:
+            delta = change - self.ew_mean
+            increment = alpha * delta
+            self.ew_mean += increment
+            self.ew_var = (1 - alpha) * (self.ew_var + delta * increment)
+        self.last_epoch, self.last_temperature = api_epoch, temperature
+        self.rejections = 0
+
+
+class SnapshotValidator:
+    """
+    Checks cleaned records one at a time; check() returns the reasons a
+    record was quarantined (empty when it should be written).
+    """
+
+    def __init__(self, conn, settings=None):
+        self.conn = conn
+        settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        self.enabled = settings["enabled"]
+        self.ranges = [(field, *settings[field]) for field in RANGE_FIELDS]
+        self.max_z = float(settings["max_z"])
+        self.min_jump = float(settings["min_jump_c"])
+        self.min_samples = int(settings["min_samples"])
+        self.max_rejections = int(settings["max_rejections"])
+        self.alpha = 1 - 0.5 ** (1 / float(settings["halflife"]))
+
+        self.states = {}
+        if self.enabled:
+            rows = conn.execute(f"SELECT city, {', '.join(STATE_COLUMNS)} FROM validation_state")
+            self.states = {city: CityState(*values) for city, *values in rows}
+
+        self.changed = set()
+        self.pending = []
+        self.quarantined = 0
+
+    def check(self, record):
+        if not self.enabled:
+            return []
+
+        reasons = [
+            f"{field}={record.get(field)} outside [{low}, {high}]"
+            for field, low, high in self.ranges
+            if record.get(field) is None or not low <= record[field] <= high
+        ]
+        if not reasons:
+            reasons = self._score(record)
+
+        if reasons:
+            self.pending.append((
+                record["city"], record.get("api_epoch"), record.get("fetched_epoch"),
+                "; ".join(reasons), json.dumps(record),
+            ))
+            self.quarantined += 1
+        return reasons
+
+    def _score(self, record):
+        city = record["city"]
+        api_epoch = record["api_epoch"]
+        temperature = record["temperature_c"]
+
+        state = self.states.get(city)
+        if state is None:
+            self.states[city] = CityState(api_epoch, temperature)
+            self.changed.add(city)
+            return []
+        if api_epoch <= state.last_epoch:
+            # Re-fetched snapshot; the writer skips it as a duplicate
+            return []
+
+        self.changed.add(city)
+        change = temperature - state.last_temperature
+
+        if state.n >= self.min_samples:
+            deviation = abs(change - state.ew_mean)
+            if deviation > self.max_z * math.sqrt(state.ew_var) and abs(change) >= self.min_jump:
+                reason = f"temperature change {change:+.1f}°C is an outlier for {city}"
+                if api_epoch == state.rejected_epoch:
+                    # The same snapshot fetched again
+                    return [reason]
+                state.rejections += 1
+                state.rejected_epoch = api_epoch
+                if state.rejections < self.max_rejections:
+                    return [reason]
+                # Persistent shift: take it as the new level, keep the spread
+                state.last_epoch, state.last_temperature = api_epoch, temperature
+                state.rejections = 0
+                return []
+
+        state.accept(api_epoch, temperature, change, self.alpha)
+        return []
+
+    def flush(self):
+        if not self.pending and not self.changed:
+            return
+
+        with self.conn:
+            self.conn.executemany(INSERT_QUARANTINE_SQL, self.pending)
+            self.conn.executemany(UPSERT_STATE_SQL, [
+                (city,) + tuple(getattr(self.states[city], column) for column in STATE_COLUMNS)
+                for city in self.changed
+            ])
+
+        if self.pending:
+            logger.warning(f"{len(self.pending)} snapshots quarantined")
+        self.pending = []
+        self.changed = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.flush()
@@ -0,0 +1,225 @@
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import THROTTLE_STATUSES, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# WeatherAPI accepts at most 50 locations per bulk request
+MAX_BULK_LOCATIONS = 50
+
+# WeatherAPI serves at most 30 days per history request (dt .. end_dt)
+MAX_HISTORY_DAYS = 30
+
+# Retry-After responses honoured per request on top of `retries`
+MAX_THROTTLED_RETRIES = 10
+
+
+class WeatherAPIClient:
+    """
+    Reusable WeatherAPI client.
+
+    Owns a pooled requests.Session so connections (TCP + TLS) are kept
+    alive and reused across cities and retry attempts. The session is
+    safe to share between the ingestion worker threads.
+
+    An optional RateLimiter (ingestion/rate_limiter.py) gates every
+    attempt: it paces requests, caps how many are in flight and pauses
+    them all when the provider answers with Retry-After.
+    """
+
+    def __init__(self, base_url, api_key, pool_size=10, retries=3, timeout=10, limiter=None):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.retries = retries
+        self.timeout = timeout
+        self.limiter = limiter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            pool_block=True
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    # --------------------------------------------------
+    # Low-level request with retry & backoff
+    # --------------------------------------------------
+    def request_with_retry(self, method, params, json=None, label=None, url=None):
+        label = label or params.get("q")
+        url = url or self.base_url
+
+        attempt = throttled = 0
+        while attempt < self.retries:
+            started = self.limiter.acquire() if self.limiter else None
+            status = retry_after = None
+            try:
+                response = self.session.request(
+                    method,
+                    url,
+                    params=params,
+                    json=json,
+                    timeout=self.timeout
+                )
+                status = response.status_code
+
+                if status == 200:
+                    return response
+
+                if status in THROTTLE_STATUSES:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            except requests.exceptions.RequestException as e:
+                attempt += 1
+                logger.error(
+                    f"Attempt {attempt}: Request failed for {label} — {e}"
+                )
+
+            finally:
+                if self.limiter:
+                    self.limiter.release(started, status, retry_after)
+
+            if retry_after is not None and throttled < MAX_THROTTLED_RETRIES:
+                # Waiting out a Retry-After is not a failed attempt
+                throttled += 1
+                logger.warning(
+                    f"Throttled ({status}) for {label}, retry after {retry_after:.0f}s"
+                )
+                # With a limiter, its acquire() holds every request until then
+                if not self.limiter:
+                    time.sleep(retry_after)
+                continue
+
+            if status is not None:
+                attempt += 1
+                logger.warning(
+                    f"Attempt {attempt}: Non-200 response "
+                    f"({status}) for {label}"
+                )
+
+            if attempt < self.retries:
+                time.sleep(2 * attempt)  # linear backoff
+
+        return None
+
+    @staticmethod
+    def _parse_json(response, label):
+        try:
+            return response.json()
+        except ValueError as e:
+            logger.error(f"Invalid JSON payload for {label} — {e}")
+            return None
+
+    # --------------------------------------------------
+    # Current conditions
+    # --------------------------------------------------
+    def fetch_current(self, city):
+        """Return the current-conditions payload for one city, or None."""
+        params = {"key": self.api_key, "q": city}
+
+        response = self.request_with_retry("GET", params)
+        if response is None:
+            return None
+
+        return self._parse_json(response, city)
+
+    def fetch_bulk(self, cities):
+        """
+        Fetch many cities in one round trip using WeatherAPI's bulk
+        request (q=bulk, locations posted as JSON).
+
+        Returns {city: payload} with payload None for locations the
+        provider could not resolve. Batches larger than the provider
+        limit must be split by the caller.
+        """
+        if len(cities) > MAX_BULK_LOCATIONS:
+            raise ValueError(
+                f"Bulk request limited to {MAX_BULK_LOCATIONS} locations"
+            )
+
+        params = {"key": self.api_key, "q": "bulk"}
+        body = {
+            "locations": [
+                {"q": city, "custom_id": str(i)}
+                for i, city in enumerate(cities)
+            ]
+        }
+        label = f"bulk[{len(cities)} cities]"
+
+        results = {city: None for city in cities}
+
+        response = self.request_with_retry("POST", params, json=body, label=label)
+        if response is None:
+            return results
+
+        data = self._parse_json(response, label)
+        if data is None:
+            return results
+
+        for item in data.get("bulk", []):
+            query = item.get("query", {})
+            try:
+                city = cities[int(query.get("custom_id"))]
+            except (TypeError, ValueError, IndexError):
+                continue
+
+            if "error" in query:
+                logger.error(
+                    f"Bulk lookup failed for {city} — "
+                    f"{query['error'].get('message')}"
+                )
+                continue
+
+            results[city] = {
+                "location": query.get("location", {}),
+                "current": query.get("current", {})
+            }
+
+        return results
+
+    # --------------------------------------------------
+    # History
+    # --------------------------------------------------
+    @property
+    def history_url(self):
+        """history.json next to the configured current.json endpoint."""
+        return self.base_url.rsplit("/", 1)[0] + "/history.json"
+
+    def fetch_history(self, city, start, end):
+        """
+        Return the hourly history payload for one city and the dates
+        start .. end (inclusive, datetime.date), or None.
+        """
+        days = (end - start).days + 1
+        if not 1 <= days <= MAX_HISTORY_DAYS:
+            raise ValueError(
+                f"History requests span 1 to {MAX_HISTORY_DAYS} days, got {days}"
+            )
+
+        params = {
+            "key": self.api_key,
+            "q": city,
+            "dt": start.isoformat(),
+            "end_dt": end.isoformat(),
+        }
+        label = f"{city} history {start} .. {end}"
+
+        response = self.request_with_retry("GET", params, label=label, url=self.history_url)
+        if response is None:
+            return None
+
+        return self._parse_json(response, label)
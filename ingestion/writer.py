@@ -0,0 +1,133 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# Statements
+# --------------------------------------------------
+# Dimension rows are upserted once per distinct value in a batch; the
+# observation insert resolves their ids with primary-key lookups.
+UPSERT_LOCATION_SQL = """
+INSERT INTO locations (city, region, country, tz_id)
+VALUES (:city, :region, :country, :tz_id)
+ON CONFLICT(city) DO UPDATE SET
+    region = excluded.region,
+    country = excluded.country,
+    tz_id = COALESCE(excluded.tz_id, locations.tz_id)
+WHERE locations.region IS NOT excluded.region
+   OR locations.country IS NOT excluded.country
+   OR (excluded.tz_id IS NOT NULL AND locations.tz_id IS NOT excluded.tz_id)
+"""
+
+INSERT_CONDITION_SQL = """
+INSERT OR IGNORE INTO conditions (text) VALUES (?)
+"""
+
+# Duplicates are resolved by the UNIQUE(location_id, api_epoch)
+# constraint inside SQLite instead of per-row IntegrityError handling.
+INSERT_OBSERVATION_SQL = """
+INSERT INTO weather_observations (
+    location_id, api_epoch, utc_offset, fetched_epoch,
+    local_date, local_hour,
+    temperature_c, humidity, wind_kph, condition_id
+) VALUES (
+    (SELECT id FROM locations WHERE city = :city),
+    :api_epoch, :utc_offset, :fetched_epoch,
+    :local_date, :local_hour,
+    :temperature_c, :humidity, :wind_kph,
+    (SELECT id FROM conditions WHERE text = :condition)
+)
+ON CONFLICT(location_id, api_epoch) DO NOTHING
+"""
+
+# Never let an older snapshot overwrite a newer one (e.g. when a batch
+# holds several snapshots for the same city).
+UPSERT_CURRENT_SQL = """
+INSERT INTO weather_current (
+    city, region, country,
+    temperature_c, humidity, wind_kph,
+    condition, api_last_updated, fetched_at_utc
+) VALUES (
+    :city, :region, :country,
+    :temperature_c, :humidity, :wind_kph,
+    :condition, :api_last_updated, :fetched_at_utc
+)
+ON CONFLICT(city) DO UPDATE SET
+    region = excluded.region,
+    country = excluded.country,
+    temperature_c = excluded.temperature_c,
+    humidity = excluded.humidity,
+    wind_kph = excluded.wind_kph,
+    condition = excluded.condition,
+    api_last_updated = excluded.api_last_updated,
+    fetched_at_utc = excluded.fetched_at_utc
+WHERE excluded.api_last_updated >= weather_current.api_last_updated
+"""
+
+
+def write_batch(conn, records, update_current=True):
+    """
+    Write cleaned records to weather_observations (and weather_current)
+    with executemany inside a single transaction.
+    Returns (inserted, skipped) for weather_observations.
+    """
+    if not records:
+        return 0, 0
+
+    locations = {record["city"]: record for record in records}
+    conditions = {record["condition"] for record in records}
+
+    with conn:
+        conn.executemany(UPSERT_LOCATION_SQL, list(locations.values()))
+        conn.executemany(INSERT_CONDITION_SQL, [(text,) for text in conditions])
+        cursor = conn.executemany(INSERT_OBSERVATION_SQL, records)
+        inserted = cursor.rowcount
+
+        if update_current:
+            conn.executemany(UPSERT_CURRENT_SQL, records)
+
+    return inserted, len(records) - inserted
+
+
+class BatchWriter:
+    """
+    Accumulates cleaned records and flushes them every `batch_size`
+    records (and on close), one transaction per batch.
+    """
+
+    def __init__(self, conn, batch_size=500, update_current=True):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.update_current = update_current
+        self.pending = []
+        self.batches = 0
+        self.inserted = 0
+        self.skipped = 0
+
+    def add(self, record):
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        inserted, skipped = write_batch(self.conn, self.pending, self.update_current)
+
+        self.batches += 1
+        self.inserted += inserted
+        self.skipped += skipped
+        self.pending = []
+
+        logger.info(
+            f"Batch {self.batches} committed: {inserted} inserted, "
+            f"{skipped} duplicates skipped"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        # Keep what was already fetched even if the loop failed midway
+        self.flush()
@@ -0,0 +1,360 @@
+"""Dependency-aware pipeline runner.
+
+Declares the pipeline scripts as stages of a DAG (STAGES) and runs them
+as subprocesses, independent stages in parallel:
+
+    ingest ─┬─ hourly_check
+            └─ daily_summary ─┬─ streaming_anomalies, anomalies,
+                              │  correlation, cross_city, eda
+                              └─ features ─┬─ lr_forecast, lr_enhanced,
+                                           │  ma_forecast, ma5_forecast,
+                                           │  train_test, baseline_naive,
+                                           │  baseline_ma
+                                           └─ backtest
+
+Each stage is fingerprinted right before it would run:
+
+    code    the script, every repo module it (transitively) imports,
+            and config/config.yaml
+    inputs  the database state it reads (INPUT_PROBES: newest
+            observation id, rollup / feature-store watermarks)
+
+A stage whose fingerprint matches its last successful run (recorded in
+pipeline_stages) and whose outputs exist is skipped, so a refresh only
+pays for stages whose inputs actually changed. `ingest` always runs.
+Each stage's output goes to outputs/pipeline/<stage>.log.
+
+    python run_pipeline.py                      # everything
+    python run_pipeline.py backtest --skip ingest
+    python run_pipeline.py --force --workers 4
+    python run_pipeline.py --dry-run
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+
+from database.connection import CONFIG_PATH, DB_PATH, get_connection
+from database.feature_store import FEATURE_WATERMARK
+from database.migrations import apply_migrations
+from database.rollups import ROLLUP_WATERMARK
+from database.watermarks import RAW_HISTORY_FROM, get_watermark, max_history_id
+
+ROOT = Path(__file__).resolve().parent
+LOG_DIR = os.path.join("outputs", "pipeline")
+
+# --------------------------------------------------
+# Stages
+# --------------------------------------------------
+# script   run with the current interpreter from the repo root
+# args     extra command-line arguments
+# deps     stages that must finish first
+# inputs   INPUT_PROBES the stage reads; None = always run
+# outputs  files that must exist for the stage to count as up to date
+STAGES = {
+    "ingest": {
+        "script": "ingestion/fetch_weather.py",
+        "deps": [],
+        "inputs": None,
+    },
+    "hourly_check": {
+        "script": "analysis/build_hourly_summary.py",
+        "args": ["--verify"],
+        "deps": ["ingest"],
+        "inputs": ["history"],
+    },
+    "daily_summary": {
+        "script": "analysis/build_daily_summary.py",
+        "deps": ["ingest"],
+        "inputs": ["history"],
+    },
+    "streaming_anomalies": {
+        "script": "analysis/streaming_anomalies.py",
+        "args": ["--stream", "all"],
+        "deps": ["daily_summary"],
+        "inputs": ["history"],
+    },
+    "anomalies": {
+        "script": "analysis/anomaly_detection.py",
+        "deps": ["daily_summary"],
+        "inputs": ["daily_summary"],
+        "outputs": ["outputs/anomalies.csv"],
+    },
+    "correlation": {
+        "script": "analysis/correlation.py",
+        "deps": ["daily_summary"],
+        "inputs": ["daily_summary"],
+    },
+    "cross_city": {
+        "script": "analysis/cross_city_analysis.py",
+        "deps": ["daily_summary"],
+        "inputs": ["daily_summary"],
+        "outputs": ["outputs/plots/cross_city_temperature_trend.png"],
+    },
+    "eda": {
+        "script": "analysis/time_series_eda.py",
+        "deps": ["daily_summary"],
+        "inputs": ["daily_summary"],
+        "outputs": ["outputs/eda/temp_comparison_all_cities.png"],
+    },
+    "features": {
+        "script": "analysis/daily_feature_engineering.py",
+        "deps": ["daily_summary"],
+        "inputs": ["daily_summary"],
+        "outputs": ["outputs/engineered_daily_features.csv"],
+    },
+    "lr_forecast": {
+        "script": "analysis/time_series_lr_forecast.py",
+        "deps": ["features"],
+        "inputs": ["daily_features"],
+    },
+    "lr_enhanced": {
+        "script": "analysis/time_series_lr_enhanced.py",
+        "deps": ["features"],
+        "inputs": ["daily_features"],
+    },
+    "ma_forecast": {
+        "script": "analysis/time_series_ma_forecast.py",
+        "deps": ["features"],
+        "inputs": ["daily_features"],
+    },
+    "ma5_forecast": {
+        "script": "analysis/time_series_ma5_forecast.py",
+        "deps": ["features"],
+        "inputs": ["daily_features"],
+    },
+    "train_test": {
+        "script": "analysis/time_series_train_test.py",
+        "deps": ["features"],
+        "inputs": ["daily_features"],
+    },
+    "baseline_naive": {
+        "script": "analysis/baseline_naive_forecast.py",
+        "deps": ["features"],
+        "inputs": ["daily_features"],
+    },
+    "baseline_ma": {
+        "script": "analysis/baseline_ma_forecast.py",
+        "deps": ["features"],
+        "inputs": ["daily_features"],
+    },
+    "backtest": {
+        "script": "analysis/backtesting.py",
+        "deps": ["features"],
+        "inputs": ["daily_features"],
+    },
+}
+
+# Database state a stage reads, as JSON-able values
+INPUT_PROBES = {
+    "history": lambda conn: [max_history_id(conn), get_watermark(conn, RAW_HISTORY_FROM)],
+    "daily_summary": lambda conn: get_watermark(conn, ROLLUP_WATERMARK),
+    "daily_features": lambda conn: get_watermark(conn, FEATURE_WATERMARK),
+}
+
+
+# --------------------------------------------------
+# Fingerprints
+# --------------------------------------------------
+def local_modules(path, seen=None):
+    """`path` plus every repo module it imports, transitively."""
+    seen = set() if seen is None else seen
+    if path in seen or not path.exists():
+        return seen
+    seen.add(path)
+
+    for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+        if isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        elif isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        else:
+            continue
+
+        for name in names:
+            parts = name.split(".")
+            # Package modules (database.rollups) or script siblings (writer)
+            for candidate in (ROOT.joinpath(*parts).with_suffix(".py"),
+                              path.parent.joinpath(*parts).with_suffix(".py")):
+                local_modules(candidate, seen)
+
+    return seen
+
+
+def fingerprint(name):
+    """Hash of a stage's code and current inputs; None if it always runs."""
+    stage = STAGES[name]
+    if stage["inputs"] is None:
+        return None
+
+    digest = hashlib.sha1()
+    for path in sorted(local_modules(ROOT / stage["script"])) + [ROOT / CONFIG_PATH]:
+        digest.update(str(path.relative_to(ROOT)).encode())
+        digest.update(path.read_bytes() if path.exists() else b"")
+
+    inputs = {}
+    if os.path.exists(DB_PATH):
+        conn = get_connection(read_only=True)
+        try:
+            inputs = {probe: INPUT_PROBES[probe](conn) for probe in stage["inputs"]}
+        finally:
+            conn.close()
+
+    digest.update(json.dumps([stage.get("args", []), inputs], sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def recorded_fingerprints():
+    if not os.path.exists(DB_PATH):
+        return {}
+    conn = get_connection()
+    try:
+        apply_migrations(conn)
+        return dict(conn.execute("SELECT name, fingerprint FROM pipeline_stages"))
+    finally:
+        conn.close()
+
+
+def record_success(name, stage_fingerprint, seconds):
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pipeline_stages (name, fingerprint, finished_at, seconds) "
+                "VALUES (?, ?, ?, ?)",
+                (name, stage_fingerprint, datetime.now(timezone.utc).isoformat(), seconds),
+            )
+    finally:
+        conn.close()
+
+
+def up_to_date(name, stage_fingerprint, recorded):
+    return (
+        stage_fingerprint is not None
+        and recorded.get(name) == stage_fingerprint
+        and all(os.path.exists(path) for path in STAGES[name].get("outputs", []))
+    )
+
+
+# --------------------------------------------------
+# Scheduling
+# --------------------------------------------------
+def select(targets):
+    """Targets plus everything upstream of them, in declaration order."""
+    wanted = set()
+    stack = list(targets or STAGES)
+    while stack:
+        name = stack.pop()
+        if name not in wanted:
+            wanted.add(name)
+            stack.extend(STAGES[name]["deps"])
+    return [name for name in STAGES if name in wanted]
+
+
+def run_stage(name):
+    """Run one stage's script; returns (exit code, seconds)."""
+    stage = STAGES[name]
+    os.makedirs(LOG_DIR, exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(LOG_DIR, f"{name}.log"), "w") as log:
+        code = subprocess.run(
+            [sys.executable, stage["script"], *stage.get("args", [])],
+            cwd=ROOT, stdout=log, stderr=subprocess.STDOUT,
+        ).returncode
+    return code, time.perf_counter() - start
+
+
+def run_pipeline(targets=None, skip=(), force=False, workers=None, dry_run=False):
+    """
+    Run the selected stages, each as soon as its dependencies are done.
+    Returns {stage: status}: ran, skipped, failed or blocked.
+    """
+    order = select(targets)
+    recorded = {} if force else recorded_fingerprints()
+    status = {name: "skipped" for name in skip if name in order}
+    pending = [name for name in order if name not in status]
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        running = {}
+        while pending or running:
+            # Declaration order is topological, so one pass settles every
+            # stage whose dependencies are done
+            for name in list(pending):
+                deps = [status.get(dep) for dep in STAGES[name]["deps"]]
+                if any(state in ("failed", "blocked") for state in deps):
+                    status[name] = "blocked"
+                    pending.remove(name)
+                    print(f"⛔ {name}: blocked by a failed dependency")
+                    continue
+                if None in deps:
+                    continue
+
+                pending.remove(name)
+                stage_fingerprint = fingerprint(name)
+                if up_to_date(name, stage_fingerprint, recorded):
+                    status[name] = "skipped"
+                    print(f"⏭️ {name}: up to date")
+                elif dry_run:
+                    status[name] = "ran"
+                    print(f"📝 {name}: would run")
+                else:
+                    print(f"▶️ {name}")
+                    running[pool.submit(run_stage, name)] = (name, stage_fingerprint)
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, stage_fingerprint = running.pop(future)
+                code, seconds = future.result()
+
+                if code == 0:
+                    status[name] = "ran"
+                    if stage_fingerprint is not None:
+                        record_success(name, stage_fingerprint, seconds)
+                    print(f"✅ {name} ({seconds:.1f}s)")
+                else:
+                    status[name] = "failed"
+                    print(f"❌ {name} failed (exit {code}) — see {LOG_DIR}/{name}.log")
+
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the weather pipeline as a DAG")
+    parser.add_argument("targets", nargs="*", metavar="stage",
+                        help=f"stages to bring up to date, with their dependencies "
+                             f"(default: all of {', '.join(STAGES)})")
+    parser.add_argument("--skip", nargs="+", default=[], choices=list(STAGES), metavar="stage",
+                        help="treat these stages as done (e.g. --skip ingest offline)")
+    parser.add_argument("--force", action="store_true",
+                        help="run every selected stage, ignoring fingerprints")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="stages run at once (default: one per CPU)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="show which stages are out of date without running them")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.targets if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    start = time.perf_counter()
+    status = run_pipeline(args.targets, args.skip, args.force, args.workers, args.dry_run)
+
+    counts = {state: list(status.values()).count(state) for state in ("ran", "skipped", "failed", "blocked")}
+    print(
+        f"\n🎉 Pipeline finished in {time.perf_counter() - start:.1f}s — "
+        + ", ".join(f"{count} {state}" for state, count in counts.items())
+    )
+    if counts["failed"] or counts["blocked"]:
+        sys.exit(1)